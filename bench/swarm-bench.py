@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Orchestrator throughput benchmark
+
+Starts mock-api-server.py as a subprocess and drives SwarmOrchestrator
+against it, so runs need no API key or network and are repeatable.
+
+For each agent count it measures delegate_task (sequential calls),
+parallel_task, collaborative_task and a fan-out config workflow, and
+reports tasks/sec, p50/p99 call latency and orchestrator overhead:
+
+    call overhead  client-side call latency minus the server's latency
+    wall overhead  wall time minus the ideal time for the scenario's
+                   critical path at the configured latency and concurrency
+
+    python bench/swarm-bench.py --agents 1,10,100,1000 --latency 0.05
+    python bench/swarm-bench.py --fail-rate 0.05 --compare bench/results/old.json
+    python bench/swarm-bench.py --scenarios collaborative --slow-rate 0.1 --slow-latency 2 \
+        --hedge-percentile 90 --quorum 0.75
+
+Results are written as JSON (bench/results/<timestamp>-<commit>.json by
+default) so runs can be compared between releases with --compare.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import socket
+import argparse
+import platform
+import tempfile
+import subprocess
+import importlib.util
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+SCENARIOS = ('delegate', 'parallel', 'collaborative', 'workflow')
+COMPARED = ('tasks_per_s', 'p50_ms', 'p99_ms', 'call_overhead_p50_ms', 'wall_overhead_s')
+
+def load_swarm():
+    """Import swarm-orchestrator.py, which is not importable by name"""
+    spec = importlib.util.spec_from_file_location(
+        "swarm_orchestrator", ROOT / "swarm-orchestrator.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+class MockServerProcess:
+    """mock-api-server.py running in a child process"""
+
+    def __init__(self, latency: float, token_delay: float, fail_rate: float,
+                 retry_after: float, slow_rate: float = 0.0, slow_latency: float = 0.0):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.process = subprocess.Popen(
+            [sys.executable, str(ROOT / "mock-api-server.py"), '--port', str(self.port),
+             '--latency', str(latency), '--token-delay', str(token_delay),
+             '--fail-rate', str(fail_rate), '--retry-after', str(retry_after),
+             '--slow-rate', str(slow_rate), '--slow-latency', str(slow_latency)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                self.stats()
+                return
+            except OSError:
+                if time.monotonic() > deadline or self.process.poll() is not None:
+                    self.close()
+                    raise RuntimeError("mock-api-server.py did not start")
+                time.sleep(0.05)
+
+    def stats(self) -> dict:
+        with urllib.request.urlopen(f"{self.url}/stats", timeout=5) as response:
+            return json.loads(response.read())
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait()
+
+def bench_config(agents: int, args) -> dict:
+    """Swarm config with `agents` agents and a plan -> fan-out -> review workflow"""
+    names = [f"agent-{i:04d}" for i in range(agents)]
+    steps = [{'agent': names[0], 'action': 'plan'}]
+    if agents > 1:
+        steps.append({'parallel': [{'agent': name, 'action': 'build'} for name in names[1:]]})
+    steps.append({'agent': names[0], 'action': 'review'})
+    config = {
+        'swarm': {'name': f"Bench {agents}", 'main': names[0], 'quorum': args.quorum},
+        'instances': {name: {'description': f"benchmark agent {name}",
+                             'model': 'claude-3-5-sonnet-20241022'} for name in names},
+        'scheduler': {'max_concurrency': args.max_concurrency, 'base_delay': 0.05},
+        'workflows': {'bench': {'steps': steps}},
+    }
+    if args.hedge_percentile:
+        config['hedging'] = {'percentile': args.hedge_percentile, 'max_rate': args.hedge_rate}
+    return config
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+def run_scenario(swarm, scenario: str, args) -> float:
+    """Run one scenario round and return its ideal (zero-overhead) duration"""
+    agents = list(swarm.agents)
+    waves = lambda calls: math.ceil(calls / args.max_concurrency)
+    if scenario == 'delegate':
+        for i in range(args.sequential_calls):
+            swarm.delegate_task(f"Bench task {i}", to_agent=agents[i % len(agents)])
+        return args.sequential_calls * args.latency
+    if scenario == 'parallel':
+        swarm.parallel_task({agent: f"Bench task for {agent}" for agent in agents})
+        return waves(len(agents)) * args.latency
+    if scenario == 'collaborative':
+        swarm.collaborative_task("Bench project", {
+            agent: f"Bench subtask for {agent}" for agent in agents[1:]})
+        return (2 + waves(len(agents) - 1)) * args.latency
+    swarm.run_workflow('bench', "Bench project")
+    return (2 + (waves(len(agents) - 1) if len(agents) > 1 else 0)) * args.latency
+
+def bench(swarm_module, agents: int, scenario: str, server: MockServerProcess, args) -> dict:
+    config_path = Path(f"bench-{agents}.json")
+    config_path.write_text(json.dumps(bench_config(agents, args)))
+
+    setup_start = time.monotonic()
+    swarm = swarm_module.SwarmOrchestrator(str(config_path))
+    setup = time.monotonic() - setup_start
+
+    # Exact per-call latencies alongside the normal metrics
+    calls = []
+    observe = swarm.metrics.observe
+    def record(agent: str, meta: dict):
+        calls.append(dict(meta))
+        observe(agent, meta)
+    swarm.metrics.observe = record
+
+    try:
+        server_before = server.stats()
+        ideal, wall = 0.0, 0.0
+        for _ in range(args.rounds):
+            start = time.monotonic()
+            ideal += run_scenario(swarm, scenario, args)
+            wall += time.monotonic() - start
+        server_after = server.stats()
+    finally:
+        swarm.close()
+
+    latencies = [call['elapsed'] for call in calls if not call.get('cached')]
+    overheads = [call['elapsed'] - call.get('queue_wait', 0.0) - args.latency
+                 for call in calls if not call.get('cached') and not call.get('retries')]
+    return {
+        'scenario': scenario,
+        'agents': agents,
+        'rounds': args.rounds,
+        'tasks': len(calls),
+        'setup_s': round(setup, 4),
+        'wall_s': round(wall, 4),
+        'ideal_s': round(ideal, 4),
+        'wall_overhead_s': round(wall - ideal, 4),
+        'tasks_per_s': round(len(calls) / wall, 2) if wall else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'call_overhead_p50_ms': round(percentile(overheads, 50) * 1000, 2),
+        'queue_wait_p99_ms': round(percentile(
+            [call.get('queue_wait', 0.0) for call in calls], 99) * 1000, 2),
+        'errors': sum(1 for call in calls if call.get('error')),
+        'hedged': sum(1 for call in calls if call.get('hedged')),
+        'cancelled': sum(1 for call in calls if call.get('cancelled')),
+        'retries': sum(call.get('retries', 0) for call in calls),
+        'server_requests': server_after['requests'] - server_before['requests'],
+        'server_rate_limited': server_after['rate_limited'] - server_before['rate_limited'],
+    }
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def compare(results: List[dict], baseline_path: str):
+    """Print each result's change against a previous results file"""
+    baseline = {(row['scenario'], row['agents']): row
+                for row in json.loads(Path(baseline_path).read_text())['results']}
+    print(f"\nCompared with {baseline_path}:")
+    for row in results:
+        old = baseline.get((row['scenario'], row['agents']))
+        if not old:
+            continue
+        changes = []
+        for key in COMPARED:
+            if old.get(key):
+                changes.append(f"{key} {(row[key] - old[key]) / abs(old[key]) * 100:+.1f}%")
+        print(f"  {row['scenario']:<14}{row['agents']:>6}  {', '.join(changes)}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark SwarmOrchestrator against a mock API')
+    parser.add_argument('--agents', default='1,10,100',
+                        help='comma-separated agent counts (e.g. 1,10,100,1000)')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--sequential-calls', type=int, default=20,
+                        help='delegate_task calls per delegate round')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='mock server latency per call (seconds)')
+    parser.add_argument('--token-delay', type=float, default=0.0)
+    parser.add_argument('--fail-rate', type=float, default=0.0,
+                        help='fraction of calls answered with 429')
+    parser.add_argument('--retry-after', type=float, default=0.05)
+    parser.add_argument('--max-concurrency', type=int, default=64,
+                        help='scheduler concurrency cap')
+    parser.add_argument('--slow-rate', type=float, default=0.0,
+                        help='fraction of calls the mock answers after --slow-latency')
+    parser.add_argument('--slow-latency', type=float, default=2.0)
+    parser.add_argument('--hedge-percentile', type=float,
+                        help='enable hedging after this latency percentile')
+    parser.add_argument('--hedge-rate', type=float, default=0.1,
+                        help='most calls that may be hedged, as a fraction')
+    parser.add_argument('--quorum', type=float,
+                        help='collaborative synthesis starts after this fraction of subtasks')
+    parser.add_argument('--output', help='results file (default bench/results/<time>-<commit>.json)')
+    parser.add_argument('--compare', help='previous results file to compare against')
+    args = parser.parse_args()
+
+    agent_counts = [int(n) for n in args.agents.split(',')]
+    scenarios = [s for s in args.scenarios.split(',') if s in SCENARIOS]
+    output = Path(args.output) if args.output else ROOT / 'bench' / 'results' / (
+        f"{datetime.now().strftime('%Y%m%d_%H%M%S')}-{git_revision()}.json")
+
+    swarm_module = load_swarm()
+    server = MockServerProcess(args.latency, args.token_delay, args.fail_rate, args.retry_after,
+                               args.slow_rate, args.slow_latency)
+    os.environ.update({'ANTHROPIC_API_KEY': 'bench', 'ANTHROPIC_BASE_URL': server.url})
+    os.environ.pop('SWARM_CACHE', None)
+    os.environ.pop('SWARM_METRICS_PORT', None)
+    os.environ.pop('SWARM_REDIS_URL', None)
+
+    results = []
+    workdir = tempfile.TemporaryDirectory(prefix='swarm-bench-')
+    cwd = os.getcwd()
+    os.chdir(workdir.name)
+    print(f"{'scenario':<14}{'agents':>6}{'tasks':>7}{'tasks/s':>10}{'p50 ms':>9}"
+          f"{'p99 ms':>9}{'ovh ms':>8}{'wall s':>8}{'ideal s':>8}{'errors':>7}")
+    try:
+        for agents in agent_counts:
+            for scenario in scenarios:
+                row = bench(swarm_module, agents, scenario, server, args)
+                results.append(row)
+                print(f"{scenario:<14}{agents:>6}{row['tasks']:>7}{row['tasks_per_s']:>10.1f}"
+                      f"{row['p50_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+                      f"{row['call_overhead_p50_ms']:>8.1f}{row['wall_s']:>8.2f}"
+                      f"{row['ideal_s']:>8.2f}{row['errors']:>7}")
+    finally:
+        os.chdir(cwd)
+        workdir.cleanup()
+        server.close()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'commit': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'settings': {key: value for key, value in vars(args).items()
+                         if key not in ('output', 'compare')},
+        },
+        'results': results,
+    }
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {output}")
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,92 +5,669 @@ This script actually generates code files!
 """
 
 import os
+import re
+import sys
 import json
+import hashlib
+import functools
+import threading
+import importlib.util
 from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
 from anthropic import Anthropic
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import time
 
+@functools.lru_cache(maxsize=None)
+def load_swarm():
+    """Import swarm-orchestrator.py (once), which is not importable by name"""
+    path = Path(__file__).with_name("swarm-orchestrator.py")
+    spec = importlib.util.spec_from_file_location("swarm_orchestrator", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@functools.lru_cache(maxsize=None)
+def load_bundler():
+    """Import hooks/builders/web_bundler.py (once)"""
+    path = Path(__file__).parent / "hooks" / "builders" / "web_bundler.py"
+    spec = importlib.util.spec_from_file_location("web_bundler", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+ERROR_MARKER = "// Error generating code:"
+
+FENCED_BLOCK_RE = re.compile(r'^[ \t]*(`{3,}|~{3,})[ \t]*([\w+#.-]*)[^\n]*\n(.*?)^[ \t]*\1[ \t]*$',
+                             re.M | re.S)
+OPEN_FENCE_RE = re.compile(r'^[ \t]*(?:`{3,}|~{3,})[^\n]*(?:\n|$)')
+FILE_HEADER_RE = re.compile(r'^\s*={3,}\s*FILE:\s*(.+?)\s*={3,}\s*$')
+FILE_END_RE = re.compile(r'^\s*={3,}\s*END(?:\s+FILE)?\s*={3,}\s*$')
+FENCE_LANGUAGES = {'.js': {'js', 'javascript', 'jsx'}, '.jsx': {'jsx', 'js', 'javascript'},
+                   '.css': {'css'}, '.html': {'html'}, '.json': {'json'}, '.py': {'python', 'py'}}
+
+def extract_code(text: str, filename: str = '') -> str:
+    """The file content in a model reply, without markdown fences
+    
+    A reply that is one fenced block is unwrapped. Otherwise, for code
+    files, prose around the code is dropped by taking the fenced block in
+    the file's language (or the longest one). A fence left open by a
+    truncated reply is removed too. Markdown files keep their fences.
+    """
+    text = text.strip()
+    blocks = list(FENCED_BLOCK_RE.finditer(text))
+    if blocks and blocks[0].start() == 0 and blocks[0].end() == len(text):
+        return blocks[0].group(3).rstrip('\n')
+    suffix = Path(filename).suffix.lower()
+    if suffix == '.md':
+        return text
+    if not blocks:
+        return OPEN_FENCE_RE.sub('', text, count=1).strip() if OPEN_FENCE_RE.match(text) else text
+    languages = FENCE_LANGUAGES.get(suffix, set())
+    matching = [block for block in blocks if block.group(2).lower() in languages]
+    return max(matching or blocks, key=lambda block: len(block.group(3))).group(3).rstrip('\n')
+
+class FileStreamSplitter:
+    """Splits a streamed multi-file reply into files as each one completes
+    
+    Files are delimited by `=== FILE: <path> ===` and `=== END FILE ===`
+    lines; a new header also ends an unterminated file. Text outside files
+    is ignored and each file's content goes through extract_code().
+    """
+    
+    def __init__(self):
+        self._buffer = ''
+        self._path = None
+        self._lines: List[str] = []
+    
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        """Add streamed text; returns the (path, content) of files it completed"""
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split('\n')
+        done = []
+        for line in lines:
+            done += self._line(line)
+        return done
+    
+    def close(self, complete: bool = True) -> List[Tuple[str, str]]:
+        """End of the reply; an unterminated last file is kept only if `complete`"""
+        done = self._line(self._buffer) if self._buffer else []
+        self._buffer = ''
+        if complete:
+            return done + self._finish()
+        self._path, self._lines = None, []
+        return done
+    
+    def _line(self, line: str) -> List[Tuple[str, str]]:
+        header = FILE_HEADER_RE.match(line)
+        if header:
+            done = self._finish()
+            self._path = header.group(1).strip('`"\' ')
+            return done
+        if self._path is None:
+            return []
+        if FILE_END_RE.match(line):
+            return self._finish()
+        self._lines.append(line)
+        return []
+    
+    def _finish(self) -> List[Tuple[str, str]]:
+        if self._path is None:
+            return []
+        path, content = self._path, extract_code('\n'.join(self._lines), self._path)
+        self._path, self._lines = None, []
+        return [(path, content)]
+
 class CodeGeneratorAgent:
-    def __init__(self, name, role):
+    def __init__(self, name, role, cache=None):
         self.name = name
         self.role = role
         self.client = Anthropic()
+        self.cache = cache
+        self.calls = 0
+        self._lock = threading.Lock()
+    
+    def _count_call(self):
+        with self._lock:
+            self.calls += 1
         
-    def generate_code(self, task, filename):
-        """Generate actual code and save to file"""
+    def build_request(self, task):
+        """The Messages API request that generates code for a task"""
         prompt = f"""As a {self.role}, {task}
         
 IMPORTANT: Return ONLY the code, no explanations, no markdown markers.
 Just the raw code that should go in the file."""
         
-        print(f"🤖 {self.name}: Generating {filename}...")
+        return {
+            "model": "claude-3-5-sonnet-20241022",
+            "max_tokens": 2048,
+            "messages": [{"role": "user", "content": prompt}]
+        }
+    
+    def generate_code(self, task, filename):
+        """Generate actual code and save to file"""
+        request = self.build_request(task)
+        
+        cached = self.cache.get(request) if self.cache else None
+        if cached is not None:
+            print(f"⚡ {self.name}: {filename} unchanged, using cached response")
+        else:
+            print(f"🤖 {self.name}: Generating {filename}...")
         
         try:
-            response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=2048,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            code = response.content[0].text.strip()
-            
-            # Remove markdown code blocks if present
-            if code.startswith("```"):
-                lines = code.split('\n')
-                code = '\n'.join(lines[1:-1])
-            
-            return code
+            if cached is None:
+                self._count_call()
+                response = self.client.messages.create(**request)
+                cached = response.content[0].text
+                if self.cache:
+                    self.cache.put(request, cached)
+            return extract_code(cached, filename)
         except Exception as e:
-            return f"// Error generating code: {str(e)}"
+            return f"{ERROR_MARKER} {str(e)}"
+    
+    def build_files_request(self, files: List[Tuple[str, str]], context: str = ''):
+        """The Messages API request that generates several (path, task) files at once"""
+        listing = '\n\n'.join(f"File: {path}\nTask: {task}" for path, task in files)
+        prompt = f"""As a {self.role}, write these {len(files)} files (later files may use earlier ones):
 
-def create_todo_app():
-    """Create a complete Todo application with React and Node.js"""
+{listing}{context}
+
+IMPORTANT: Return every file in this exact format, one after another, and nothing else:
+=== FILE: <path> ===
+<the raw code of the file, no markdown markers>
+=== END FILE ==="""
+        
+        return {
+            "model": "claude-3-5-sonnet-20241022",
+            "max_tokens": min(8192, 2048 * len(files)),
+            "messages": [{"role": "user", "content": prompt}]
+        }
     
-    print("🚀 Creating a REAL Todo Application using Claude Swarm!\n")
+    def generate_files(self, files: List[Tuple[str, str]], context: str = '',
+                       on_file: Callable[[str, str], None] = None) -> Dict[str, str]:
+        """Generate several files in one streamed call
+        
+        Each file is handed to `on_file` the moment its end marker arrives.
+        Returns the files the reply contained; a file cut off by max_tokens
+        or a failed call is simply missing, for the caller to retry.
+        """
+        request = self.build_files_request(files, context)
+        wanted = {path: path for path, _ in files}
+        # Models sometimes drop the directory; accept a bare name if it is unambiguous
+        names = [Path(path).name for path in wanted]
+        wanted.update({Path(path).name: path for path in wanted if names.count(Path(path).name) == 1})
+        results = {}
+        
+        def emit(done: List[Tuple[str, str]]):
+            for path, content in done:
+                path = wanted.get(path[2:] if path.startswith('./') else path)
+                if path is not None and path not in results:
+                    results[path] = content
+                    if on_file:
+                        on_file(path, content)
+        
+        splitter = FileStreamSplitter()
+        cached = self.cache.get(request) if self.cache else None
+        if cached is not None:
+            print(f"⚡ {self.name}: {', '.join(p for p, _ in files)} unchanged, using cached response")
+            emit(splitter.feed(cached))
+            emit(splitter.close())
+            return results
+        
+        print(f"🤖 {self.name}: Generating {', '.join(p for p, _ in files)} in one call...")
+        self._count_call()
+        try:
+            with self.client.messages.stream(**request) as stream:
+                for text in stream.text_stream:
+                    emit(splitter.feed(text))
+                message = stream.get_final_message()
+            complete = message.stop_reason != 'max_tokens'
+            emit(splitter.close(complete))
+            if self.cache and complete and len(results) == len(files):
+                self.cache.put(request, ''.join(block.text for block in message.content
+                                                if block.type == 'text'))
+        except Exception as e:
+            print(f"⚠️  {self.name}: multi-file call failed after {len(results)} file(s): {e}")
+        return results
+
+class GenerationPipeline:
+    """Generates a manifest of files, running independent files concurrently
     
-    # Create project structure
-    project_dir = Path("/workspace/projects/todo-app")
-    project_dir.mkdir(parents=True, exist_ok=True)
+    Each manifest entry names a `path`, plus either static `content` or an
+    `agent` and `task`. `depends_on` lists paths whose generated code the
+    file needs (e.g. App.js needs TodoItem's interface); a file starts as
+    soon as those exist, and every file is written to disk the moment it
+    is done. Scheduling and the critical path reuse the swarm's Workflow DAG.
     
-    frontend_dir = project_dir / "frontend"
-    backend_dir = project_dir / "backend"
-    frontend_dir.mkdir(exist_ok=True)
-    backend_dir.mkdir(exist_ok=True)
+    Like make, re-runs are incremental: MANIFEST in the project directory
+    records each file's input key (a hash of its exact request, which
+    includes the model, prompt and upstream code) and output hash. Files
+    whose key is unchanged are skipped, so only edited specs and the files
+    downstream of them are regenerated.
     
-    # Create agents
-    frontend_agent = CodeGeneratorAgent("Frontend Dev", "React developer")
-    backend_agent = CodeGeneratorAgent("Backend Dev", "Node.js developer")
-    
-    print("📁 Creating project structure...\n")
-    
-    # Generate Frontend Files
-    print("🎨 FRONTEND TEAM WORKING...")
-    
-    # 1. React App Component
-    app_code = frontend_agent.generate_code(
-        "Create a React App component for a todo list with add, delete, and toggle complete functionality. Use hooks and modern React patterns.",
-        "App.js"
-    )
-    (frontend_dir / "App.js").write_text(app_code)
-    print("✅ Created: frontend/App.js")
-    
-    # 2. TodoItem Component
-    todo_item_code = frontend_agent.generate_code(
-        "Create a React TodoItem component that displays a single todo with checkbox, text, and delete button",
-        "TodoItem.js"
-    )
-    (frontend_dir / "TodoItem.js").write_text(todo_item_code)
-    print("✅ Created: frontend/TodoItem.js")
-    
-    # 3. CSS Styles
-    css_code = frontend_agent.generate_code(
-        "Create CSS styles for a modern, clean todo app with nice colors and transitions",
-        "App.css"
-    )
-    (frontend_dir / "App.css").write_text(css_code)
-    print("✅ Created: frontend/App.css")
-    
-    # 4. HTML Template
-    html_code = """<!DOCTYPE html>
+    With `validate`, each generated file is checked by the validation
+    engine as soon as it is written, while other files keep generating.
+    Errors go to the deterministic fixer first, then back to the file's
+    agent with the error list, at most `max_fix_attempts` times; files
+    that depend on it wait for the repaired version. Once every file
+    exists, one project-wide pass catches cross-file errors and repairs
+    them the same way, so a single run ends with a validated project.
+    Files still failing are left out of MANIFEST and retried next run.
+    
+    With `multi_file`, entries sharing a `group` (and agent) are generated
+    by one streamed call instead of one call each: the group is a single
+    step of the DAG, members are written as soon as the stream completes
+    them, and any file missing from the reply is generated on its own.
+    
+    With `build`, every HTML page in the manifest is bundled once the
+    project validates: JSX is compiled ahead of time, scripts are joined
+    in dependency order with React vendored in, and the result lands in
+    dist/ under content-hashed names. Unchanged pages are not rebuilt.
+    """
+    
+    MANIFEST = '.swarm-manifest.json'
+    # Cross-file rules that may only be satisfied by files still generating
+    PENDING_RULES = {'undefined-component', 'script-order', 'missing-script'}
+    
+    def __init__(self, project_dir: Path, agents: dict, max_workers: int = 8,
+                 force: bool = False, validate: bool = True, max_fix_attempts: int = 2,
+                 multi_file: bool = True, build: bool = False):
+        self.project_dir = Path(project_dir)
+        self.agents = agents
+        self.max_workers = max_workers
+        self.force = force
+        self.validate = validate
+        self.max_fix_attempts = max_fix_attempts
+        self.multi_file = multi_file
+        self.build = build
+        self.swarm = load_swarm()
+        self.engine = self.swarm.validation_engine() if validate else None
+        self.entries = {}
+        self.units: Dict[str, List[str]] = {}
+        self.unit_of: Dict[str, str] = {}
+        self.fix_attempts = {}
+        self._lock = threading.Lock()
+        self.manifest_path = self.project_dir / self.MANIFEST
+        try:
+            self.manifest = json.loads(self.manifest_path.read_text())
+        except (OSError, ValueError):
+            self.manifest = {}
+    
+    def compile(self, manifest: list):
+        """Build the dependency DAG for a manifest (raises on cycles or unknown paths)
+        
+        Steps are files, or whole groups in multi-file mode; a group's
+        files are ordered so each comes after the members it depends on.
+        """
+        entries = {entry['path']: entry for entry in manifest}
+        for entry in manifest:
+            unknown = set(entry.get('depends_on', [])) - set(entries)
+            if unknown:
+                raise ValueError(f"{entry['path']} depends on unknown file(s) {', '.join(sorted(unknown))}")
+        self.units = {}
+        for entry in manifest:
+            group = entry.get('group') if self.multi_file and 'agent' in entry else None
+            self.units.setdefault(f"group:{group}" if group else entry['path'], []).append(entry['path'])
+        self.unit_of = {path: unit for unit, paths in self.units.items() for path in paths}
+        
+        steps = {}
+        for unit, paths in self.units.items():
+            agents = {entries[path].get('agent', 'static') for path in paths}
+            if len(agents) > 1:
+                raise ValueError(f"{unit} mixes agents {', '.join(sorted(agents))}")
+            self.units[unit] = self._order(paths, entries)
+            steps[unit] = self.swarm.WorkflowStep(unit, {'agent': agents.pop(), 'action': 'generate'}, 0)
+            steps[unit].depends_on = {self.unit_of[dep] for path in paths
+                                      for dep in entries[path].get('depends_on', [])} - {unit}
+        dag = self.swarm.Workflow('generate', steps)
+        dag._check_acyclic()
+        return dag
+    
+    @staticmethod
+    def _order(paths: List[str], entries: dict) -> List[str]:
+        """A group's files, each after the members it depends on"""
+        ordered, visiting = [], set()
+        
+        def visit(path: str):
+            if path in ordered:
+                return
+            if path in visiting:
+                raise ValueError(f"Files in a group depend on each other in a cycle at {path}")
+            visiting.add(path)
+            for dep in entries[path].get('depends_on', []):
+                if dep in paths:
+                    visit(dep)
+            ordered.append(path)
+        
+        for path in paths:
+            visit(path)
+        return ordered
+    
+    @staticmethod
+    def _context(deps: List[str], files: dict) -> str:
+        """The code of existing files a task must work with"""
+        if not deps:
+            return ''
+        context = "\n\nIt must work with these files, which already exist:\n"
+        for dep in deps:
+            context += f"\n--- {dep} ---\n{files[dep]}\n"
+        return context
+    
+    def _task(self, entry: dict, files: dict) -> str:
+        """The entry's task, with the code of the files it depends on"""
+        return entry['task'] + self._context(entry.get('depends_on', []), files)
+    
+    def _group(self, unit: str, files: dict) -> Tuple[List[Tuple[str, str]], str]:
+        """(path, task) pairs of a group and the context its outside dependencies give"""
+        paths = self.units[unit]
+        deps = [dep for path in paths for dep in self.entries[path].get('depends_on', [])
+                if dep not in paths]
+        return ([(path, self.entries[path]['task']) for path in paths],
+                self._context(list(dict.fromkeys(deps)), files))
+    
+    def _write(self, path: str, content: str):
+        """Write a finished file atomically, so readers never see half of it"""
+        target = self.project_dir / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.tmp")
+        tmp.write_text(content)
+        os.replace(tmp, target)
+    
+    @staticmethod
+    def _hash(content: str) -> str:
+        return hashlib.sha256(content.encode()).hexdigest()
+    
+    def input_key(self, entry: dict, files: dict) -> str:
+        """Hash of everything that determines a file's content"""
+        if 'content' in entry:
+            return self._hash(entry['content'])
+        agent = self.agents[entry['agent']]
+        unit = self.unit_of.get(entry['path'], entry['path'])
+        if len(self.units.get(unit, ())) > 1:
+            request = agent.build_files_request(*self._group(unit, files))
+        else:
+            request = agent.build_request(self._task(entry, files))
+        return self.swarm.ResponseCache.key(request)
+    
+    def _up_to_date(self, path: str, key: str) -> Optional[str]:
+        """The file's current content if it was built from `key`, else None
+        
+        Hand edits to a generated file are kept; files downstream of it see
+        the edited content and are rebuilt.
+        """
+        record = self.manifest.get(path)
+        target = self.project_dir / path
+        if self.force or not record or record['key'] != key or not target.exists():
+            return None
+        return target.read_text()
+    
+    def _save_manifest(self):
+        tmp = self.manifest_path.with_name(f".{self.MANIFEST}.tmp")
+        tmp.write_text(json.dumps(self.manifest, indent=2, sort_keys=True))
+        os.replace(tmp, self.manifest_path)
+    
+    def _generate(self, entry: dict, files: dict) -> str:
+        if 'content' in entry:
+            return entry['content']
+        agent = self.agents[entry['agent']]
+        return agent.generate_code(self._task(entry, files), entry['path'])
+    
+    def _generate_unit(self, unit: str, files: dict, current: Dict[str, Optional[str]],
+                       on_write: Callable[[str], None]) -> Dict[str, str]:
+        """Generate a step's files, writing each one the moment it is complete
+        
+        Members in `current` that are already up to date keep their content.
+        """
+        paths = self.units[unit]
+        contents = {path: content for path, content in current.items() if content is not None}
+        
+        def write(path: str, content: str):
+            if path not in contents:
+                self._write(path, content)
+                contents[path] = content
+                on_write(path)
+        
+        if len(paths) > 1:
+            agent = self.agents[self.entries[paths[0]]['agent']]
+            agent.generate_files(*self._group(unit, files), on_file=write)
+            missing = [path for path in paths if path not in contents]
+            if missing:
+                print(f"↩️  Not in the multi-file reply, generating separately: {', '.join(missing)}")
+        for path in paths:
+            if path not in contents:
+                write(path, self._generate(self.entries[path], dict(files, **contents)))
+        return contents
+    
+    def _owner(self, issue: dict) -> Optional[str]:
+        """The generated file that has to change to fix an issue
+        
+        Errors reported against static files (index.html using an undefined
+        <App />) belong to the generated file named after the component.
+        """
+        entry = self.entries.get(issue['file'])
+        if entry is not None and 'content' not in entry:
+            return issue['file']
+        for path, entry in self.entries.items():
+            if 'content' not in entry and Path(path).stem == issue.get('component'):
+                return path
+        return None
+    
+    def _errors_by_file(self, report: dict, pending: bool = False) -> dict:
+        """Errors in a validation report, grouped by the generated file that owns them"""
+        errors = {}
+        for issue in report['issues']:
+            if issue['severity'] != 'error' or (pending and issue['rule'] in self.PENDING_RULES):
+                continue
+            owner = self._owner(issue)
+            if owner is not None:
+                errors.setdefault(owner, []).append(issue)
+        return errors
+    
+    def _fix_task(self, entry: dict, files: dict, content: str, errors: list) -> str:
+        """The entry's task again, with the failing version and what is wrong with it"""
+        problems = '\n'.join(
+            f"- {issue['message']}" + (f" (line {issue['line']})" if issue.get('line') else '')
+            for issue in errors)
+        return (f"{self._task(entry, files)}\n\nA previous version of {entry['path']} "
+                f"failed validation:\n{problems}\n\nPrevious version:\n{content}\n\n"
+                f"Return the complete corrected file.")
+    
+    def _take_fix_attempt(self, path: str) -> Optional[int]:
+        """Spend one of a file's regenerations; None once its budget is used up"""
+        with self._lock:
+            attempt = self.fix_attempts.get(path, 0) + 1
+            if attempt > self.max_fix_attempts:
+                return None
+            self.fix_attempts[path] = attempt
+            return attempt
+    
+    def _repair(self, entry: dict, content: str, errors: list, files: dict,
+                seen: set) -> Optional[str]:
+        """One repair step for a failing file: a local fix, else a regeneration
+        
+        Returns the new content, or None once the file's budget is spent.
+        """
+        path = entry['path']
+        fixed, fixes = self.swarm.validation_module().fix_text(content, errors)
+        if fixes and fixed not in seen:
+            print(f"🔧 Fixed {path}: {', '.join(fixes)}")
+            return fixed
+        attempt = self._take_fix_attempt(path)
+        if attempt is None:
+            return None
+        print(f"🔁 Regenerating {path} ({len(errors)} error(s), "
+              f"attempt {attempt}/{self.max_fix_attempts})")
+        agent = self.agents[entry['agent']]
+        return agent.generate_code(self._fix_task(entry, files, content, errors), path)
+    
+    def _validate_and_fix(self, entries: list, contents: dict, files: dict, pending: bool,
+                          executor=None, report: dict = None) -> tuple:
+        """Validate written files and repair them until they pass or their budgets are spent
+        
+        Each round validates the project once and splits the errors by file;
+        `contents` is updated in place. Returns the errors each file still has
+        and the last report, which matches the files on disk.
+        """
+        seen = {entry['path']: {contents[entry['path']]} for entry in entries}
+        active = [entry for entry in entries if not contents[entry['path']].startswith(ERROR_MARKER)]
+        failing = {entry['path']: [] for entry in entries}
+        while True:
+            report = report or self.engine.validate_project(self.project_dir)
+            errors = self._errors_by_file(report, pending)
+            for entry in entries:
+                failing[entry['path']] = errors.get(entry['path'], [])
+            active = [entry for entry in active if failing[entry['path']]]
+            if not active:
+                return failing, report
+            
+            def repair(entry: dict) -> Optional[str]:
+                path = entry['path']
+                return self._repair(entry, contents[path], failing[path], files, seen[path])
+            
+            results = executor.map(repair, active) if executor else map(repair, active)
+            repaired = {entry['path']: content for entry, content in zip(active, results)
+                        if content is not None}
+            if not repaired:
+                # Nothing was rewritten, so the report still matches the files
+                return failing, report
+            for path, content in repaired.items():
+                contents[path] = content
+                seen[path].add(content)
+                self._write(path, content)
+            active = [entry for entry in active if entry['path'] in repaired]
+            report = None
+    
+    def run(self, manifest: list) -> dict:
+        """Generate out-of-date files; returns contents, timings and the critical path"""
+        dag = self.compile(manifest)
+        entries = self.entries = {entry['path']: entry for entry in manifest}
+        files, timings, unit_timings, keys, failing = {}, {}, {}, {}, {}
+        skipped = set()
+        finished, started = set(), set()
+        calls_before = sum(agent.calls for agent in self.agents.values())
+        run_start = time.monotonic()
+        
+        def run(unit: str) -> Dict[str, str]:
+            start = time.monotonic()
+            paths = self.units[unit]
+            current = {}
+            for path in paths:
+                keys[path] = self.input_key(entries[path], files)
+                current[path] = self._up_to_date(path, keys[path])
+            
+            def written(path: str):
+                timings[path] = {'start': start - run_start, 'duration': time.monotonic() - start}
+            
+            if all(content is not None for content in current.values()):
+                skipped.update(paths)
+                for path in paths:
+                    written(path)
+                contents = current
+            else:
+                contents = self._generate_unit(unit, files, current, written)
+                skipped.update(path for path in paths if current[path] is not None)
+                if self.validate:
+                    # Dependents are not started until this returns the repaired files
+                    unit_failing, _ = self._validate_and_fix(
+                        [entries[path] for path in paths], contents, dict(files, **contents),
+                        pending=len(finished) + 1 < len(dag.steps))
+                    failing.update(unit_failing)
+            unit_timings[unit] = {'start': start - run_start, 'duration': time.monotonic() - start}
+            return contents
+        
+        def record(path: str):
+            if files[path].startswith(ERROR_MARKER) or failing.get(path):
+                # Never record a failure as built: retry it next run
+                self.manifest.pop(path, None)
+            else:
+                self.manifest[path] = {'key': keys[path], 'sha256': self._hash(files[path])}
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {}
+            while len(finished) < len(dag.steps):
+                for step in dag.ready(finished, started):
+                    started.add(step.id)
+                    pending[executor.submit(run, step.id)] = step.id
+                
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    unit = pending.pop(future)
+                    try:
+                        files.update(future.result())
+                    except Exception as e:
+                        files.update({path: f"{ERROR_MARKER} {e}" for path in self.units[unit]})
+                        unit_timings.setdefault(unit, {'start': 0.0, 'duration': 0.0})
+                    finished.add(unit)
+                    for path in self.units[unit]:
+                        timings.setdefault(path, {'start': 0.0, 'duration': 0.0})
+                        if path in skipped:
+                            print(f"⏭️  Up to date: {path}")
+                            continue
+                        record(path)
+                        print(f"✅ Created: {path} ({timings[path]['duration']:.1f}s)")
+                    self._save_manifest()
+            
+            validation = None
+            if self.validate:
+                validation = self._converge(entries, files, executor)
+                failing = self._errors_by_file(validation)
+                for path in entries:
+                    record(path)
+        
+        for path in set(self.manifest) - set(entries):
+            del self.manifest[path]
+        self._save_manifest()
+        
+        build = None
+        if self.build and not (validation and validation['errors']):
+            build = self._build(entries)
+        
+        path, path_time = dag.critical_path(unit_timings)
+        return {
+            'files': files,
+            'generated': sorted(set(entries) - skipped),
+            'skipped': sorted(skipped),
+            'timings': timings,
+            'calls': sum(agent.calls for agent in self.agents.values()) - calls_before,
+            'wall_time': time.monotonic() - run_start,
+            'total_time': sum(t['duration'] for t in unit_timings.values()),
+            'critical_path': path,
+            'critical_path_time': path_time,
+            'validation': validation,
+            'fix_attempts': dict(self.fix_attempts),
+            'build': build
+        }
+    
+    def _build(self, entries: dict) -> Dict[str, dict]:
+        """Bundle each HTML page of the manifest; a page that cannot be built reports why"""
+        bundler = load_bundler()
+        results = {}
+        for path in sorted(p for p in entries if p.endswith('.html')):
+            try:
+                results[path] = bundler.build_page(self.project_dir / path)
+            except (bundler.BuildError, OSError) as e:
+                results[path] = {'error': str(e)}
+        return results
+    
+    def _converge(self, entries: dict, files: dict, executor) -> dict:
+        """Project-wide pass once every file exists; repairs what it finds concurrently"""
+        report = self.engine.validate_project(self.project_dir)
+        fixable = self.swarm.validation_module().FIXABLE_RULES
+        broken = {path for path, errors in self._errors_by_file(report).items()
+                  if not files[path].startswith(ERROR_MARKER)
+                  and (self.fix_attempts.get(path, 0) < self.max_fix_attempts
+                       or any(issue['rule'] in fixable for issue in errors))}
+        if not broken:
+            return report
+        
+        print(f"\n🔍 Project check found errors in {len(broken)} file(s), repairing...")
+        contents = {path: files[path] for path in broken}
+        _, report = self._validate_and_fix([entries[path] for path in sorted(broken)],
+                                           contents, files, False, executor, report)
+        files.update(contents)
+        return report
+
+TODO_INDEX_HTML = """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -111,41 +688,24 @@ def create_todo_app():
     </script>
 </body>
 </html>"""
-    (frontend_dir / "index.html").write_text(html_code)
-    print("✅ Created: frontend/index.html")
-    
-    # Generate Backend Files
-    print("\n⚙️ BACKEND TEAM WORKING...")
-    
-    # 1. Express Server
-    server_code = backend_agent.generate_code(
-        "Create an Express.js server with REST API endpoints for todos: GET /todos, POST /todos, PUT /todos/:id, DELETE /todos/:id. Use in-memory storage for now. Include CORS support.",
-        "server.js"
-    )
-    (backend_dir / "server.js").write_text(server_code)
-    print("✅ Created: backend/server.js")
-    
-    # 2. Package.json for backend
-    package_json = {
-        "name": "todo-backend",
-        "version": "1.0.0",
-        "description": "Todo API built by Claude Swarm",
-        "main": "server.js",
-        "scripts": {
-            "start": "node server.js",
-            "dev": "nodemon server.js"
-        },
-        "dependencies": {
-            "express": "^4.18.0",
-            "cors": "^2.8.5",
-            "body-parser": "^1.20.0"
-        }
+
+TODO_PACKAGE_JSON = {
+    "name": "todo-backend",
+    "version": "1.0.0",
+    "description": "Todo API built by Claude Swarm",
+    "main": "server.js",
+    "scripts": {
+        "start": "node server.js",
+        "dev": "nodemon server.js"
+    },
+    "dependencies": {
+        "express": "^4.18.0",
+        "cors": "^2.8.5",
+        "body-parser": "^1.20.0"
     }
-    (backend_dir / "package.json").write_text(json.dumps(package_json, indent=2))
-    print("✅ Created: backend/package.json")
-    
-    # 3. README
-    readme_code = """# Todo App - Built by Claude Swarm 🤖
+}
+
+TODO_README = """# Todo App - Built by Claude Swarm 🤖
 
 This application was generated by multiple AI agents working in parallel!
 
@@ -197,11 +757,78 @@ The API will run on http://localhost:3001
 - Frontend Agent (React Developer)
 - Backend Agent (Node.js Developer)
 - Orchestrated by Claude Swarm!
+"""
 
-Generated on: """ + str(time.strftime("%Y-%m-%d %H:%M:%S"))
+def todo_app_manifest() -> list:
+    """Files of the todo app; App.js is generated against TodoItem.js
+    
+    The frontend files form one group, written by a single call in
+    multi-file mode.
+    """
+    return [
+        {'path': 'frontend/TodoItem.js', 'agent': 'frontend', 'group': 'frontend',
+         'task': "Create a React TodoItem component that displays a single todo with checkbox, text, and delete button"},
+        {'path': 'frontend/App.js', 'agent': 'frontend', 'group': 'frontend',
+         'depends_on': ['frontend/TodoItem.js'],
+         'task': "Create a React App component for a todo list with add, delete, and toggle complete functionality. Use hooks and modern React patterns."},
+        {'path': 'frontend/App.css', 'agent': 'frontend', 'group': 'frontend',
+         'task': "Create CSS styles for a modern, clean todo app with nice colors and transitions"},
+        {'path': 'frontend/index.html', 'content': TODO_INDEX_HTML},
+        {'path': 'backend/server.js', 'agent': 'backend',
+         'task': "Create an Express.js server with REST API endpoints for todos: GET /todos, POST /todos, PUT /todos/:id, DELETE /todos/:id. Use in-memory storage for now. Include CORS support."},
+        {'path': 'backend/package.json', 'content': json.dumps(TODO_PACKAGE_JSON, indent=2)},
+        {'path': 'README.md', 'content': TODO_README},
+    ]
+
+def create_todo_app(project_dir: str = "/workspace/projects/todo-app"):
+    """Create a complete Todo application with React and Node.js"""
+    
+    print("🚀 Creating a REAL Todo Application using Claude Swarm!\n")
+    
+    project_dir = Path(project_dir)
+    project_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Opt-in response cache (SWARM_CACHE=1) makes unchanged re-runs instant
+    cache = load_swarm().ResponseCache() if os.environ.get('SWARM_CACHE') else None
+    
+    # Create agents
+    agents = {
+        'frontend': CodeGeneratorAgent("Frontend Dev", "React developer", cache),
+        'backend': CodeGeneratorAgent("Backend Dev", "Node.js developer", cache),
+    }
+    
+    print("🎨⚙️ FRONTEND AND BACKEND TEAMS WORKING IN PARALLEL...\n")
+    force = os.environ.get('SWARM_FORCE') == '1'
+    # SWARM_MULTI_FILE=0 generates grouped files with one call each
+    multi_file = os.environ.get('SWARM_MULTI_FILE') != '0'
+    # SWARM_BUILD=1 bundles the validated pages into frontend/dist
+    build = os.environ.get('SWARM_BUILD') == '1'
+    report = GenerationPipeline(project_dir, agents, force=force, multi_file=multi_file,
+                                build=build).run(todo_app_manifest())
+    
+    print(f"\n🔁 {len(report['generated'])} generated, {len(report['skipped'])} up to date, "
+          f"{report['calls']} model call(s)")
+    print(f"\n⏱️  Wall time {report['wall_time']:.1f}s "
+          f"(sum of files {report['total_time']:.1f}s)")
+    print(f"   Critical path ({report['critical_path_time']:.1f}s): "
+          f"{' -> '.join(report['critical_path'])}")
+    
+    # Every file was validated (and repaired) as it was generated
+    validation = report['validation']
+    fixed = sum(report['fix_attempts'].values())
+    print(f"\n🔍 Validation: {validation['errors']} errors, {validation['warnings']} warnings "
+          f"({fixed} regeneration(s) to fix errors)")
+    for issue in validation['issues']:
+        icon = "❌" if issue['severity'] == 'error' else "⚠️ "
+        print(f"   {icon} {issue['file']}: {issue['message']}")
     
-    (project_dir / "README.md").write_text(readme_code)
-    print("✅ Created: README.md")
+    for page, result in (report['build'] or {}).items():
+        if 'error' in result:
+            print(f"\n📦 Build skipped for {page}: {result['error']}")
+        else:
+            state = "up to date" if result['cached'] else f"built in {result['elapsed'] * 1000:.0f}ms"
+            print(f"\n📦 Bundled {page} -> dist/{result['page']} "
+                  f"({result['js']}, {result['bytes'] / 1024:.1f} KB, {state})")
     
     # Final summary
     print("\n" + "="*60)
@@ -210,7 +837,7 @@ Generated on: """ + str(time.strftime("%Y-%m-%d %H:%M:%S"))
     print(f"\nLocation: {project_dir}")
     print("\nTo run the app:")
     print("1. Open a new terminal/tab")
-    print("2. cd /workspace/projects/todo-app/frontend")
+    print(f"2. cd {project_dir / 'frontend'}")
     print("3. python3 -m http.server 8000")
     print("4. Open browser to http://localhost:8000")
     print("\nThe app is fully functional with:")
@@ -221,4 +848,7 @@ Generated on: """ + str(time.strftime("%Y-%m-%d %H:%M:%S"))
     print("\nThis is a REAL app generated by AI agents! 🚀")
 
 if __name__ == "__main__":
-    create_todo_app()
\ No newline at end of file
+    if len(sys.argv) > 1:
+        create_todo_app(sys.argv[1])
+    else:
+        create_todo_app()
\ No newline at end of file
@@ -5,10 +5,15 @@ Simple Claude Swarm Demo - See parallel agents in action!
 
 import os
 import time
+import queue
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from anthropic import Anthropic
 
+# Seconds each parallel round (and each request) may take before its
+# unfinished agents are reported as timed out
+TASK_TIMEOUT = float(os.environ.get('SWARM_TASK_TIMEOUT', 60))
+
 # Colors for output
 COLORS = {
     'lead': '\033[94m',      # Blue
@@ -25,8 +30,8 @@ class SimpleAgent:
         self.model = model
         self.client = Anthropic()
         
-    def work(self, task):
-        """Agent works on a task"""
+    def work(self, task, timeout=TASK_TIMEOUT):
+        """Agent works on a task, giving up after `timeout` seconds"""
         print(f"{COLORS.get(self.name, '')}[{self.name}] Starting: {task}{COLORS['reset']}")
         
         start_time = time.time()
@@ -37,7 +42,8 @@ class SimpleAgent:
             response = self.client.messages.create(
                 model=self.model,
                 max_tokens=200,
-                messages=[{"role": "user", "content": prompt}]
+                messages=[{"role": "user", "content": prompt}],
+                timeout=timeout
             )
             result = response.content[0].text
         except Exception as e:
@@ -47,6 +53,86 @@ class SimpleAgent:
         
         print(f"{COLORS.get(self.name, '')}[{self.name}] Completed in {elapsed:.1f}s{COLORS['reset']}")
         return result
+    
+    def work_stream(self, task, timeout=TASK_TIMEOUT):
+        """Agent works on a task, yielding text as it is generated"""
+        prompt = f"As a {self.role}, {task}. Be concise (2-3 sentences)."
+        
+        try:
+            with self.client.messages.stream(
+                model=self.model,
+                max_tokens=200,
+                messages=[{"role": "user", "content": prompt}],
+                timeout=timeout
+            ) as stream:
+                yield from stream.text_stream
+        except Exception as e:
+            yield f"Error: {str(e)}"
+
+def stream_parallel(agents, tasks, timeout=TASK_TIMEOUT):
+    """Run agents in parallel and print each delta, colored by agent, as it arrives"""
+    deadline = time.time() + timeout
+    deltas = queue.Queue()
+    first_output = {}
+    start_time = time.time()
+    
+    def run(name, task):
+        try:
+            for text in agents[name].work_stream(task, timeout):
+                deltas.put((name, text))
+        except Exception as e:
+            deltas.put((name, f"Error: {str(e)}"))
+        finally:
+            deltas.put((name, None))
+    
+    executor = ThreadPoolExecutor(max_workers=len(tasks))
+    try:
+        for name, task in tasks.items():
+            executor.submit(run, name, task)
+        
+        streaming = set(tasks)
+        while streaming:
+            try:
+                name, text = deltas.get(timeout=max(0, deadline - time.time()))
+            except queue.Empty:
+                for name in streaming:
+                    print(f"\n{COLORS.get(name, '')}[{name}] Error: no result within "
+                          f"{timeout:.0f}s{COLORS['reset']}", end='')
+                break
+            if text is None:
+                streaming.discard(name)
+                continue
+            first_output.setdefault(name, time.time() - start_time)
+            print(f"{COLORS.get(name, '')}{text}{COLORS['reset']}", end='', flush=True)
+    finally:
+        # A straggler's own request timeout ends its thread
+        executor.shutdown(wait=False)
+    
+    print()
+    return first_output
+
+def run_parallel(agents, tasks, timeout=TASK_TIMEOUT, on_result=None):
+    """Run tasks on their agents at once; agents not done by the deadline are reported"""
+    deadline = time.time() + timeout
+    results = {}
+    executor = ThreadPoolExecutor(max_workers=len(tasks))
+    future_to_agent = {
+        executor.submit(agents[name].work, task, timeout): name
+        for name, task in tasks.items()
+    }
+    try:
+        for future in as_completed(future_to_agent, timeout=max(0, deadline - time.time())):
+            agent_name = future_to_agent[future]
+            results[agent_name] = future.result()
+            if on_result:
+                on_result(agent_name, results[agent_name])
+    except TimeoutError:
+        for agent_name in future_to_agent.values():
+            results.setdefault(agent_name, f"Error: no result within {timeout:.0f}s")
+    finally:
+        # A straggler's own request timeout ends its thread
+        executor.shutdown(wait=False)
+    return results
 
 def run_parallel_demo():
     """Demonstrate parallel agent execution"""
@@ -91,19 +177,9 @@ def run_parallel_demo():
     print("="*60)
     
     parallel_start = time.time()
-    parallel_results = {}
     
     # Execute all tasks in parallel
-    with ThreadPoolExecutor(max_workers=len(agents)) as executor:
-        future_to_agent = {
-            executor.submit(agents[name].work, task): name 
-            for name, task in tasks.items()
-        }
-        
-        for future in future_to_agent:
-            agent_name = future_to_agent[future]
-            result = future.result()
-            parallel_results[agent_name] = result
+    parallel_results = run_parallel(agents, tasks)
     
     parallel_time = time.time() - parallel_start
     
@@ -134,18 +210,18 @@ def run_parallel_demo():
     
     print("Team working on implementation in parallel...\n")
     
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        future_to_agent = {
-            executor.submit(agents[name].work, task): name 
-            for name, task in collab_tasks.items()
-        }
-        
-        collab_results = {}
-        for future in future_to_agent:
-            agent_name = future_to_agent[future]
-            result = future.result()
-            collab_results[agent_name] = result
-            print(f"\n{agent_name} result: {result}")
+    collab_results = run_parallel(
+        agents, collab_tasks,
+        on_result=lambda agent_name, result: print(f"\n{agent_name} result: {result}"))
+    
+    # Demo 4: Streaming output
+    print("\n" + "="*60)
+    print("4️⃣  STREAMING Execution (output as it is generated):")
+    print("="*60 + "\n")
+    
+    first_output = stream_parallel(agents, tasks)
+    for agent_name, elapsed in first_output.items():
+        print(f"{COLORS.get(agent_name, '')}[{agent_name}] First output after {elapsed:.1f}s{COLORS['reset']}")
     
     print("\n" + "="*60)
     print("✅ DEMO COMPLETE!")
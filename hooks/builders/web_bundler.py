@@ -0,0 +1,601 @@
+#!/usr/bin/env python3
+"""
+Offline build for generated web pages
+
+Generated pages load React from unpkg and compile their text/babel
+scripts with @babel/standalone in the browser, on every page load. This
+build does that work once, in-process and without node:
+
+- JSX in the page's scripts (files and inline) is compiled to
+  React.createElement calls, and top-level const/let become var, as
+  Babel's preset-env did, so scripts can share one file;
+- scripts are ordered so each comes after the scripts defining the
+  components it uses (page order otherwise), then concatenated;
+- the result is minified (comments and redundant whitespace dropped);
+- React and ReactDOM UMD builds are vendored into the bundle from the
+  local cache, node_modules or, once, the network; Babel is dropped;
+- local stylesheets are minified into one file.
+
+The page is written to <page dir>/dist/ with content-hashed assets
+(index.<hash>.js, index.<hash>.css) that can be cached forever, and
+dist/.build.json records the input hash so an unchanged page is not
+rebuilt.
+
+    python hooks/builders/web_bundler.py projects/todo-app/frontend/index.html [--no-minify]
+
+Pages using ES module scripts (type="module") are not bundled.
+"""
+
+import os
+import re
+import sys
+import html
+import json
+import time
+import hashlib
+import importlib.util
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Bump when the output format changes, so cached builds are redone
+BUILD_VERSION = 1
+BUILD_FILE = '.build.json'
+VENDOR_CACHE = Path(os.environ.get('SWARM_VENDOR_CACHE',
+                                   Path.home() / '.cache' / 'claude-swarm' / 'vendor'))
+
+SCRIPT_TAG_RE = re.compile(r'<script\b([^>]*)>(.*?)</script\s*>', re.S | re.I)
+STYLESHEET_RE = re.compile(r'<link\b[^>]*\brel\s*=\s*["\']stylesheet["\'][^>]*>', re.I)
+HREF_RE = re.compile(r'\bhref\s*=\s*["\']([^"\']+)["\']', re.I)
+VENDOR_RE = re.compile(r'/(react|react-dom)@[^/]+/umd/[\w.-]+\.js$')
+BABEL_RE = re.compile(r'/@babel/standalone\b|/babel(?:\.min)?\.js$')
+PACKAGE_URL_RE = re.compile(r'/((?:@[\w.-]+/)?[\w.-]+)@[^/]+/(.+)$')
+NAME_RE = re.compile(r'[A-Za-z_$][\w$]*(?:[.:-][\w$]+)*')
+ATTR_RE = re.compile(r'[A-Za-z_$][\w$]*(?:[:-][\w$]+)*')
+IDENTIFIER_RE = re.compile(r'[A-Za-z_$][\w$]*$')
+JS_TYPES = {'text/babel', 'text/jsx', 'text/javascript', 'application/javascript'}
+
+# A '<' or '/' after one of these starts JSX or a regex literal, not a comparison or division
+EXPRESSION_PRECEDERS = set('(,=:[!&|?{};+-*%~^') | {''}
+EXPRESSION_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete',
+                       'void', 'throw', 'yield', 'await'}
+
+class BuildError(Exception):
+    """A page that cannot be bundled (the reason is the message)"""
+
+_validation = None
+
+def validation_module():
+    """hooks/validators/validation_engine.py, for the scripts' component facts"""
+    global _validation
+    if _validation is None:
+        path = Path(__file__).resolve().parent.parent / 'validators' / 'validation_engine.py'
+        spec = importlib.util.spec_from_file_location("validation_engine", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _validation = module
+    return _validation
+
+def line_of(text: str, index: int) -> int:
+    return text.count('\n', 0, index) + 1
+
+def skip_string(text: str, i: int) -> int:
+    """Index just past the quoted string starting at i"""
+    quote, i = text[i], i + 1
+    while i < len(text) and text[i] != quote:
+        if text[i] == '\n':
+            raise BuildError(f"Unterminated string literal on line {line_of(text, i)}")
+        i += 2 if text[i] == '\\' else 1
+    return i + 1
+
+def skip_template(text: str, i: int) -> int:
+    """Index just past the template literal starting at i, ${} expressions included"""
+    i += 1
+    while i < len(text):
+        c = text[i]
+        if c == '\\':
+            i += 2
+        elif c == '`':
+            return i + 1
+        elif text.startswith('${', i):
+            i, depth = i + 2, 1
+            while depth:
+                if i >= len(text):
+                    break
+                c = text[i]
+                if c in '"\'':
+                    i = skip_string(text, i)
+                    continue
+                if c == '`':
+                    i = skip_template(text, i)
+                    continue
+                depth += {'{': 1, '}': -1}.get(c, 0)
+                i += 1
+        else:
+            i += 1
+    raise BuildError(f"Unterminated template literal on line {line_of(text, i)}")
+
+def skip_regex(text: str, i: int) -> Optional[int]:
+    """Index just past the regex literal (and flags) starting at i, or None"""
+    j, in_class = i + 1, False
+    while j < len(text) and text[j] != '\n':
+        if text[j] == '\\':
+            j += 2
+            continue
+        if text[j] == '[':
+            in_class = True
+        elif text[j] == ']':
+            in_class = False
+        elif text[j] == '/' and not in_class:
+            j += 1
+            while j < len(text) and (text[j].isalnum() or text[j] == '_'):
+                j += 1
+            return j
+        j += 1
+    return None
+
+def jsx_text(text: str) -> str:
+    """JSX text as React sees it (Babel's whitespace rules, entities decoded)"""
+    lines = text.replace('\r\n', '\n').replace('\t', ' ').split('\n')
+    last = max((n for n, line in enumerate(lines) if line.strip()), default=-1)
+    out = ''
+    for n, line in enumerate(lines):
+        if n:
+            line = line.lstrip(' ')
+        if n < len(lines) - 1:
+            line = line.rstrip(' ')
+        if line:
+            out += line if n == last else line + ' '
+    return html.unescape(out)
+
+class JSXCompiler:
+    """Compiles JSX in one script to React.createElement calls
+
+    A char-level pass that copies JavaScript through unchanged, keeping
+    track of strings, templates, comments and regex literals, and compiles
+    each element it finds at an expression position.
+    """
+
+    def __init__(self, source: str):
+        self.src = source
+
+    def compile(self) -> str:
+        code, end = self.js(0, top=True)
+        if end < len(self.src):
+            raise BuildError(f"Unexpected '{self.src[end]}' on line {line_of(self.src, end)}")
+        return code
+
+    def js(self, i: int, closing: str = None, top: bool = False) -> Tuple[str, int]:
+        """JavaScript from i with JSX compiled, up to an unmatched `closing` bracket
+
+        Returns the code and the index of that bracket (or the end).
+        """
+        src, out = self.src, []
+        depth, prev, word, prev_at = 0, '', '', -1
+        while i < len(src):
+            c = src[i]
+            if c in ' \t\r\n':
+                out.append(c)
+                i += 1
+                continue
+            if src.startswith('//', i):
+                end = src.find('\n', i)
+                end = len(src) if end < 0 else end
+                out.append(src[i:end])
+                i = end
+                continue
+            if src.startswith('/*', i):
+                end = src.find('*/', i + 2)
+                if end < 0:
+                    raise BuildError(f"Unterminated comment on line {line_of(src, i)}")
+                out.append(src[i:end + 2])
+                i = end + 2
+                continue
+            start = i
+            expression = (prev in EXPRESSION_PRECEDERS or word in EXPRESSION_KEYWORDS
+                          or (prev == '>' and src[prev_at - 1:prev_at + 1] == '=>'))
+            if c in '"\'':
+                i = skip_string(src, i)
+            elif c == '`':
+                i = skip_template(src, i)
+            elif c == '/' and expression and skip_regex(src, i):
+                i = skip_regex(src, i)
+            elif c == '<' and expression and i + 1 < len(src) and (src[i + 1].isalpha()
+                                                                    or src[i + 1] == '>'):
+                code, i = self.element(i)
+                out.append(code)
+                prev, word, prev_at = ')', '', i - 1
+                continue
+            if i > start:
+                out.append(src[start:i])
+                prev, word, prev_at = 'a', '', i - 1
+                continue
+
+            if c in '([{':
+                depth += 1
+            elif c in ')]}':
+                if depth == 0:
+                    if closing is None:
+                        raise BuildError(f"Unexpected '{c}' on line {line_of(src, i)}")
+                    return ''.join(out), i
+                depth -= 1
+            if c.isalnum() or c in '_$':
+                if not (prev.isalnum() or prev in ('_', '$')):
+                    # Top-level const/let become var, so scripts can share one file
+                    keyword = re.match(r'(const|let)\s', src[i:i + 6])
+                    if top and depth == 0 and keyword:
+                        out.append('var')
+                        i += len(keyword.group(1))
+                        prev, word, prev_at = 'r', 'var', i - 1
+                        continue
+                word = word + c if prev.isalnum() or prev in ('_', '$') else c
+            else:
+                word = ''
+            out.append(c)
+            prev, prev_at = c, i
+            i += 1
+        if closing is not None:
+            raise BuildError(f"Unclosed '{{' at end of script")
+        return ''.join(out), i
+
+    def skip_ws(self, i: int) -> int:
+        while i < len(self.src) and self.src[i] in ' \t\r\n':
+            i += 1
+        return i
+
+    def expression(self, i: int) -> Tuple[str, int]:
+        """The compiled JS inside {...} starting at i, and the index past the '}'"""
+        code, end = self.js(i + 1, closing='}')
+        return code.strip(), end + 1
+
+    def element(self, i: int) -> Tuple[str, int]:
+        """Compile the JSX element starting at i; returns the code and the index past it"""
+        src, opened = self.src, i
+        i = self.skip_ws(i + 1)
+        name, props = None, []
+        if src.startswith('>', i):
+            i += 1
+        else:
+            match = NAME_RE.match(src, i)
+            if not match:
+                raise BuildError(f"Bad JSX tag on line {line_of(src, i)}")
+            name, i = match.group(), match.end()
+            while True:
+                i = self.skip_ws(i)
+                if src.startswith('/>', i):
+                    return self.create(name, props, []), i + 2
+                if src.startswith('>', i):
+                    i += 1
+                    break
+                if src.startswith('{', i):
+                    spread, i = self.expression(i)
+                    props.append(('...', spread[3:].strip() if spread.startswith('...') else spread))
+                    continue
+                match = ATTR_RE.match(src, i)
+                if not match:
+                    raise BuildError(f"Bad JSX attribute on line {line_of(src, i)}")
+                attr, i = match.group(), self.skip_ws(match.end())
+                value = 'true'
+                if src.startswith('=', i):
+                    i = self.skip_ws(i + 1)
+                    if i < len(src) and src[i] in '"\'':
+                        end = src.find(src[i], i + 1)
+                        if end < 0:
+                            raise BuildError(f"Unterminated attribute on line {line_of(src, i)}")
+                        value, i = json.dumps(html.unescape(src[i + 1:end])), end + 1
+                    elif src.startswith('{', i):
+                        value, i = self.expression(i)
+                    elif src.startswith('<', i):
+                        value, i = self.element(i)
+                    else:
+                        raise BuildError(f"Bad JSX attribute value on line {line_of(src, i)}")
+                props.append((attr, value))
+
+        children = []
+        while True:
+            if i >= len(src):
+                raise BuildError(f"Unclosed <{name or ''}> opened on line {line_of(src, opened)}")
+            if src.startswith('</', i):
+                end = src.find('>', i)
+                closing = src[i + 2:end].strip() if end >= 0 else None
+                if closing != (name or ''):
+                    raise BuildError(f"Expected </{name or ''}> on line {line_of(src, i)}, "
+                                     f"found </{closing}>")
+                i = end + 1
+                break
+            if src.startswith('<', i):
+                child, i = self.element(i)
+                children.append(child)
+            elif src.startswith('{', i):
+                child, i = self.expression(i)
+                if re.sub(r'/\*.*?\*/|//[^\n]*', '', child, flags=re.S).strip():
+                    children.append(child)
+            else:
+                end = min([j for j in (src.find('<', i), src.find('{', i)) if j >= 0],
+                          default=len(src))
+                text = jsx_text(src[i:end])
+                if text:
+                    children.append(json.dumps(text))
+                i = end
+        return self.create(name, props, children), i
+
+    @staticmethod
+    def create(name: Optional[str], props: List[Tuple[str, str]], children: List[str]) -> str:
+        if name is None:
+            kind = 'React.Fragment'
+        elif name[0].islower() and '.' not in name:
+            kind = json.dumps(name)
+        else:
+            kind = name
+        if props:
+            fields = [f"...{value}" if key == '...' else
+                      f"{key if IDENTIFIER_RE.match(key) else json.dumps(key)}: {value}"
+                      for key, value in props]
+            attributes = '{' + ', '.join(fields) + '}'
+        else:
+            attributes = 'null'
+        return f"React.createElement({', '.join([kind, attributes] + children)})"
+
+def compile_jsx(source: str) -> str:
+    """A script with its JSX compiled and top-level const/let turned into var"""
+    return JSXCompiler(source).compile()
+
+def minify_js(source: str) -> str:
+    """Drop comments and whitespace that cannot matter
+
+    Line breaks are kept wherever automatic semicolon insertion could
+    depend on them, so the result runs exactly like the input.
+    """
+    out, i, n = [], 0, len(source)
+    prev, word = '', ''
+    pending = None  # whitespace run to emit before the next token: ' ' or '\n'
+
+    def emit(token: str):
+        nonlocal pending
+        if pending and out:
+            last, first = out[-1][-1], token[0]
+            identifier = lambda ch: ch.isalnum() or ch in '_$\\' or ord(ch) > 127
+            if pending == '\n' and not (last in '{;,([' or first in '})],;'):
+                out.append('\n')
+            elif identifier(last) and identifier(first) or last == first and last in '+-' \
+                    or last in '+-' and first in '+-':
+                out.append(' ')
+        pending = None
+        out.append(token)
+
+    while i < n:
+        c = source[i]
+        if c in ' \t\r\n':
+            if c == '\n' or pending == '\n':
+                pending = '\n'
+            else:
+                pending = pending or ' '
+            i += 1
+            continue
+        if source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end < 0 else end
+            continue
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            pending = pending or ' '
+            continue
+        start = i
+        if c in '"\'':
+            i = skip_string(source, i)
+        elif c == '`':
+            i = skip_template(source, i)
+        elif c == '/' and (prev in EXPRESSION_PRECEDERS or word in EXPRESSION_KEYWORDS) \
+                and skip_regex(source, i):
+            i = skip_regex(source, i)
+        if i > start:
+            emit(source[start:i])
+            prev, word = 'a', ''
+            continue
+        if c.isalnum() or c in '_$':
+            end = i
+            while end < n and (source[end].isalnum() or source[end] in '_$'):
+                end += 1
+            word = source[i:end]
+            emit(word)
+            prev, i = 'a', end
+            continue
+        emit(c)
+        prev, word = c, ''
+        i += 1
+    return ''.join(out) + '\n'
+
+def minify_css(source: str) -> str:
+    """Drop comments and whitespace around CSS punctuation (strings are kept)"""
+    parts = re.split(r'("(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\')', source)
+    for n in range(0, len(parts), 2):
+        text = re.sub(r'/\*.*?\*/', '', parts[n], flags=re.S)
+        text = re.sub(r'\s+', ' ', text)
+        parts[n] = re.sub(r'\s*([{}:;,>])\s*', r'\1', text).replace(';}', '}')
+    return ''.join(parts).strip() + '\n'
+
+def vendor_script(url: str, project: Path = None) -> str:
+    """A third-party script (React UMD build) from the vendor cache
+
+    On a cache miss the file is taken from a node_modules directory above
+    the project, or downloaded once; later builds need no network.
+    """
+    name = f"{hashlib.sha256(url.encode()).hexdigest()[:16]}-{url.rsplit('/', 1)[-1]}"
+    cached = VENDOR_CACHE / name
+    if cached.exists():
+        return cached.read_text()
+    package = PACKAGE_URL_RE.search(url)
+    text = None
+    if package and project is not None:
+        for directory in [project, *project.parents]:
+            candidate = directory / 'node_modules' / package.group(1) / package.group(2)
+            if candidate.exists():
+                text = candidate.read_text()
+                break
+    if text is None:
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                text = response.read().decode()
+        except OSError as e:
+            raise BuildError(f"Cannot vendor {url}: not cached, not in node_modules "
+                             f"and the download failed ({e})")
+    VENDOR_CACHE.mkdir(parents=True, exist_ok=True)
+    tmp = cached.with_name(f".{name}.tmp")
+    tmp.write_text(text)
+    os.replace(tmp, cached)
+    return text
+
+def order_scripts(parts: List[dict]) -> List[dict]:
+    """Scripts ordered so each follows the scripts defining the components it uses
+
+    Page order is kept wherever it does not matter, and for cycles
+    (components that use each other are only called after loading).
+    """
+    defined_by: Dict[str, int] = {}
+    for index, part in enumerate(parts):
+        for name in part['defines']:
+            defined_by.setdefault(name, index)
+    needs = [{defined_by[name] for name in part['uses'] if defined_by.get(name, index) != index}
+             for index, part in enumerate(parts)]
+    ordered, done = [], set()
+    while len(ordered) < len(parts):
+        ready = [index for index in range(len(parts)) if index not in done and needs[index] <= done]
+        index = ready[0] if ready else min(set(range(len(parts))) - done)
+        done.add(index)
+        ordered.append(parts[index])
+    return ordered
+
+def _write(path: Path, content: str):
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(content)
+    os.replace(tmp, path)
+
+def build_page(page, out_dir=None, minify: bool = True) -> dict:
+    """Bundle one HTML page and its scripts and stylesheets into out_dir (default <page dir>/dist)"""
+    start = time.monotonic()
+    page = Path(page)
+    root = page.parent
+    out_dir = Path(out_dir) if out_dir else root / 'dist'
+    document = page.read_text()
+
+    parts, vendors, remove = [], [], []
+    for match in SCRIPT_TAG_RE.finditer(document):
+        attrs, body = match.group(1), match.group(2)
+        src = re.search(r'\bsrc\s*=\s*["\']([^"\']+)["\']', attrs, re.I)
+        kind = re.search(r'\btype\s*=\s*["\']([^"\']+)["\']', attrs, re.I)
+        kind = kind.group(1).lower() if kind else 'text/javascript'
+        if kind == 'module':
+            raise BuildError(f"{page.name} uses ES module scripts, which are not bundled")
+        if kind not in JS_TYPES:
+            continue
+        if src and src.group(1).startswith(('http:', 'https:', '//')):
+            url = src.group(1)
+            if VENDOR_RE.search(url):
+                vendors.append(url)
+                remove.append(match.span())
+            elif BABEL_RE.search(url):
+                remove.append(match.span())
+            continue
+        if src:
+            path = root / src.group(1)
+            if not path.is_file():
+                raise BuildError(f"Script '{src.group(1)}' not found")
+            label, code = src.group(1), path.read_text()
+        else:
+            label, code = f"inline script {len(parts) + 1}", body
+        try:
+            compiled = compile_jsx(code) if kind in ('text/babel', 'text/jsx') else code
+        except BuildError as e:
+            raise BuildError(f"{label}: {e}")
+        facts = validation_module().analyze_js(code)
+        parts.append({'label': label, 'source': code, 'code': compiled,
+                      'defines': facts['defines'], 'uses': facts['uses']})
+        remove.append(match.span())
+
+    styles = []
+    for match in STYLESHEET_RE.finditer(document):
+        href = HREF_RE.search(match.group())
+        if href and not href.group(1).startswith(('http:', 'https:', '//')) \
+                and (root / href.group(1)).is_file():
+            styles.append((root / href.group(1)).read_text())
+            remove.append(match.span())
+    if not parts:
+        raise BuildError(f"{page.name} has no local scripts to bundle")
+
+    key = hashlib.sha256(json.dumps(
+        [BUILD_VERSION, minify, document, vendors, [part['source'] for part in parts], styles]
+    ).encode()).hexdigest()
+    try:
+        record = json.loads((out_dir / BUILD_FILE).read_text())
+    except (OSError, ValueError):
+        record = {}
+    previous = record.get(page.name)
+    if previous and previous['key'] == key and all(
+            (out_dir / previous[asset]).exists() for asset in ('page', 'js', 'css') if previous.get(asset)):
+        return dict(previous, cached=True, elapsed=time.monotonic() - start)
+
+    app = ';\n'.join(f"/* {part['label']} */\n{part['code']}" for part in order_scripts(parts))
+    if minify:
+        app = minify_js(app)
+    bundle = ';\n'.join([vendor_script(url, root) for url in vendors] + [app])
+    stem = page.stem
+    js_name = f"{stem}.{hashlib.sha256(bundle.encode()).hexdigest()[:10]}.js"
+    css = ''.join(minify_css(style) if minify else style for style in styles)
+    css_name = f"{stem}.{hashlib.sha256(css.encode()).hexdigest()[:10]}.css" if styles else None
+
+    # Drop the replaced tags (last first, so spans stay valid); assets go where the first ones were
+    first_script = min(span[0] for span in remove if document[span[0]:span[0] + 7].lower() == '<script')
+    first_style = min((span[0] for span in remove if document[span[0]:span[0] + 5].lower() == '<link'),
+                      default=None)
+    output = document
+    for begin, end in sorted(remove, reverse=True):
+        if begin == first_script:
+            output = output[:begin] + f'<script defer src="{js_name}"></script>' + output[end:]
+        elif begin == first_style:
+            output = output[:begin] + f'<link rel="stylesheet" href="{css_name}">' + output[end:]
+        else:
+            # Take the tag's now-empty line with it
+            line_start = output.rfind('\n', 0, begin) + 1
+            if not output[line_start:begin].strip() and output[end:end + 1] == '\n':
+                begin, end = line_start, end + 1
+            output = output[:begin] + output[end:]
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    _write(out_dir / js_name, bundle)
+    if css_name:
+        _write(out_dir / css_name, css)
+    _write(out_dir / page.name, output)
+    for stale in out_dir.glob(f"{stem}.*"):
+        if stale.name not in (js_name, css_name, page.name) and re.fullmatch(
+                rf"{re.escape(stem)}\.[0-9a-f]{{10}}\.(?:js|css)", stale.name):
+            stale.unlink()
+
+    result = {'page': page.name, 'key': key, 'js': js_name, 'css': css_name,
+              'scripts': [part['label'] for part in order_scripts(parts)],
+              'vendored': vendors, 'bytes': len(bundle.encode()) + len(css.encode())}
+    record[page.name] = result
+    _write(out_dir / BUILD_FILE, json.dumps(record, indent=2, sort_keys=True))
+    return dict(result, cached=False, elapsed=time.monotonic() - start)
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if not args:
+        print("Usage: python web_bundler.py <page.html> [...] [--no-minify]")
+        return 2
+    failed = 0
+    for page in args:
+        try:
+            result = build_page(page, minify='--no-minify' not in sys.argv)
+        except (BuildError, OSError) as e:
+            print(f"[BUNDLER] ❌ {page}: {e}")
+            failed += 1
+            continue
+        state = 'up to date' if result['cached'] else f"built in {result['elapsed'] * 1000:.0f}ms"
+        print(f"[BUNDLER] ✅ {page} -> dist/{result['page']} ({result['js']}, "
+              f"{result['bytes'] / 1024:.1f} KB, {state})")
+        print(f"[BUNDLER]    Script order: {' -> '.join(result['scripts'])}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
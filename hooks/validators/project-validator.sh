@@ -5,6 +5,16 @@
 PROJECT_ROOT="$1"
 CHANGED_FILE="$2"
 
+# Run all checks in one process when python3 is available; set
+# LEGACY_VALIDATOR=1 to use the per-file node/grep checks below instead.
+# For continuous validation while agents write, run the engine with
+# --watch (or SwarmOrchestrator.watch_project), which re-checks only the
+# changed file and the files that depend on it.
+if [ -z "$LEGACY_VALIDATOR" ] && command -v python3 > /dev/null 2>&1; then
+    echo "[PROJECT-VALIDATOR] Triggered by change to: $CHANGED_FILE"
+    exec python3 "$(dirname "$0")/validation_engine.py" "$PROJECT_ROOT"
+fi
+
 echo "[PROJECT-VALIDATOR] Validating entire project: $PROJECT_ROOT"
 echo "[PROJECT-VALIDATOR] Triggered by change to: $CHANGED_FILE"
 
@@ -0,0 +1,1042 @@
+#!/usr/bin/env python3
+"""
+In-process project validator
+
+Runs the checks encoded in syntax-check.sh, react-check.sh,
+project-validator.sh and testers/run-integration-test.js without spawning
+node or grep: every project file is read once, analyzed once (in parallel
+across files) and the per-file facts are combined for the project-wide
+checks. Per-file results are cached by content hash, in memory and in
+<project>/.swarm-validation.json, so re-validating after an edit only
+re-analyzes the files that changed.
+
+    python hooks/validators/validation_engine.py projects/todo-app [--json]
+
+Exit status is 1 when any error is found, like project-validator.sh.
+With --watch the project stays open: after the first scan, each change
+re-checks only the changed files and the files depending on them (script
+tags, imports, components and window globals), typically in a few
+milliseconds. inotify is used on Linux, mtime polling elsewhere (--poll).
+JavaScript syntax is checked with a structural scan (strings, comments,
+templates, regex literals and bracket balance) rather than a full parser:
+it accepts JSX, fragments and newer syntax that the hooks' `new Function`
+check rejected, and still catches truncated or mangled generations.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import ctypes
+import select
+import struct
+import hashlib
+import threading
+import ctypes.util
+from pathlib import Path
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+# Bump when checks change, so cached results are not reused
+RULES_VERSION = 3
+CACHE_FILE = '.swarm-validation.json'
+
+LANGUAGES = {'.js': 'js', '.jsx': 'js', '.mjs': 'js', '.cjs': 'js',
+             '.html': 'html', '.htm': 'html', '.css': 'css', '.json': 'json'}
+BLOCK_LANGUAGES = {'js': 'js', 'javascript': 'js', 'jsx': 'js', 'html': 'html',
+                   'css': 'css', 'json': 'json'}
+SKIP_DIRS = {'node_modules', '.git', '__pycache__', 'dist'}
+REACT_BUILTINS = {'React', 'Fragment', 'StrictMode', 'Suspense', 'Profiler'}
+
+HOOK_RE = re.compile(r'\b(useState|useEffect|useContext|useReducer|useMemo|useCallback|useRef)\(')
+COMPONENT_DEF_RE = re.compile(r'\b(?:function|const|let|var|class)\s+([A-Z]\w*)')
+COMPONENT_USE_RE = re.compile(r'<([A-Z]\w*)')
+JSX_RE = re.compile(r'<[A-Za-z][\w.]*(?:\s[^<>]*)?/?>')
+COMPONENT_FN_RE = re.compile(r'function\s+\w+\s*\(|const\s+\w+\s*=\s*(?:\(|\w+\s*=>)')
+IMPORT_RE = re.compile(r'^\s*import\s', re.M)
+EXPORT_RE = re.compile(r'^\s*export\s', re.M)
+REQUIRE_RE = re.compile(r'\brequire\s*\(')
+REACT_DESTRUCTURE_RE = re.compile(r'=\s*React\s*;?')
+SCRIPT_RE = re.compile(r'<script\b([^>]*)>(.*?)</script\s*>', re.S | re.I)
+SRC_RE = re.compile(r'\bsrc\s*=\s*["\']([^"\']+)["\']', re.I)
+TYPE_RE = re.compile(r'\btype\s*=\s*["\']([^"\']+)["\']', re.I)
+IMPORT_SPEC_RE = re.compile(r'^\s*import\s+(?:([\w$*{}\s,]+?)\s+from\s*)?["\']([^"\']+)["\']', re.M)
+REQUIRE_SPEC_RE = re.compile(r'\brequire\s*\(\s*["\']([^"\']+)["\']\s*\)')
+EXPORT_DECL_RE = re.compile(r'^\s*export\s+(default\s+)?(?:async\s+)?(?:function\*?|class|const|let|var)?\s*([A-Za-z_$][\w$]*)?', re.M)
+EXPORT_LIST_RE = re.compile(r'^\s*export\s*\{([^}]*)\}', re.M)
+COMMONJS_EXPORT_RE = re.compile(r'^\s*export\s*\*|\bmodule\.exports\b|\bexports\.\w+\s*=', re.M)
+WINDOW_GLOBAL_RE = re.compile(r'\bwindow\.([A-Za-z_$][\w$]*)\s*=(?!=)')
+MODULE_SUFFIXES = ('', '.js', '.jsx', '.mjs', '.cjs', '.json', '/index.js', '/index.jsx')
+
+# A '/' after one of these starts a regex literal rather than a division
+REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%~^') | {''}
+REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete',
+                  'void', 'throw', 'yield', 'await'}
+
+def make_issue(rule: str, severity: str, message: str, line: int = None) -> dict:
+    issue = {'rule': rule, 'severity': severity, 'message': message}
+    if line:
+        issue['line'] = line
+    return issue
+
+def scan_structure(text: str, language: str = 'js') -> Optional[Tuple[str, int]]:
+    """Find the first structural error as (message, line), or None
+
+    Tracks strings, comments, template literals (with ${} nesting) and
+    regex literals so that only real brackets are matched. In JSX, quotes
+    inside element text are not strings, so an unterminated quote is
+    skipped instead of reported.
+    """
+    jsx = language == 'js' and JSX_RE.search(text) is not None
+    stack: List[Tuple[str, int]] = []
+    pairs = {')': '(', ']': '[', '}': '{'}
+    i, n, line = 0, len(text), 1
+    prev, word = '', ''
+
+    while i < n:
+        if stack and stack[-1][0] == '`':
+            # Inside a template literal: text until ` or ${
+            c = text[i]
+            if c == '\\':
+                i += 2
+                continue
+            if c == '\n':
+                line += 1
+            elif c == '`':
+                stack.pop()
+                prev, word = 'a', ''
+            elif text.startswith('${', i):
+                stack.append(('${', line))
+                prev, word = '{', ''
+                i += 2
+                continue
+            i += 1
+            continue
+
+        c = text[i]
+        if c == '\n':
+            line += 1
+            i += 1
+            continue
+        if c in ' \t\r':
+            i += 1
+            continue
+        if text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            if end < 0:
+                return "Unterminated comment", line
+            line += text.count('\n', i, end)
+            i = end + 2
+            continue
+        if language != 'css' and text.startswith('//', i):
+            end = text.find('\n', i)
+            i = n if end < 0 else end
+            continue
+        if c in '"\'':
+            j = i + 1
+            while j < n and text[j] not in (c, '\n'):
+                j += 2 if text[j] == '\\' else 1
+            if j >= n or text[j] == '\n':
+                if jsx:
+                    i += 1
+                    continue
+                return "Unterminated string literal", line
+            i = j + 1
+            prev, word = 'a', ''
+            continue
+        if c == '`' and language == 'js':
+            stack.append(('`', line))
+            i += 1
+            continue
+        if c == '/' and language == 'js' and (prev in REGEX_PRECEDERS or word in REGEX_KEYWORDS) \
+                and not (jsx and (prev == '<' or text.startswith('/>', i))):
+            j, in_class = i + 1, False
+            while j < n and text[j] != '\n':
+                if text[j] == '\\':
+                    j += 2
+                    continue
+                if text[j] == '[':
+                    in_class = True
+                elif text[j] == ']':
+                    in_class = False
+                elif text[j] == '/' and not in_class:
+                    break
+                j += 1
+            if j < n and text[j] == '/':
+                i = j + 1
+                prev, word = 'a', ''
+                continue
+        if c in '([{':
+            stack.append((c, line))
+        elif c in ')]}':
+            if not stack or stack[-1][0] != pairs[c] and not (c == '}' and stack[-1][0] == '${'):
+                return f"Unexpected '{c}'", line
+            stack.pop()
+
+        if c.isalnum() or c in '_$':
+            word = word + c if prev.isalnum() or prev in ('_', '$') else c
+        else:
+            word = ''
+        prev = c
+        i += 1
+
+    if stack:
+        opener, opened = stack[-1]
+        return f"Unclosed '{opener}' opened on line {opened}", opened
+    return None
+
+def module_imports(text: str) -> List[list]:
+    """[specifier, [imported names]] for each import and require()
+
+    'default' stands for a default import and '*' for a namespace import
+    or require(), which need no particular export.
+    """
+    imports = []
+    for clause, spec in IMPORT_SPEC_RE.findall(text):
+        names = []
+        default, _, braces = clause.partition('{')
+        for part in default.split(','):
+            part = part.strip()
+            if part:
+                names.append('*' if part.startswith('*') else 'default')
+        for item in braces.rstrip('} \n').split(','):
+            name = item.split(' as ')[0].strip()
+            if name:
+                names.append(name)
+        imports.append([spec, names])
+    imports += [[spec, ['*']] for spec in REQUIRE_SPEC_RE.findall(text)]
+    return imports
+
+def module_exports(text: str) -> List[str]:
+    """Names a module exports ('default' for its default export, '*' if unknowable)"""
+    names = set()
+    for default, name in EXPORT_DECL_RE.findall(text):
+        if default:
+            names.add('default')
+        elif name:
+            names.add(name)
+    for body in EXPORT_LIST_RE.findall(text):
+        for item in body.split(','):
+            if item.strip():
+                names.add(item.split(' as ')[-1].strip())
+    if COMMONJS_EXPORT_RE.search(text):
+        names.add('*')
+    return sorted(names)
+
+def resolve_module(rel: str, spec: str, known) -> Optional[str]:
+    """The project file a relative specifier in `rel` refers to, if it is in `known`"""
+    target = module_path(rel, spec)
+    for suffix in MODULE_SUFFIXES:
+        if target + suffix in known:
+            return target + suffix
+    return None
+
+def module_path(rel: str, spec: str) -> str:
+    return os.path.normpath(Path(rel).parent / spec)
+
+def analyze_js(text: str) -> dict:
+    """Per-file facts and the checks that need only this file"""
+    issues = []
+    if text.lstrip().startswith('```'):
+        issues.append(make_issue('markdown-fence', 'error',
+                                 'File starts with a markdown code fence', 1))
+    else:
+        error = scan_structure(text, 'js')
+        if error:
+            issues.append(make_issue('syntax', 'error', f"Syntax error: {error[0]}", error[1]))
+
+    es_import = IMPORT_RE.search(text) is not None
+    es_export = EXPORT_RE.search(text) is not None
+    uses_require = REQUIRE_RE.search(text) is not None
+    defines = sorted(set(COMPONENT_DEF_RE.findall(text)))
+    uses = sorted(set(COMPONENT_USE_RE.findall(text)) - REACT_BUILTINS)
+
+    if HOOK_RE.search(text):
+        react_in_scope = ('React.use' in text or es_import or uses_require
+                          or REACT_DESTRUCTURE_RE.search(text))
+        if not react_in_scope:
+            issues.append(make_issue(
+                'hooks-without-react', 'error',
+                'React hooks used without a React import or reference '
+                '(add "const { useState, useEffect } = React;")'))
+        if not COMPONENT_FN_RE.search(text):
+            issues.append(make_issue('hooks-outside-component', 'warning',
+                                     'Hooks found but no clear component definition'))
+
+    if defines and 'React' not in text and JSX_RE.search(text):
+        issues.append(make_issue('jsx-without-react', 'error',
+                                 'JSX used without React in scope'))
+
+    if es_import and defines and ('React' in text or uses):
+        name = defines[0]
+        exported = re.search(rf'export\s+(?:default\s+)?(?:function\s+|const\s+|class\s+)?{name}\b', text)
+        if not exported and 'export {' not in text:
+            issues.append(make_issue('component-not-exported', 'warning',
+                                     f'Component {name} defined but not exported'))
+
+    return {'language': 'js', 'issues': issues, 'defines': defines, 'uses': uses,
+            'es_import': es_import, 'es_export': es_export, 'require': uses_require,
+            'imports': module_imports(text), 'exports': module_exports(text),
+            'globals': sorted(set(WINDOW_GLOBAL_RE.findall(text)))}
+
+def analyze_html(text: str) -> dict:
+    scripts, issues = [], []
+    for attrs, body in SCRIPT_RE.findall(text):
+        src = SRC_RE.search(attrs)
+        script_type = TYPE_RE.search(attrs)
+        script = {'src': src.group(1) if src else None,
+                  'type': script_type.group(1).lower() if script_type else 'text/javascript'}
+        if not src and body.strip():
+            script['defines'] = sorted(set(COMPONENT_DEF_RE.findall(body)))
+            script['uses'] = sorted(set(COMPONENT_USE_RE.findall(body)) - REACT_BUILTINS)
+            if script['type'] == 'text/babel' and IMPORT_RE.search(body):
+                issues.append(make_issue('babel-import', 'error',
+                                         'ES6 imports inside a text/babel script - incompatible'))
+        scripts.append(script)
+    return {'language': 'html', 'issues': issues, 'scripts': scripts}
+
+def analyze_json(text: str) -> dict:
+    issues = []
+    try:
+        json.loads(text)
+    except ValueError as e:
+        issues.append(make_issue('syntax', 'error', f"Invalid JSON: {e.msg}", e.lineno))
+    return {'language': 'json', 'issues': issues}
+
+def analyze_css(text: str) -> dict:
+    error = scan_structure(text, 'css')
+    issues = [make_issue('syntax', 'error', f"CSS syntax error: {error[0]}", error[1])] if error else []
+    return {'language': 'css', 'issues': issues}
+
+ANALYZERS = {'js': analyze_js, 'html': analyze_html, 'json': analyze_json, 'css': analyze_css}
+
+class ValidationEngine:
+    """Validates files and whole projects, caching per-file results by content hash
+    in an LRU of at most `max_cache_entries` results"""
+
+    def __init__(self, max_workers: int = None, persist: bool = True,
+                 max_cache_entries: int = 4096):
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self.persist = persist
+        self.max_cache_entries = max_cache_entries
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'analyzed': 0, 'cache_hits': 0}
+
+    @staticmethod
+    def content_key(language: str, text: str) -> str:
+        return hashlib.sha256(f"{RULES_VERSION}:{language}:{text}".encode()).hexdigest()
+
+    def analyze(self, language: str, text: str) -> dict:
+        """Per-file facts and issues, from the cache when the content is unchanged"""
+        key = self.content_key(language, text)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats['cache_hits'] += 1
+                return cached
+        result = ANALYZERS[language](text)
+        with self._lock:
+            self._remember(key, result)
+            self.stats['analyzed'] += 1
+        return result
+
+    def _remember(self, key: str, result: dict):
+        """Caller holds the lock"""
+        self._cache[key] = result
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_cache_entries:
+            self._cache.popitem(last=False)
+
+    def validate_text(self, text: str, language: str) -> List[dict]:
+        """Single-file checks for a snippet, e.g. a code block from a response"""
+        language = BLOCK_LANGUAGES.get(language, LANGUAGES.get(language, language))
+        if language not in ANALYZERS:
+            return []
+        return list(self.analyze(language, text)['issues'])
+
+    def _load_cache(self, root: Path):
+        try:
+            stored = json.loads((root / CACHE_FILE).read_text())
+        except (OSError, ValueError):
+            return
+        if stored.get('version') == RULES_VERSION:
+            with self._lock:
+                for key, result in stored.get('results', {}).items():
+                    if key not in self._cache:
+                        self._remember(key, result)
+
+    def _save_cache(self, root: Path, keys: List[str]):
+        with self._lock:
+            results = {key: self._cache[key] for key in keys if key in self._cache}
+        tmp = root / f".{CACHE_FILE}.tmp"
+        try:
+            tmp.write_text(json.dumps({'version': RULES_VERSION, 'results': results}))
+            os.replace(tmp, root / CACHE_FILE)
+        except OSError:
+            pass
+
+    @staticmethod
+    def is_project_file(rel: str) -> bool:
+        """Whether a path (relative to the project) is one the validator checks"""
+        parts = Path(rel).parts
+        if not parts or any(part in SKIP_DIRS or part.startswith('.') for part in parts):
+            return False
+        return Path(rel).suffix.lower() in LANGUAGES and '.backup' not in parts[-1]
+    
+    @staticmethod
+    def project_files(root: Path) -> List[Path]:
+        files = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.startswith('.')]
+            for filename in filenames:
+                path = Path(dirpath) / filename
+                if path.suffix.lower() in LANGUAGES and not filename.startswith('.') \
+                        and '.backup' not in filename:
+                    files.append(path)
+        return sorted(files)
+
+    def _read_and_analyze(self, root: Path, path: Path) -> Tuple[str, str, dict]:
+        language = LANGUAGES[path.suffix.lower()]
+        try:
+            text = path.read_text(encoding='utf-8', errors='replace')
+        except OSError as e:
+            return (str(path.relative_to(root)), '',
+                    {'language': language, 'issues': [make_issue('read', 'error', str(e))]})
+        return (str(path.relative_to(root)), self.content_key(language, text),
+                self.analyze(language, text))
+
+    def analyze_files(self, root: Path, files: List[Path]) -> List[Tuple[str, str, dict]]:
+        """(relative path, content key, facts) for each file, analyzed in parallel"""
+        if self.persist:
+            self._load_cache(root)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            analyzed = list(executor.map(lambda path: self._read_and_analyze(root, path), files))
+        if self.persist:
+            self._save_cache(root, [key for _, key, _ in analyzed if key])
+        return analyzed
+
+    def validate_project(self, root, files: List[Path] = None) -> dict:
+        """Run every per-file and cross-file check over a project directory"""
+        start = time.monotonic()
+        root = Path(root)
+        hits_before = self.stats['cache_hits']
+        files = files if files is not None else self.project_files(root)
+        analyzed = self.analyze_files(root, files)
+        facts = {rel: result for rel, _, result in analyzed}
+        return self.report(root, facts, self._project_checks(facts), start,
+                           cache_hits=self.stats['cache_hits'] - hits_before)
+
+    @staticmethod
+    def report(root: Path, facts: Dict[str, dict], cross: Dict[str, List[dict]],
+               start: float, **fields) -> dict:
+        """The validation report for per-file facts plus cross-file issues"""
+        issues = [dict(issue, file=rel) for rel, result in facts.items()
+                  for issue in result['issues']]
+        issues += [issue for owner in sorted(cross) for issue in cross[owner]]
+        errors = sum(1 for issue in issues if issue['severity'] == 'error')
+        report = {
+            'project': str(root),
+            'passed': errors == 0,
+            'errors': errors,
+            'warnings': len(issues) - errors,
+            'issues': issues,
+            'files': len(facts),
+            'cache_hits': 0,
+            'elapsed': time.monotonic() - start
+        }
+        report.update(fields)
+        return report
+
+    @staticmethod
+    def page_scripts(html_rel: str, html: dict) -> List[Tuple[int, dict, Optional[str]]]:
+        """(position, script, project path of its src) for each script on a page"""
+        base = Path(html_rel).parent
+        return [(position, script,
+                 os.path.normpath(base / script['src'])
+                 if script['src'] and not script['src'].startswith(('http:', 'https:', '//'))
+                 else None)
+                for position, script in enumerate(html['scripts'])]
+
+    def _project_checks(self, facts: Dict[str, dict],
+                        owners: set = None) -> Dict[str, List[dict]]:
+        """Checks that combine files: module systems, components, script tags, imports
+
+        Issues are grouped by the page, module or directory whose check
+        found them; `owners` limits the run to those groups.
+        """
+        js = {rel: f for rel, f in facts.items() if f['language'] == 'js'}
+        defined_anywhere = {name for f in js.values() for name in f.get('defines', [])}
+        pages = {rel: f for rel, f in facts.items() if f['language'] == 'html'}
+        loaded_by_html = {path for rel, page in pages.items()
+                          for _, _, path in self.page_scripts(rel, page) if path in js}
+        wanted = (lambda owner: True) if owners is None else owners.__contains__
+        results = {}
+
+        for html_rel, html in pages.items():
+            if wanted(html_rel):
+                results[html_rel] = self._page_checks(html_rel, html, js, defined_anywhere)
+        for rel, info in js.items():
+            if wanted(rel):
+                results[rel] = self._module_checks(rel, info, facts, rel in loaded_by_html,
+                                                   defined_anywhere)
+
+        by_dir: Dict[str, List[dict]] = {}
+        for rel, info in js.items():
+            by_dir.setdefault(str(Path(rel).parent), []).append(info)
+        for directory, infos in sorted(by_dir.items()):
+            if not wanted(directory):
+                continue
+            results[directory] = []
+            if any(i['es_import'] or i['es_export'] for i in infos) and any(i['require'] for i in infos):
+                results[directory].append(dict(make_issue(
+                    'mixed-modules', 'warning', 'Mixed module systems (ES6 and CommonJS)'),
+                    file=directory))
+        return {owner: issues for owner, issues in results.items() if issues}
+
+    def _page_checks(self, html_rel: str, html: dict, js: Dict[str, dict],
+                     defined_anywhere: set) -> List[dict]:
+        """Script tags on one page: files exist, module syntax fits, load order"""
+        issues = []
+        has_babel = any(s['type'] == 'text/babel' for s in html['scripts'])
+        has_module = any(s['type'] == 'module' for s in html['scripts'])
+        defined_at: Dict[str, int] = {}
+        sequence = []
+        for position, script, rel in self.page_scripts(html_rel, html):
+            if script['src']:
+                if rel is None:
+                    continue
+                if rel not in js:
+                    issues.append(dict(make_issue(
+                        'missing-script', 'error', f"Script '{script['src']}' not found"),
+                        file=html_rel))
+                    continue
+                info = js[rel]
+                sequence.append((position, rel, info))
+                if script['type'] != 'module':
+                    if info['es_import'] or info['es_export']:
+                        rule = 'babel-import' if script['type'] == 'text/babel' else 'browser-modules'
+                        if not has_module:
+                            issues.append(dict(make_issue(
+                                rule, 'error',
+                                f"ES6 import/export in a file loaded by a "
+                                f"{script['type']} script tag in {html_rel} - incompatible"),
+                                file=rel))
+                    if info['require']:
+                        issues.append(dict(make_issue(
+                            'browser-require', 'error',
+                            f"CommonJS require() in a browser script loaded by {html_rel}"),
+                            file=rel))
+            else:
+                sequence.append((position, html_rel, script))
+            for name in (js[rel]['defines'] if script['src'] else script.get('defines', [])):
+                defined_at.setdefault(name, position)
+
+        # Scripts execute in order: a component must be defined by an earlier
+        # (or the same) script, and must be defined somewhere at all
+        for position, rel, info in sequence:
+            for name in info.get('uses', []):
+                if name not in defined_at and name not in defined_anywhere:
+                    issues.append(dict(make_issue(
+                        'undefined-component', 'error',
+                        f"Component '{name}' used but not defined in any script "
+                        f"loaded by {html_rel}"), file=rel, component=name))
+                elif name in defined_at and defined_at[name] > position:
+                    issues.append(dict(make_issue(
+                        'script-order', 'error',
+                        f"Component '{name}' is used before the script that defines it "
+                        f"is loaded in {html_rel}"), file=rel, component=name))
+        if has_babel and has_module:
+            issues.append(dict(make_issue(
+                'mixed-script-types', 'warning',
+                'Both text/babel and module scripts on one page'), file=html_rel))
+        return issues
+
+    @staticmethod
+    def _module_checks(rel: str, info: dict, facts: Dict[str, dict], loaded_by_html: bool,
+                       defined_anywhere: set) -> List[dict]:
+        """Relative imports resolve and export what is imported; components exist"""
+        issues = []
+        for spec, names in info.get('imports', []):
+            if not spec.startswith('.'):
+                continue
+            target = resolve_module(rel, spec, facts)
+            if target is None:
+                suffix = Path(spec).suffix.lower()
+                if not suffix or suffix in LANGUAGES:
+                    issues.append(dict(make_issue(
+                        'missing-import', 'error', f"Import '{spec}' not found in project"),
+                        file=rel))
+                continue
+            exports = facts[target].get('exports')
+            if exports is None or '*' in exports:
+                continue
+            missing = [name for name in names if name != '*' and name not in exports]
+            if missing:
+                issues.append(dict(make_issue(
+                    'missing-export', 'warning',
+                    f"{target} does not export {', '.join(missing)}"), file=rel))
+        if not loaded_by_html:
+            for name in info['uses']:
+                if name not in defined_anywhere:
+                    issues.append(dict(make_issue(
+                        'undefined-component', 'warning',
+                        f"Component '{name}' used but not found in project"), file=rel))
+        return issues
+
+class DependencyGraph:
+    """Which project files a change to another file can affect
+
+    Edges come from script tags (page -> script), relative imports and
+    require() calls (module -> module) and names: a file using a
+    component depends on whichever file defines it, or publishes it as a
+    window global. Path edges are kept even when the target is missing,
+    so creating the file finds the page or module waiting for it.
+    """
+
+    def __init__(self):
+        self.paths: Dict[str, Set[str]] = {}       # file -> paths it loads or imports
+        self.names: Dict[str, Set[str]] = {}       # file -> names it uses
+        self.loaded_by: Dict[str, Set[str]] = {}   # path -> files loading it
+        self.users: Dict[str, Set[str]] = {}       # name -> files using it
+
+    @staticmethod
+    def provides(info: Optional[dict]) -> Set[str]:
+        """Names a file makes available to others"""
+        if not info:
+            return set()
+        if info['language'] == 'html':
+            return {name for script in info['scripts'] for name in script.get('defines', [])}
+        return set(info.get('defines', [])) | set(info.get('globals', []))
+
+    @staticmethod
+    def dependencies(rel: str, info: dict) -> Tuple[Set[str], Set[str]]:
+        """(paths, names) a file depends on"""
+        if info['language'] == 'html':
+            paths = {path for _, _, path in ValidationEngine.page_scripts(rel, info) if path}
+            names = {name for script in info['scripts'] for name in script.get('uses', [])}
+            return paths, names
+        paths = {module_path(rel, spec) for spec, _ in info.get('imports', [])
+                 if spec.startswith('.')}
+        return paths, set(info.get('uses', []))
+
+    def update(self, rel: str, info: Optional[dict]):
+        """Replace a file's edges (info None removes the file)"""
+        for path in self.paths.pop(rel, ()):
+            self.loaded_by.get(path, set()).discard(rel)
+        for name in self.names.pop(rel, ()):
+            self.users.get(name, set()).discard(rel)
+        if info is None:
+            return
+        paths, names = self.dependencies(rel, info)
+        self.paths[rel], self.names[rel] = paths, names
+        for path in paths:
+            self.loaded_by.setdefault(path, set()).add(rel)
+        for name in names:
+            self.users.setdefault(name, set()).add(rel)
+
+    def _loaders(self, rel: str) -> Set[str]:
+        # Imports may leave off the extension or name a directory's index file
+        stem = os.path.splitext(rel)[0]
+        keys = {rel, stem}
+        if os.path.basename(stem) == 'index':
+            keys.add(os.path.dirname(stem) or '.')
+        return {loader for key in keys for loader in self.loaded_by.get(key, ())}
+
+    def affected(self, changed: Dict[str, Set[str]]) -> Set[str]:
+        """Changed files plus everything depending on them, directly or not
+
+        `changed` maps each changed file to the names it started or stopped
+        providing; users of those names are affected too.
+        """
+        affected, pending = set(), list(changed)
+        for names in changed.values():
+            for name in names:
+                pending.extend(self.users.get(name, ()))
+        while pending:
+            rel = pending.pop()
+            if rel in affected:
+                continue
+            affected.add(rel)
+            pending.extend(self._loaders(rel) - affected)
+        return affected
+
+# inotify(7) constants
+IN_MODIFY, IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO = 0x2, 0x8, 0x40, 0x80
+IN_CREATE, IN_DELETE, IN_DELETE_SELF, IN_Q_OVERFLOW = 0x100, 0x200, 0x400, 0x4000
+IN_IGNORED, IN_ISDIR = 0x8000, 0x40000000
+INOTIFY_EVENT = struct.Struct('iIII')
+
+class Inotify:
+    """Minimal inotify binding over ctypes; raises OSError where unavailable"""
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify is not available on this platform")
+        self._libc = libc
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches: Dict[int, Path] = {}
+
+    def add(self, directory: Path):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Cannot watch {directory}")
+        self.watches[wd] = directory
+
+    def read(self, timeout: float) -> List[Tuple[Path, int]]:
+        """(path, mask) events, waiting up to `timeout` seconds for the first"""
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events, offset = [], 0
+        while offset < len(data):
+            wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+            elif mask & IN_Q_OVERFLOW or wd in self.watches:
+                directory = self.watches.get(wd, Path('.'))
+                events.append((directory / os.fsdecode(name) if name else directory, mask))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+class ProjectWatcher:
+    """Keeps a project's validation current while its files change
+
+    After one full scan, each change re-analyzes only the files that
+    changed and re-runs the cross-file checks of the pages, modules and
+    directories that depend on them (see DependencyGraph). Changes are
+    picked up with inotify where available and by polling mtimes
+    otherwise; every update is passed to `on_report` as a full report
+    with the 'changed' and 'revalidated' files added.
+    """
+
+    def __init__(self, root, engine: ValidationEngine = None,
+                 on_report: Callable[[dict], None] = None, poll_interval: float = 0.5,
+                 settle: float = 0.02, use_inotify: bool = True):
+        self.root = Path(root).resolve()
+        self.engine = engine or ValidationEngine()
+        self.on_report = on_report
+        self.poll_interval = poll_interval
+        self.settle = settle
+        self.use_inotify = use_inotify
+        self.facts: Dict[str, dict] = {}
+        self.keys: Dict[str, str] = {}
+        self.cross: Dict[str, List[dict]] = {}
+        self.graph = DependencyGraph()
+        self.last_report: Optional[dict] = None
+        self.backend = None
+        self.stats = {'scans': 0, 'updates': 0, 'revalidated': 0}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def scan(self) -> dict:
+        """Validate the whole project and rebuild the dependency graph"""
+        start = time.monotonic()
+        analyzed = self.engine.analyze_files(self.root, self.engine.project_files(self.root))
+        self.facts = {rel: info for rel, _, info in analyzed}
+        self.keys = {rel: key for rel, key, _ in analyzed if key}
+        self.graph = DependencyGraph()
+        for rel, info in self.facts.items():
+            self.graph.update(rel, info)
+        self.cross = self.engine._project_checks(self.facts)
+        self.stats['scans'] += 1
+        return self._publish(self.engine.report(self.root, self.facts, self.cross, start,
+                                                changed=[], revalidated=sorted(self.facts)))
+
+    def update(self, paths: Iterable) -> Optional[dict]:
+        """Revalidate changed files and their dependents; None if nothing changed"""
+        start = time.monotonic()
+        changed: Dict[str, Set[str]] = {}
+        for path in paths:
+            rel = os.path.relpath(Path(self.root, path), self.root)
+            if not self.engine.is_project_file(rel):
+                continue
+            old = self.facts.get(rel)
+            key, info = None, None
+            if (self.root / rel).is_file():
+                _, key, info = self.engine._read_and_analyze(self.root, self.root / rel)
+            if key == self.keys.get(rel):
+                continue
+            if info is None:
+                del self.facts[rel]
+                self.keys.pop(rel, None)
+            else:
+                self.facts[rel] = info
+                self.keys[rel] = key
+            self.graph.update(rel, info)
+            changed[rel] = self.graph.provides(old) ^ self.graph.provides(info)
+        if not changed:
+            return None
+
+        affected = self.graph.affected(changed)
+        owners = affected | {str(Path(rel).parent) for rel in changed}
+        for owner in owners:
+            self.cross.pop(owner, None)
+        self.cross.update(self.engine._project_checks(self.facts, owners))
+        self.stats['updates'] += 1
+        self.stats['revalidated'] += len(affected)
+        return self._publish(self.engine.report(
+            self.root, self.facts, self.cross, start, changed=sorted(changed),
+            revalidated=sorted(rel for rel in affected if rel in self.facts)))
+
+    def _publish(self, report: dict) -> dict:
+        self.last_report = report
+        if self.on_report:
+            try:
+                self.on_report(report)
+            except Exception as e:
+                print(f"[PROJECT-WATCHER] ⚠️  Report handler failed: {e}")
+        return report
+
+    def _watch_tree(self, notify: Inotify, directory: Path) -> List[Path]:
+        """Watch a directory and its subdirectories; returns the files found"""
+        files = []
+        for dirpath, dirnames, filenames in os.walk(directory):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.startswith('.')]
+            notify.add(Path(dirpath))
+            files += [Path(dirpath) / name for name in filenames]
+        return files
+
+    def _inotify_changes(self, notify: Inotify) -> Iterable[Optional[Set[Path]]]:
+        """Sets of changed paths; None when events were lost and a rescan is due"""
+        while not self._stop.is_set():
+            events = notify.read(self.poll_interval)
+            if not events:
+                continue
+            # Let a burst of writes (an agent saving several files) settle
+            deadline = time.monotonic() + self.settle
+            while time.monotonic() < deadline:
+                events += notify.read(deadline - time.monotonic())
+            changed, rescan = set(), False
+            for path, mask in events:
+                if mask & IN_Q_OVERFLOW:
+                    rescan = True
+                elif mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        changed.update(self._watch_tree(notify, path))
+                    else:
+                        prefix = os.path.relpath(path, self.root) + os.sep
+                        changed.update(self.root / rel for rel in self.facts
+                                       if rel.startswith(prefix))
+                elif not mask & IN_CREATE:
+                    # Creation is followed by IN_CLOSE_WRITE once the content is there
+                    changed.add(path)
+            yield None if rescan else changed
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for path in self.engine.project_files(self.root):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            snapshot[str(path.relative_to(self.root))] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def _poll_changes(self, seen: Dict[str, Tuple[int, int]]) -> Iterable[Optional[Set[str]]]:
+        while not self._stop.wait(self.poll_interval):
+            current = self._snapshot()
+            changed = {rel for rel in seen.keys() | current.keys()
+                       if seen.get(rel) != current.get(rel)}
+            seen = current
+            if changed:
+                yield changed
+
+    def run(self):
+        """Scan, then revalidate on every change until stop()"""
+        notify = None
+        if self.use_inotify:
+            try:
+                notify = Inotify()
+            except OSError as e:
+                print(f"[PROJECT-WATCHER] inotify unavailable ({e}), polling every "
+                      f"{self.poll_interval}s")
+        self.backend = 'inotify' if notify else 'polling'
+        try:
+            # Start watching before the scan, so nothing written during it is missed
+            if notify:
+                self._watch_tree(notify, self.root)
+                changes = self._inotify_changes(notify)
+            else:
+                changes = self._poll_changes(self._snapshot())
+            self.scan()
+            for changed in changes:
+                if changed is None:
+                    self.scan()
+                elif changed:
+                    self.update(changed)
+        finally:
+            if notify:
+                notify.close()
+            if self.engine.persist:
+                self.engine._save_cache(self.root, list(self.keys.values()))
+
+    def start(self) -> 'ProjectWatcher':
+        """Run in a background thread; the first report is ready when this returns"""
+        ready = threading.Event()
+        on_report = self.on_report
+
+        def first_report(report: dict):
+            ready.set()
+            if on_report:
+                on_report(report)
+
+        self.on_report = first_report
+        self._thread = threading.Thread(target=self.run, name=f"watch-{self.root.name}",
+                                        daemon=True)
+        self._thread.start()
+        while not ready.wait(0.1) and self._thread.is_alive():
+            pass
+        self.on_report = on_report
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval + 1)
+
+HOOK_NAMES = ('useState', 'useEffect', 'useContext', 'useReducer', 'useMemo', 'useCallback', 'useRef')
+FIXABLE_RULES = {'markdown-fence', 'babel-import', 'browser-modules', 'browser-require',
+                 'hooks-without-react', 'jsx-without-react'}
+
+def fix_text(text: str, issues: List[dict]) -> Tuple[str, List[str]]:
+    """Deterministic repairs (ported from fixers/react-module-fixer.js)
+
+    Applies the fix for each fixable rule in `issues` and returns the new
+    text with a description of every change made.
+    """
+    rules = {issue['rule'] for issue in issues}
+    fixes = []
+    converted = False
+
+    if 'markdown-fence' in rules:
+        lines = text.strip().split('\n')
+        if lines and lines[0].startswith('```'):
+            lines = lines[1:]
+        if lines and lines[-1].strip() == '```':
+            lines = lines[:-1]
+        text = '\n'.join(lines) + '\n'
+        fixes.append('stripped markdown fence')
+
+    if rules & {'babel-import', 'browser-modules', 'browser-require'}:
+        # Browser scripts share globals: drop module syntax, publish components on window
+        before = text
+        text = re.sub(r'^\s*import\s[^;\n]*(?:;|\n)\n?', '', text, flags=re.M)
+        text = re.sub(r'^\s*(?:const|let|var)\s+[^=\n]+=\s*require\([^)]*\);?\n?', '', text, flags=re.M)
+        exported = re.findall(r'^\s*export\s+default\s+(?:function\s+|class\s+)?(\w+)', text, re.M)
+        exported += re.findall(r'\bmodule\.exports\s*=\s*(\w+)', text)
+        text = re.sub(r'^(\s*)export\s+default\s+(function|class)\s', r'\1\2 ', text, flags=re.M)
+        text = re.sub(r'^\s*export\s+default\s+\w+;?\n?', '', text, flags=re.M)
+        text = re.sub(r'^(\s*)export\s+(function|const|let|var|class)\s', r'\1\2 ', text, flags=re.M)
+        text = re.sub(r'^\s*module\.exports\s*=\s*\w+;?\n?', '', text, flags=re.M)
+        for name in dict.fromkeys(exported):
+            if f'window.{name}' not in text:
+                text = text.rstrip('\n') + (f"\n\n// Make component available globally\n"
+                                            f"if (typeof window !== 'undefined') {{\n"
+                                            f"  window.{name} = {name};\n}}\n")
+        if text != before:
+            converted = True
+            fixes.append('converted module syntax for browser scripts')
+
+    hooks = [name for name in HOOK_NAMES if re.search(rf'(?<![.\w]){name}\(', text)]
+    if hooks and 'React.use' not in text and not REACT_DESTRUCTURE_RE.search(text) \
+            and (rules & {'hooks-without-react', 'babel-import', 'browser-modules'}):
+        text = f"// React hooks for browser usage\nconst {{ {', '.join(hooks)} }} = React;\n\n" + text
+        fixes.append('added React hook destructuring')
+
+    # Dropping `import React` leaves JSX relying on the global from the CDN script
+    if ('jsx-without-react' in rules or converted) and 'React' not in text \
+            and JSX_RE.search(text):
+        text = '/* global React */\n' + text
+        fixes.append('declared global React')
+
+    return text, fixes
+
+def format_report(report: dict) -> str:
+    """Human-readable report in the hooks' output style"""
+    if report.get('changed'):
+        lines = [f"[PROJECT-WATCHER] Changed: {', '.join(report['changed'])} "
+                 f"(revalidated {len(report['revalidated'])} of {report['files']} files)"]
+    else:
+        lines = [f"[PROJECT-VALIDATOR] Validating entire project: {report['project']}"]
+    for issue in report['issues']:
+        where = issue['file'] + (f":{issue['line']}" if issue.get('line') else '')
+        label = 'ERROR' if issue['severity'] == 'error' else 'WARNING'
+        lines.append(f"[{label}] {where}: {issue['message']} ({issue['rule']})")
+    lines.append("[PROJECT-VALIDATOR] ===== Validation Summary =====")
+    lines.append(f"[PROJECT-VALIDATOR] Files checked: {report['files']} "
+                 f"({report['cache_hits']} unchanged, cached) in {report['elapsed'] * 1000:.0f}ms")
+    lines.append(f"[PROJECT-VALIDATOR] Errors: {report['errors']}")
+    lines.append(f"[PROJECT-VALIDATOR] Warnings: {report['warnings']}")
+    if report['passed']:
+        lines.append("[PROJECT-VALIDATOR] ✅ Project validation PASSED")
+    else:
+        lines.append("[PROJECT-VALIDATOR] ❌ Project validation FAILED")
+    return '\n'.join(lines)
+
+def fix_project(engine: 'ValidationEngine', root, report: dict) -> List[str]:
+    """Apply fix_text() to every file with fixable errors; returns the files changed"""
+    root = Path(root)
+    by_file: Dict[str, List[dict]] = {}
+    for issue in report['issues']:
+        if issue['severity'] == 'error' and issue['rule'] in FIXABLE_RULES:
+            by_file.setdefault(issue['file'], []).append(issue)
+    changed = []
+    for rel, issues in sorted(by_file.items()):
+        path = root / rel
+        if not path.is_file():
+            continue
+        text, fixes = fix_text(path.read_text(), issues)
+        if fixes:
+            path.write_text(text)
+            changed.append(rel)
+            print(f"[FIXER] {rel}: {', '.join(fixes)}")
+    return changed
+
+def watch(root: str, as_json: bool = False, use_inotify: bool = True):
+    """Print a report for the project and again after every change, until Ctrl-C"""
+    show = (lambda report: print(json.dumps(report), flush=True)) if as_json \
+        else (lambda report: print(format_report(report) + '\n', flush=True))
+    watcher = ProjectWatcher(root, on_report=show, use_inotify=use_inotify)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if not args:
+        print("Usage: python validation_engine.py <project-dir> [--json] [--fix] "
+              "[--watch [--poll]]")
+        return 2
+    if '--watch' in sys.argv:
+        watch(args[0], '--json' in sys.argv, use_inotify='--poll' not in sys.argv)
+        return 0
+    engine = ValidationEngine()
+    report = engine.validate_project(args[0])
+    if '--fix' in sys.argv and fix_project(engine, args[0], report):
+        report = engine.validate_project(args[0])
+    if '--json' in sys.argv:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
+    return 0 if report['passed'] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Anthropic Messages API
+
+Lets the swarm run without a key or network, and reproduces provider
+behaviour on demand (429s, overload, per-model rate ceilings, slow
+streaming) so the request scheduler and streaming paths can be exercised
+locally.
+
+    python mock-api-server.py --port 8765 --rpm 60
+    ANTHROPIC_API_KEY=mock ANTHROPIC_BASE_URL=http://localhost:8765 \\
+        python swarm-orchestrator.py demo
+
+Message Batches are emulated too (POST /v1/messages/batches, retrieve,
+results, cancel): a batch ends --batch-delay seconds after creation.
+A prompt asking for several files (`File: <path>` lines plus the
+`=== FILE: <path> ===` format) is answered with one stub file per path.
+
+Runtime knobs can be changed with POST /control, e.g.
+    curl -X POST localhost:8765/control -d '{"fail_next": 5, "status": 429}'
+and counters read from GET /stats.
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+class MockState:
+    """Shared, mutable behaviour of the mock server"""
+
+    def __init__(self, latency: float = 0.0, fail_rate: float = 0.0,
+                 rpm: int = 0, retry_after: float = 1.0, token_delay: float = 0.0,
+                 slow_rate: float = 0.0, slow_latency: float = 0.0,
+                 model_latency: dict = None, batch_delay: float = 1.0,
+                 unsure: dict = None):
+        self.lock = threading.Lock()
+        self.latency = latency
+        # Tail latency: a `slow_rate` fraction of calls takes `slow_latency`
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        # Per-model base latency, matched by substring (e.g. {"haiku": 0.05})
+        self.model_latency = model_latency or {}
+        # Weak models: fraction of answers that admit being unsure, by substring
+        self.unsure = unsure or {}
+        self.token_delay = token_delay
+        self.fail_rate = fail_rate
+        self.rpm = rpm
+        self.retry_after = retry_after
+        self.fail_next = 0
+        self.fail_status = 429
+        self.windows = {}
+        self.prompt_cache = set()
+        self.batch_delay = batch_delay
+        self.batches = {}
+        self.stats = {'requests': 0, 'ok': 0, 'rate_limited': 0, 'failed': 0, 'slow': 0,
+                      'disconnected': 0, 'batches': 0, 'batch_requests': 0,
+                      'unsure': 0, 'truncated': 0}
+
+    def update(self, settings: dict):
+        with self.lock:
+            for key in ('latency', 'token_delay', 'fail_rate', 'rpm',
+                        'retry_after', 'fail_next', 'slow_rate', 'slow_latency',
+                        'model_latency', 'batch_delay', 'unsure'):
+                if key in settings:
+                    setattr(self, key, settings[key])
+            if 'status' in settings:
+                self.fail_status = int(settings['status'])
+
+    def admit(self, model: str):
+        """Return None to serve the request, or the error status to send"""
+        with self.lock:
+            self.stats['requests'] += 1
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                return self.fail_status
+            if self.fail_rate and random.random() < self.fail_rate:
+                return 429
+            if self.rpm:
+                now = time.monotonic()
+                window = self.windows.setdefault(model, deque())
+                while window and now - window[0] > 60:
+                    window.popleft()
+                if len(window) >= self.rpm:
+                    return 429
+                window.append(now)
+            return None
+
+    def latency_for(self, model: str) -> float:
+        """Seconds to wait before answering a request for `model`"""
+        with self.lock:
+            if self.slow_rate and random.random() < self.slow_rate:
+                self.stats['slow'] += 1
+                return self.slow_latency
+            for key, latency in self.model_latency.items():
+                if key in model:
+                    return latency
+            return self.latency
+
+    def count(self, status: int):
+        with self.lock:
+            if status == 200:
+                self.stats['ok'] += 1
+            elif status == 429:
+                self.stats['rate_limited'] += 1
+            else:
+                self.stats['failed'] += 1
+
+def cached_prefix_tokens(state: MockState, request: dict):
+    """Emulate prompt caching: (cache_read, cache_write) tokens for a request
+
+    The prefix up to the last block marked with cache_control is hashed;
+    the first request with a given prefix writes it, later ones read it.
+    """
+    blocks = []
+    system = request.get('system')
+    if isinstance(system, list):
+        blocks.extend(system)
+    for message in request.get('messages', []):
+        if isinstance(message.get('content'), list):
+            blocks.extend(message['content'])
+        else:
+            blocks.append({'text': message.get('content', '')})
+    marked = [i for i, block in enumerate(blocks) if block.get('cache_control')]
+    if not marked:
+        return 0, 0
+    prefix = json.dumps([request.get('model'), blocks[:marked[-1] + 1]], sort_keys=True)
+    tokens = len(prefix) // 4
+    with state.lock:
+        if prefix in state.prompt_cache:
+            return tokens, 0
+        state.prompt_cache.add(prefix)
+        return 0, tokens
+
+FILE_REQUEST_RE = re.compile(r'^File: (\S+)$', re.M)
+STUB_COMMENTS = {'.css': '/* {} */', '.html': '<!-- {} -->', '.md': '{}', '.json': '{{"mock": "{}"}}'}
+
+def mock_files(model: str, paths: list) -> str:
+    """A multi-file reply with a syntactically valid stub for each path"""
+    parts = []
+    for path in paths:
+        suffix = path[path.rfind('.'):] if '.' in path else ''
+        stub = STUB_COMMENTS.get(suffix, '// {}').format(f"[mock {model}] {path}")
+        parts.append(f"=== FILE: {path} ===\n{stub}\n=== END FILE ===")
+    return '\n'.join(parts)
+
+def mock_reply(request: dict) -> str:
+    """Deterministic reply text for a request"""
+    last = request.get('messages', [{}])[-1].get('content', '')
+    if isinstance(last, list):
+        last = ' '.join(block.get('text', '') for block in last if isinstance(block, dict))
+    paths = FILE_REQUEST_RE.findall(last) if '=== FILE:' in last else []
+    if paths:
+        return mock_files(request.get('model', 'model'), paths)
+    return f"[mock {request.get('model', 'model')}] {last[:200]}"
+
+def mock_message(state: MockState, request: dict) -> dict:
+    """A complete Message answering a request, cut off at its max_tokens"""
+    text = mock_reply(request)
+    model = request.get('model', '')
+    stop_reason = 'end_turn'
+    with state.lock:
+        rate = next((rate for key, rate in state.unsure.items() if key in model), 0)
+        if rate and random.random() < rate:
+            text = f"I'm not sure, but: {text}"
+            state.stats['unsure'] += 1
+        if len(text) // 4 > request.get('max_tokens', 4096):
+            text = text[:request['max_tokens'] * 4]
+            stop_reason = 'max_tokens'
+            state.stats['truncated'] += 1
+    cache_read, cache_write = cached_prefix_tokens(state, request)
+    usage = {
+        'input_tokens': max(1, len(json.dumps([request.get('system', ''),
+                                               request.get('messages', [])])) // 4
+                            - cache_read - cache_write),
+        'output_tokens': max(1, len(text) // 4),
+        'cache_read_input_tokens': cache_read,
+        'cache_creation_input_tokens': cache_write
+    }
+    return {
+        'id': f'msg_mock_{random.getrandbits(48):012x}',
+        'type': 'message',
+        'role': 'assistant',
+        'model': request.get('model'),
+        'content': [{'type': 'text', 'text': text}],
+        'stop_reason': stop_reason,
+        'stop_sequence': None,
+        'usage': usage
+    }
+
+class MockBatch:
+    """A Message Batch that ends `delay` seconds after it was created"""
+
+    def __init__(self, requests: list, delay: float):
+        self.id = f'msgbatch_mock_{random.getrandbits(48):012x}'
+        self.requests = requests
+        self.created = time.time()
+        self.ends = self.created + delay
+        self.canceled = False
+        self.results = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _iso(timestamp: float) -> str:
+        return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(timestamp))
+
+    def ended(self) -> bool:
+        return self.canceled or time.time() >= self.ends
+
+    def process(self, state: MockState):
+        """Answer every request once (on first access after the batch ended)"""
+        with self.lock:
+            if self.results is not None or not self.ended():
+                return
+            results = []
+            for item in self.requests:
+                if self.canceled:
+                    result = {'type': 'canceled'}
+                elif not item.get('params', {}).get('messages'):
+                    result = {'type': 'errored', 'error': {
+                        'type': 'invalid_request_error', 'message': 'messages: field required'}}
+                else:
+                    result = {'type': 'succeeded', 'message': mock_message(state, item['params'])}
+                results.append({'custom_id': item['custom_id'], 'result': result})
+            self.results = results
+
+    def describe(self, base_url: str) -> dict:
+        counts = {'processing': 0, 'succeeded': 0, 'errored': 0, 'canceled': 0, 'expired': 0}
+        if self.results is None:
+            counts['processing'] = len(self.requests)
+        else:
+            for item in self.results:
+                counts[item['result']['type']] += 1
+        return {
+            'id': self.id,
+            'type': 'message_batch',
+            'processing_status': 'ended' if self.results is not None else
+                                 'canceling' if self.canceled else 'in_progress',
+            'request_counts': counts,
+            'created_at': self._iso(self.created),
+            'expires_at': self._iso(self.created + 86400),
+            'ended_at': self._iso(self.ends) if self.results is not None else None,
+            'cancel_initiated_at': self._iso(self.created) if self.canceled else None,
+            'archived_at': None,
+            'results_url': (f'{base_url}/v1/messages/batches/{self.id}/results'
+                            if self.results is not None else None),
+        }
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; without this, Nagle plus
+    # delayed ACKs add ~40ms to every keep-alive response
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self) -> MockState:
+        return self.server.state
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _send_error(self, status: int):
+        error_type = {429: 'rate_limit_error', 529: 'overloaded_error'}.get(status, 'api_error')
+        self.state.count(status)
+        self._send_json(status, {
+            'type': 'error',
+            'error': {'type': error_type, 'message': f'Mock {error_type}'}
+        }, headers={'retry-after': str(self.state.retry_after)})
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.headers.get('Host', '%s:%s' % self.server.server_address[:2])}"
+
+    def _batch(self, batch_id: str):
+        with self.state.lock:
+            batch = self.state.batches.get(batch_id)
+        if batch is not None:
+            # Outside the state lock: answering takes it for prompt caching
+            batch.process(self.state)
+        else:
+            self._send_json(404, {'type': 'error', 'error': {
+                'type': 'not_found_error', 'message': f'No batch {batch_id}'}})
+        return batch
+
+    def do_GET(self):
+        if self.path == '/stats':
+            with self.state.lock:
+                self._send_json(200, dict(self.state.stats))
+        elif self.path.startswith('/v1/messages/batches/'):
+            parts = self.path.split('?')[0].split('/')[4:]
+            batch = self._batch(parts[0])
+            if batch is None:
+                return
+            if parts[1:] == ['results']:
+                if batch.results is None:
+                    self._send_json(404, {'type': 'error', 'error': {
+                        'type': 'not_found_error', 'message': 'Batch has not ended'}})
+                    return
+                body = ''.join(json.dumps(item) + '\n' for item in batch.results).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/binary')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send_json(200, batch.describe(self.base_url))
+        else:
+            self._send_json(404, {'type': 'error', 'error': {'type': 'not_found_error'}})
+
+    def _create_batch(self, request: dict):
+        status = self.state.admit('batches')
+        if status is not None:
+            self._send_error(status)
+            return
+        batch = MockBatch(request.get('requests', []), self.state.batch_delay)
+        with self.state.lock:
+            self.state.batches[batch.id] = batch
+            self.state.stats['batches'] += 1
+            self.state.stats['batch_requests'] += len(batch.requests)
+        self.state.count(200)
+        self._send_json(200, batch.describe(self.base_url))
+
+    def do_POST(self):
+        request = self._read_json()
+
+        if self.path == '/control':
+            self.state.update(request)
+            self._send_json(200, {'ok': True})
+            return
+
+        if self.path.startswith('/v1/messages/batches'):
+            parts = self.path.split('?')[0].split('/')[4:]
+            if not parts:
+                self._create_batch(request)
+            elif parts[1:] == ['cancel']:
+                batch = self._batch(parts[0])
+                if batch is not None:
+                    batch.canceled = True
+                    self._send_json(200, batch.describe(self.base_url))
+            else:
+                self._send_json(404, {'type': 'error', 'error': {'type': 'not_found_error'}})
+            return
+
+        if not self.path.startswith('/v1/messages'):
+            self._send_json(404, {'type': 'error', 'error': {'type': 'not_found_error'}})
+            return
+
+        status = self.state.admit(request.get('model', ''))
+        if status is not None:
+            self._send_error(status)
+            return
+
+        latency = self.state.latency_for(request.get('model', ''))
+        if latency:
+            time.sleep(latency)
+
+        message = mock_message(self.state, request)
+        text = message['content'][0]['text']
+        self.state.count(200)
+        if request.get('stream'):
+            self._send_stream(message, text)
+        else:
+            self._send_json(200, message)
+
+    def _send_event(self, event: str, data: dict):
+        chunk = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+        self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+        self.wfile.flush()
+
+    def _send_stream(self, message: dict, text: str):
+        """Answer as server-sent events, one delta per word"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        start = dict(message, content=[], stop_reason=None,
+                     usage=dict(message['usage'], output_tokens=0))
+        self._send_event('message_start', {'type': 'message_start', 'message': start})
+        self._send_event('content_block_start', {
+            'type': 'content_block_start', 'index': 0,
+            'content_block': {'type': 'text', 'text': ''}
+        })
+        words = text.split(' ')
+        delay = self.state.token_delay
+        try:
+            for i, word in enumerate(words):
+                if delay:
+                    time.sleep(delay)
+                self._send_event('content_block_delta', {
+                    'type': 'content_block_delta', 'index': 0,
+                    'delta': {'type': 'text_delta', 'text': word if i == 0 else ' ' + word}
+                })
+        except (BrokenPipeError, ConnectionResetError):
+            # Client cancelled the stream (e.g. the losing half of a hedged call)
+            with self.state.lock:
+                self.state.stats['disconnected'] += 1
+            self.close_connection = True
+            return
+        self._send_event('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+        self._send_event('message_delta', {
+            'type': 'message_delta',
+            'delta': {'stop_reason': message['stop_reason'], 'stop_sequence': None},
+            'usage': {'output_tokens': message['usage']['output_tokens']}
+        })
+        self._send_event('message_stop', {'type': 'message_stop'})
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, state: MockState):
+        super().__init__(address, MockHandler)
+        self.state = state
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock Anthropic Messages API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds to wait before answering')
+    parser.add_argument('--token-delay', type=float, default=0.0,
+                        help='seconds between streamed deltas')
+    parser.add_argument('--fail-rate', type=float, default=0.0,
+                        help='probability of answering 429')
+    parser.add_argument('--rpm', type=int, default=0,
+                        help='per-model requests/min ceiling (0 = unlimited)')
+    parser.add_argument('--retry-after', type=float, default=1.0)
+    parser.add_argument('--slow-rate', type=float, default=0.0,
+                        help='fraction of calls answered after --slow-latency instead')
+    parser.add_argument('--slow-latency', type=float, default=0.0)
+    parser.add_argument('--model-latency', action='append', default=[], metavar='MODEL=SECONDS',
+                        help='latency for models containing MODEL (repeatable)')
+    parser.add_argument('--batch-delay', type=float, default=1.0,
+                        help='seconds until a message batch ends')
+    parser.add_argument('--unsure', action='append', default=[], metavar='MODEL=RATE',
+                        help='fraction of answers from models containing MODEL that '
+                             'say they are unsure (repeatable)')
+    args = parser.parse_args()
+
+    model_latency = {}
+    for item in args.model_latency:
+        model, _, seconds = item.partition('=')
+        model_latency[model] = float(seconds)
+    unsure = {}
+    for item in args.unsure:
+        model, _, rate = item.partition('=')
+        unsure[model] = float(rate)
+    state = MockState(latency=args.latency, fail_rate=args.fail_rate,
+                      rpm=args.rpm, retry_after=args.retry_after,
+                      token_delay=args.token_delay, slow_rate=args.slow_rate,
+                      slow_latency=args.slow_latency, model_latency=model_latency,
+                      batch_delay=args.batch_delay, unsure=unsure)
+    server = MockServer((args.host, args.port), state)
+    print(f"Mock Messages API listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
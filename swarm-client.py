@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Thin client for the swarm daemon
+
+Submits tasks to `swarm-orchestrator.py daemon`, which keeps configs,
+agents and connection pools warm. Only the standard library is imported,
+so a call costs milliseconds plus the model time.
+
+    python swarm-orchestrator.py daemon configs/basic-swarm.yml &
+    python swarm-client.py task configs/basic-swarm.yml "Design the API" [--agent lead]
+    python swarm-client.py parallel configs/basic-swarm.yml frontend="Build UI" backend="Build API"
+    python swarm-client.py collab configs/basic-swarm.yml "Todo app" frontend="UI" backend="API"
+    python swarm-client.py run configs/basic-swarm.yml default "Todo app"
+    python swarm-client.py status | load <config> | reload [config] | stop
+
+The daemon is reached on SWARM_SOCKET (default /tmp/claude-swarm.sock),
+or over TCP with --url http://host:port (e.g. the container's mapped port),
+where POSTs carry the daemon's shared token from SWARM_DAEMON_TOKEN.
+--timeout SECONDS gives the task a deadline; what finished by then is
+returned. A daemon at capacity answers "busy" (exit status 3).
+"""
+
+import os
+import sys
+import json
+import socket
+import http.client
+from urllib.parse import urlparse
+
+DEFAULT_SOCKET = os.environ.get('SWARM_SOCKET', '/tmp/claude-swarm.sock')
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP over a Unix domain socket"""
+
+    def __init__(self, path: str, timeout: float = None):
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+class SwarmBusy(Exception):
+    """The daemon shed the task (admission control)"""
+
+def request(method: str, path: str, payload: dict = None, url: str = None,
+            socket_path: str = DEFAULT_SOCKET) -> dict:
+    """Send one request to the daemon and return its JSON answer"""
+    if url:
+        parsed = urlparse(url)
+        connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80)
+    else:
+        connection = UnixHTTPConnection(socket_path)
+    body = json.dumps(payload).encode() if payload is not None else None
+    headers = {'Content-Type': 'application/json'} if body else {}
+    if url and os.environ.get('SWARM_DAEMON_TOKEN'):
+        headers['Authorization'] = f"Bearer {os.environ['SWARM_DAEMON_TOKEN']}"
+    try:
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        answer = json.loads(response.read() or b'{}')
+    finally:
+        connection.close()
+    if response.status == 503:
+        raise SwarmBusy(answer.get('error', 'Swarm is at capacity'))
+    if response.status != 200:
+        raise RuntimeError(answer.get('error', f"HTTP {response.status}"))
+    return answer
+
+def parse_assignments(args: list) -> dict:
+    """agent="task" arguments as a dict"""
+    tasks = {}
+    for arg in args:
+        agent, sep, task = arg.partition('=')
+        if not sep:
+            raise ValueError(f"Expected agent=\"task\", got '{arg}'")
+        tasks[agent] = task
+    return tasks
+
+def print_result(answer: dict):
+    result = answer['result']
+    if answer['mode'] == 'workflow':
+        for step_id, text in result['results'].items():
+            timing = result['timings'].get(step_id)
+            if timing is None or step_id in result['incomplete']:
+                print(f"\n[{step_id}] unfinished")
+            else:
+                print(f"\n[{step_id}] +{timing['start']:.1f}s, {timing['duration']:.1f}s")
+            print(text)
+        print(f"\nCritical path ({result['critical_path_time']:.1f}s): "
+              f"{' -> '.join(result['critical_path'])}")
+    else:
+        for agent, text in result.items():
+            print(f"\n[{agent}]\n{text}")
+    print(f"\n⏱️  {answer['elapsed']:.2f}s in daemon, session {answer['session']}")
+
+def main():
+    args = sys.argv[1:]
+    url, socket_path, agent, raw, timeout = None, DEFAULT_SOCKET, None, False, None
+    positional = []
+    while args:
+        arg = args.pop(0)
+        if arg == '--url':
+            url = args.pop(0)
+        elif arg == '--socket':
+            socket_path = args.pop(0)
+        elif arg == '--agent':
+            agent = args.pop(0)
+        elif arg == '--json':
+            raw = True
+        elif arg == '--timeout':
+            timeout = float(args.pop(0))
+        else:
+            positional.append(arg)
+    if not positional:
+        print(__doc__.strip())
+        return 2
+
+    command, rest = positional[0], positional[1:]
+    send = lambda method, path, payload=None: request(method, path, payload, url, socket_path)
+    task = lambda payload: send('POST', '/task', dict(payload, timeout=timeout))
+    try:
+        if command == 'status':
+            answer = send('GET', '/status')
+        elif command in ('load', 'reload'):
+            answer = send('POST', f'/{command}', {'config': os.path.abspath(rest[0])} if rest else {})
+        elif command == 'stop':
+            answer = send('POST', '/shutdown', {})
+        elif command == 'task' and len(rest) >= 2:
+            answer = task({'config': os.path.abspath(rest[0]), 'mode': 'delegate',
+                           'task': ' '.join(rest[1:]), 'agent': agent})
+        elif command == 'parallel' and len(rest) >= 2:
+            answer = task({'config': os.path.abspath(rest[0]), 'mode': 'parallel',
+                           'tasks': parse_assignments(rest[1:])})
+        elif command == 'collab' and len(rest) >= 3:
+            answer = task({'config': os.path.abspath(rest[0]), 'mode': 'collaborative',
+                           'task': rest[1], 'subtasks': parse_assignments(rest[2:])})
+        elif command == 'run' and len(rest) >= 3:
+            answer = task({'config': os.path.abspath(rest[0]), 'mode': 'workflow',
+                           'workflow': rest[1], 'task': ' '.join(rest[2:])})
+        else:
+            print(__doc__.strip())
+            return 2
+    except (ConnectionRefusedError, FileNotFoundError):
+        where = url or socket_path
+        print(f"❌ No swarm daemon at {where}. Start one with: "
+              f"python swarm-orchestrator.py daemon [config.yml]")
+        return 1
+    except SwarmBusy as e:
+        print(f"⏳ Busy: {e}. Try again shortly.")
+        return 3
+    except (RuntimeError, ValueError, OSError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    if raw or 'result' not in answer:
+        print(json.dumps(answer, indent=2))
+    else:
+        print_result(answer)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,98 +9,3010 @@ import json
 import yaml
 import asyncio
 import threading
+import time
+import heapq
+import random
+import itertools
+import math
+import gzip
+import atexit
+import hashlib
+import hmac
+import sqlite3
+import re
+import uuid
+import contextlib
+import contextvars
+import signal
+import socket
+import socketserver
+import importlib.util
+import multiprocessing
+from collections import OrderedDict, deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
-from anthropic import Anthropic
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Iterator, AsyncIterator, Tuple
+import httpx
+from anthropic import (
+    Anthropic, AsyncAnthropic, DefaultAsyncHttpxClient,
+    APIStatusError, APIConnectionError
+)
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 import queue
+from abc import ABC, abstractmethod
+
+try:
+    import redis
+except ImportError:
+    redis = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+class TokenBucket:
+    """Continuously refilling bucket for one per-minute limit"""
+    
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.updated = time.monotonic()
+    
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken (0 if available now)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+    
+    def consume(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+    
+    def drain(self):
+        """Empty the bucket, e.g. after the provider answered 429"""
+        self.tokens = min(self.tokens, 0.0)
+
+class _Ticket:
+    """A request waiting for a scheduler slot"""
+    
+    def __init__(self, priority: int, seq: int, model: str, tokens: int):
+        self.priority = priority
+        self.seq = seq
+        self.model = model
+        self.tokens = tokens
+        self.created = time.monotonic()
+        self.granted = False
+        self.event = threading.Event()
+        self.loop = None
+        self.future = None
+    
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+    
+    def grant(self):
+        self.granted = True
+        self.event.set()
+        if self.future is not None:
+            self.loop.call_soon_threadsafe(
+                lambda: self.future.done() or self.future.set_result(None))
+
+class RequestScheduler:
+    """Central gate for every messages.create call
+    
+    Applies per-model requests/min and tokens/min token buckets, a global
+    concurrency cap, priority ordering (lower number goes first) and jittered
+    exponential backoff on 429/529/5xx and connection errors.
+    """
+    
+    RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+    
+    def __init__(self, rate_limits: Dict[str, dict] = None, max_concurrency: int = 64,
+                 max_retries: int = 6, base_delay: float = 0.5, max_delay: float = 30.0):
+        self.rate_limits = rate_limits or {}
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._waiting: List[_Ticket] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._buckets: Dict[str, Dict[str, TokenBucket]] = {}
+        self.stats = {'requests': 0, 'retries': 0, 'rate_limited': 0, 'errors': 0}
+    
+    def _buckets_for(self, model: str) -> Dict[str, TokenBucket]:
+        if model not in self._buckets:
+            limits = self.rate_limits.get(model, self.rate_limits.get('default', {}))
+            buckets = {}
+            if limits.get('requests_per_minute'):
+                buckets['requests'] = TokenBucket(limits['requests_per_minute'])
+            if limits.get('tokens_per_minute'):
+                buckets['tokens'] = TokenBucket(limits['tokens_per_minute'])
+            self._buckets[model] = buckets
+        return self._buckets[model]
+    
+    @staticmethod
+    def estimate_tokens(request: dict) -> int:
+        """Rough token cost of a request: ~4 chars per input token plus max_tokens"""
+        text = json.dumps([request.get('system', ''), request.get('messages', [])])
+        return len(text) // 4 + request.get('max_tokens', 0)
+    
+    def _dispatch(self) -> float:
+        """Grant every waiter that may run now, in priority order
+        
+        Returns the shortest time until a blocked waiter could be granted.
+        Must be called with the lock held.
+        """
+        now = time.monotonic()
+        next_wake = self.max_delay
+        blocked_models = set()
+        self._waiting.sort()
+        for ticket in list(self._waiting):
+            if self._in_flight >= self.max_concurrency:
+                break
+            if ticket.model in blocked_models:
+                continue
+            buckets = self._buckets_for(ticket.model)
+            amounts = {'requests': 1, 'tokens': ticket.tokens}
+            wait = max([b.wait_time(amounts[k], now) for k, b in buckets.items()] + [0.0])
+            if wait > 0:
+                # Keep lower-priority requests for this model behind this one
+                blocked_models.add(ticket.model)
+                next_wake = min(next_wake, wait)
+                continue
+            for kind, bucket in buckets.items():
+                bucket.consume(amounts[kind])
+            self._waiting.remove(ticket)
+            self._in_flight += 1
+            ticket.grant()
+        return next_wake
+    
+    def _enqueue(self, model: str, tokens: int, priority: int) -> _Ticket:
+        ticket = _Ticket(priority, next(self._seq), model, tokens)
+        with self._lock:
+            self._waiting.append(ticket)
+        return ticket
+    
+    def _acquire(self, ticket: _Ticket, deadline: float = None):
+        while True:
+            with self._lock:
+                wait = self._dispatch()
+                if deadline is not None and not ticket.granted:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._waiting.remove(ticket)
+                        raise DeadlineExceeded(f"{ticket.model} call expired in the queue")
+                    wait = min(wait, remaining)
+            if ticket.granted or ticket.event.wait(wait):
+                return
+    
+    async def _aacquire(self, ticket: _Ticket, deadline: float = None):
+        ticket.loop = asyncio.get_running_loop()
+        ticket.future = ticket.loop.create_future()
+        try:
+            while True:
+                with self._lock:
+                    wait = self._dispatch()
+                    if deadline is not None and not ticket.granted:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._waiting.remove(ticket)
+                            raise DeadlineExceeded(f"{ticket.model} call expired in the queue")
+                        wait = min(wait, remaining)
+                if ticket.granted:
+                    return
+                try:
+                    await asyncio.wait_for(asyncio.shield(ticket.future), wait)
+                    return
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            with self._lock:
+                if ticket.granted:
+                    self._in_flight -= 1
+                    self._dispatch()
+                else:
+                    self._waiting.remove(ticket)
+            raise
+    
+    def _release(self, ticket: _Ticket, response=None):
+        with self._lock:
+            self._in_flight -= 1
+            usage = getattr(response, 'usage', None)
+            bucket = self._buckets_for(ticket.model).get('tokens')
+            if usage is not None and bucket is not None:
+                # Reconcile the estimate with what the call really cost
+                actual = usage.input_tokens + usage.output_tokens
+                bucket.tokens += ticket.tokens - actual
+            self._dispatch()
+    
+    @staticmethod
+    def _note_wait(ticket: _Ticket, attempt: int, meta: Optional[dict]):
+        """Add the time a ticket spent queued, and the retry count, to a caller's meta"""
+        if meta is not None:
+            meta['queue_wait'] = meta.get('queue_wait', 0.0) + time.monotonic() - ticket.created
+            meta['retries'] = attempt
+    
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+    
+    @staticmethod
+    def _with_timeout(request: dict, deadline: Optional[float]) -> dict:
+        """The request with an HTTP timeout of the time left before `deadline`"""
+        if deadline is None:
+            return request
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"{request.get('model')} call expired before it was sent")
+        return dict(request, timeout=remaining)
+    
+    @staticmethod
+    def _within(deadline: Optional[float], delay: float, error: Exception):
+        """Raise instead of backing off past the deadline"""
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            raise DeadlineExceeded(f"no time left to retry after: {error}") from error
+    
+    def _retry_delay(self, error: Exception, attempt: int, model: str) -> Optional[float]:
+        """Backoff before the next attempt, or None if the error is final"""
+        status = getattr(error, 'status_code', None)
+        if not isinstance(error, APIConnectionError) and status not in self.RETRYABLE_STATUS:
+            return None
+        if attempt >= self.max_retries:
+            return None
+        
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        
+        with self._lock:
+            self.stats['retries'] += 1
+            if status == 429:
+                # Stop the rest of the burst for this model instead of piling on
+                self.stats['rate_limited'] += 1
+                for bucket in self._buckets_for(model).values():
+                    bucket.drain()
+        return delay
+    
+    def call(self, create, request: dict, priority: int = 10, meta: dict = None,
+             deadline: float = None):
+        """Run create(**request) synchronously under the scheduler
+        
+        If given, `meta` receives the call's total queue wait and retry count.
+        With a `deadline` (time.monotonic() value) the call gives up with
+        DeadlineExceeded instead of queueing or backing off past it, and
+        each attempt's HTTP timeout is the time left.
+        """
+        model = request.get('model', 'default')
+        tokens = self.estimate_tokens(request)
+        attempt = 0
+        while True:
+            ticket = self._enqueue(model, tokens, priority)
+            self._acquire(ticket, deadline)
+            self._note_wait(ticket, attempt, meta)
+            try:
+                response = create(**self._with_timeout(request, deadline))
+            except Exception as e:
+                self._release(ticket)
+                delay = self._retry_delay(e, attempt, model)
+                if delay is None:
+                    self._count('errors')
+                    raise
+                self._within(deadline, delay, e)
+                attempt += 1
+                time.sleep(delay)
+                continue
+            self._release(ticket, response)
+            self._count('requests')
+            return response
+    
+    async def acall(self, create, request: dict, priority: int = 10, meta: dict = None,
+                    deadline: float = None):
+        """Run `await create(**request)` under the scheduler (`deadline` as in call())"""
+        model = request.get('model', 'default')
+        tokens = self.estimate_tokens(request)
+        attempt = 0
+        while True:
+            ticket = self._enqueue(model, tokens, priority)
+            await self._aacquire(ticket, deadline)
+            self._note_wait(ticket, attempt, meta)
+            try:
+                response = await create(**self._with_timeout(request, deadline))
+            except asyncio.CancelledError:
+                self._release(ticket)
+                raise
+            except Exception as e:
+                self._release(ticket)
+                delay = self._retry_delay(e, attempt, model)
+                if delay is None:
+                    self._count('errors')
+                    raise
+                self._within(deadline, delay, e)
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self._release(ticket, response)
+            self._count('requests')
+            return response
+
+    def stream(self, open_stream, request: dict, priority: int = 10,
+               on_response=None, meta: dict = None, deadline: float = None) -> Iterator[str]:
+        """Yield text deltas from open_stream(**request) under the scheduler
+        
+        Failures before the first delta are retried like call(); once text
+        has been yielded an error is raised to the consumer. on_response, if
+        given, receives the final Message (for usage accounting). `deadline`
+        works as in call().
+        """
+        model = request.get('model', 'default')
+        tokens = self.estimate_tokens(request)
+        attempt = 0
+        while True:
+            ticket = self._enqueue(model, tokens, priority)
+            self._acquire(ticket, deadline)
+            self._note_wait(ticket, attempt, meta)
+            started = False
+            response = None
+            error = None
+            try:
+                with open_stream(**self._with_timeout(request, deadline)) as stream:
+                    for text in stream.text_stream:
+                        started = True
+                        yield text
+                    response = stream.get_final_message()
+                    if on_response:
+                        on_response(response)
+            except Exception as e:
+                error = e
+            finally:
+                self._release(ticket, response)
+            
+            if error is None:
+                self._count('requests')
+                return
+            delay = None if started else self._retry_delay(error, attempt, model)
+            if delay is None:
+                self._count('errors')
+                raise error
+            self._within(deadline, delay, error)
+            attempt += 1
+            time.sleep(delay)
+    
+    async def astream(self, open_stream, request: dict, priority: int = 10,
+                      on_response=None, meta: dict = None,
+                      deadline: float = None) -> AsyncIterator[str]:
+        """Async version of stream()"""
+        model = request.get('model', 'default')
+        tokens = self.estimate_tokens(request)
+        attempt = 0
+        while True:
+            ticket = self._enqueue(model, tokens, priority)
+            await self._aacquire(ticket, deadline)
+            self._note_wait(ticket, attempt, meta)
+            started = False
+            response = None
+            error = None
+            try:
+                async with open_stream(**self._with_timeout(request, deadline)) as stream:
+                    async for text in stream.text_stream:
+                        started = True
+                        yield text
+                    response = await stream.get_final_message()
+                    if on_response:
+                        on_response(response)
+            except Exception as e:
+                error = e
+            finally:
+                self._release(ticket, response)
+            
+            if error is None:
+                self._count('requests')
+                return
+            delay = None if started else self._retry_delay(error, attempt, model)
+            if delay is None:
+                self._count('errors')
+                raise error
+            self._within(deadline, delay, error)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+class CallCancelled(Exception):
+    """A call was abandoned because its result is no longer needed"""
+
+class DeadlineExceeded(CallCancelled):
+    """A call ran out of time: its task's deadline passed"""
+
+class SwarmOverloaded(Exception):
+    """A task was turned away by admission control"""
+
+class TaskScope:
+    """Deadline and cancellation shared by one task and every call made for it
+    
+    Stands in for the threading.Event passed as `cancel` to
+    ClaudeAgent.think(): is_set() turns true once the scope is cancelled
+    or its deadline has passed, and the remaining time becomes the HTTP
+    timeout of each request. Child scopes end no later than their parent
+    and are cancelled along with it.
+    """
+    
+    def __init__(self, timeout: float = None, parent: 'TaskScope' = None):
+        self.parent = parent
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        if parent is not None and parent.deadline is not None:
+            deadline = parent.deadline if deadline is None else min(deadline, parent.deadline)
+        # time.monotonic() value, or None for no deadline
+        self.deadline = deadline
+        self._cancelled = threading.Event()
+    
+    def child(self, timeout: float = None) -> 'TaskScope':
+        return TaskScope(timeout, parent=self)
+    
+    def remaining(self) -> Optional[float]:
+        """Seconds until the deadline (never negative), or None without one"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+    
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+    
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set() or (self.parent is not None and self.parent.cancelled())
+    
+    def is_set(self) -> bool:
+        return self.cancelled() or self.expired()
+    
+    def set(self):
+        """Cancel the scope (threading.Event compatible)"""
+        self._cancelled.set()
+    
+    cancel = set
+    
+    # How often waiters look for a cancellation, which sets no timer
+    POLL_INTERVAL = 0.1
+    
+    def wait_time(self) -> float:
+        """How long a waiter may block before checking the scope again"""
+        remaining = self.remaining()
+        return self.POLL_INTERVAL if remaining is None else min(self.POLL_INTERVAL, remaining)
+    
+    def completed(self, futures) -> Iterator:
+        """as_completed() that raises TimeoutError once the scope is cancelled or expires"""
+        pending = set(futures)
+        while pending:
+            if self.is_set():
+                raise TimeoutError
+            done, pending = wait(pending, timeout=self.wait_time(), return_when=FIRST_COMPLETED)
+            yield from done
+    
+    def unfinished(self, agent: str) -> str:
+        """Result text for an agent call this scope stopped"""
+        if self.expired():
+            return f"Deadline exceeded: {agent} did not finish in time"
+        return f"Cancelled: {agent}'s result was not needed"
+
+def call_deadline(events) -> Optional[float]:
+    """Earliest deadline among cancel events that carry one (TaskScopes)"""
+    deadlines = [event.deadline for event in events
+                 if getattr(event, 'deadline', None) is not None]
+    return min(deadlines) if deadlines else None
+
+class AdmissionController:
+    """Queues or sheds new swarm tasks once too much work is in flight
+    
+    A task is admitted while fewer than `max_in_flight` tasks run and its
+    estimated tokens fit in `max_tokens` (a task larger than the whole
+    budget still runs, alone). Otherwise it waits in FIFO order, for at
+    most `queue_timeout` seconds and behind at most `max_queue` others,
+    or with overflow: shed it is refused at once. Refused tasks raise
+    SwarmOverloaded.
+    
+        admission:
+          max_in_flight: 8
+          max_tokens: 200000
+          overflow: queue        # or shed
+          max_queue: 32
+          queue_timeout: 30
+    
+    Only the outermost task is admitted: a collaborative task's inner
+    parallel_task() runs under its parent's admission.
+    """
+    
+    _inside = contextvars.ContextVar('swarm_admitted', default=False)
+    
+    def __init__(self, max_in_flight: int = None, max_tokens: int = None,
+                 overflow: str = 'queue', max_queue: int = 32, queue_timeout: float = 30.0):
+        if overflow not in ('queue', 'shed'):
+            raise ValueError(f"Unknown admission overflow '{overflow}' (use queue or shed)")
+        self.max_in_flight = max_in_flight
+        self.max_tokens = max_tokens
+        self.overflow = overflow
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.tokens = 0
+        self._queue: deque = deque()
+        self._condition = threading.Condition()
+        self.stats = {'admitted': 0, 'queued': 0, 'shed': 0, 'timed_out': 0}
+    
+    @classmethod
+    def from_config(cls, config) -> Optional['AdmissionController']:
+        """Build a controller from a config 'admission' section; None when disabled"""
+        if not config:
+            return None
+        config = dict(config)
+        if not config.pop('enabled', True):
+            return None
+        return cls(**config)
+    
+    def _fits(self, tokens: int) -> bool:
+        if self.max_in_flight is not None and self.in_flight >= self.max_in_flight:
+            return False
+        if self.max_tokens is not None and self.in_flight and self.tokens + tokens > self.max_tokens:
+            return False
+        return True
+    
+    def acquire(self, tokens: int, timeout: float = None):
+        """Admit a task of `tokens` estimated tokens, waiting if allowed to"""
+        with self._condition:
+            if not self._queue and self._fits(tokens):
+                self._admit(tokens)
+                return
+            if self.overflow == 'shed' or len(self._queue) >= self.max_queue:
+                self.stats['shed'] += 1
+                raise SwarmOverloaded(f"Swarm is at capacity ({self.in_flight} tasks, "
+                                      f"{self.tokens} tokens in flight)")
+            ticket = object()
+            self._queue.append(ticket)
+            self.stats['queued'] += 1
+            limit = min(filter(None, (timeout, self.queue_timeout)), default=None)
+            deadline = time.monotonic() + limit if limit else None
+            try:
+                while not (self._queue[0] is ticket and self._fits(tokens)):
+                    wait_time = deadline - time.monotonic() if deadline else None
+                    if wait_time is not None and wait_time <= 0:
+                        self.stats['timed_out'] += 1
+                        raise SwarmOverloaded(f"Task waited {limit:.0f}s for admission")
+                    self._condition.wait(wait_time)
+                self._admit(tokens)
+            finally:
+                self._queue.remove(ticket)
+                self._condition.notify_all()
+    
+    def _admit(self, tokens: int):
+        self.in_flight += 1
+        self.tokens += tokens
+        self.stats['admitted'] += 1
+    
+    def release(self, tokens: int):
+        with self._condition:
+            self.in_flight -= 1
+            self.tokens -= tokens
+            self._condition.notify_all()
+    
+    @contextlib.contextmanager
+    def admit(self, tokens: int, timeout: float = None):
+        """Hold an admission for the duration of a task (re-entrant per task)"""
+        if self._inside.get():
+            yield
+            return
+        self.acquire(tokens, timeout)
+        token = self._inside.set(True)
+        try:
+            yield
+        finally:
+            self._inside.reset(token)
+            self.release(tokens)
+    
+    @contextlib.asynccontextmanager
+    async def aadmit(self, tokens: int, timeout: float = None):
+        """Async version of admit(); waiting happens off the event loop"""
+        if self._inside.get():
+            yield
+            return
+        await asyncio.to_thread(self.acquire, tokens, timeout)
+        token = self._inside.set(True)
+        try:
+            yield
+        finally:
+            self._inside.reset(token)
+            self.release(tokens)
+
+class HedgePolicy:
+    """Decides when a slow call gets a duplicate ("hedged") request
+    
+    The hedge goes out once a call has run longer than the `percentile` of
+    recent latencies for its model (or a fixed `delay`), optionally to a
+    faster model from `models`. The first good answer wins and the other
+    attempt is cancelled. `max_rate` caps hedges as a fraction of calls so
+    a slow provider is not hit with double the load.
+    
+        hedging:
+          percentile: 95
+          min_samples: 20        # no hedging until this many calls were seen
+          max_rate: 0.1
+          models:
+            claude-3-5-sonnet-20241022: claude-3-haiku-20240307
+    """
+    
+    def __init__(self, percentile: float = 95, min_samples: int = 20, window: int = 200,
+                 delay: float = None, min_delay: float = 0.1, max_rate: float = 0.1,
+                 models: Dict[str, str] = None, max_workers: int = 64):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.fixed_delay = delay
+        self.min_delay = min_delay
+        self.max_rate = max_rate
+        self.models = models or {}
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'hedged': 0, 'hedge_wins': 0, 'cancelled': 0}
+        # Attempts run here so the caller can wait on both with a timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hedge')
+    
+    @classmethod
+    def from_config(cls, config) -> Optional['HedgePolicy']:
+        """Build a policy from a config 'hedging' section; None when disabled"""
+        if not config:
+            return None
+        if config is True:
+            return cls()
+        config = dict(config)
+        if not config.pop('enabled', True):
+            return None
+        return cls(**config)
+    
+    def observe(self, model: str, elapsed: float):
+        with self._lock:
+            self._samples.setdefault(model, deque(maxlen=self.window)).append(elapsed)
+    
+    def delay(self, model: str) -> Optional[float]:
+        """Seconds to wait before hedging a call, or None to not hedge it"""
+        if self.fixed_delay is not None:
+            return self.fixed_delay
+        with self._lock:
+            samples = sorted(self._samples.get(model, ()))
+        if len(samples) < self.min_samples:
+            return None
+        rank = max(0, math.ceil(self.percentile / 100 * len(samples)) - 1)
+        return max(self.min_delay, samples[rank])
+    
+    def hedge_model(self, model: str) -> str:
+        return self.models.get(model, self.models.get('default', model))
+    
+    def start(self):
+        with self._lock:
+            self.stats['calls'] += 1
+    
+    def allow(self) -> bool:
+        """Take a hedge from the budget if one is left"""
+        with self._lock:
+            if self.stats['hedged'] + 1 > self.max_rate * self.stats['calls']:
+                return False
+            self.stats['hedged'] += 1
+            return True
+    
+    def record(self, hedge_won: bool, cancelled: int):
+        with self._lock:
+            self.stats['hedge_wins'] += int(hedge_won)
+            self.stats['cancelled'] += cancelled
+
+def verify_complete(text: str, response) -> Optional[str]:
+    """Reject answers cut off by the output budget"""
+    if getattr(response, 'stop_reason', None) == 'max_tokens':
+        return 'truncated'
+    return None
+
+def verify_json(text: str, response) -> Optional[str]:
+    """Reject answers that are not JSON (bare, or in a fenced block)"""
+    match = re.search(r"```(?:json)?[^\n]*\n(.*?)```", text, re.S)
+    try:
+        json.loads(match.group(1) if match else text)
+    except ValueError:
+        return 'invalid json'
+    return None
+
+def verify_validation(text: str, response) -> Optional[str]:
+    """Reject answers whose code blocks fail the validation hooks"""
+    for result in validate_code_blocks(extract_code_blocks(text)):
+        if not result['passed']:
+            return 'validation failed'
+    return None
+
+UNSURE = re.compile(r"\b(I'?m not (?:sure|certain)|I (?:cannot|can't|am unable to) "
+                    r"(?:help|answer|determine)|I don'?t know)\b", re.I)
+
+def verify_confident(text: str, response) -> Optional[str]:
+    """Reject empty answers and answers that say they are unsure"""
+    if not text.strip():
+        return 'empty'
+    if UNSURE.search(text):
+        return 'low confidence'
+    return None
+
+class ModelRouter:
+    """Picks the model and output budget for each agent call, cheapest first
+    
+    `tiers` go from the cheapest model to the most capable one. A call
+    starts on the cheapest tier unless its prompt is large, or the agent's
+    recent answers there were mostly rejected (every `probe_every`-th call
+    still tries it, so an agent can earn its way back). With `cascade`,
+    each answer is checked by the agent's verifiers (its `verify` setting,
+    else the router's) and a rejected one is retried on the next tier;
+    the last tier's answer is always kept.
+    
+    Cheap tiers get an output budget of twice the largest recent answer
+    (between `min_tokens` and the tier's max_tokens); a truncated answer
+    escalates. The top tier always gets its full max_tokens.
+    
+        routing:
+          tiers:
+            - {model: claude-3-haiku-20240307, max_tokens: 1024}
+            - {model: claude-3-5-sonnet-20241022, max_tokens: 4096}
+          verify: [complete, confident]    # also: json, validation
+          large_task_tokens: 2000
+    
+    Instances opt out with `routing: false`, or set their own `verify`.
+    """
+    
+    VERIFIERS = {'complete': verify_complete, 'json': verify_json,
+                 'validation': verify_validation, 'confident': verify_confident}
+    
+    def __init__(self, tiers: List[dict], cascade: bool = True,
+                 verify: List[str] = ('complete', 'confident'),
+                 large_task_tokens: int = 2000, min_tokens: int = 256,
+                 max_escalation_rate: float = 0.5, min_samples: int = 10,
+                 window: int = 50, probe_every: int = 10, cost=None):
+        if not tiers:
+            raise ValueError("routing needs at least one tier")
+        self.tiers = [{'model': tier['model'], 'max_tokens': tier.get('max_tokens', 2048)}
+                      for tier in tiers]
+        self.cascade = cascade
+        self.verify = [verify] if isinstance(verify, str) else list(verify)
+        self.verifiers = dict(self.VERIFIERS)
+        self.large_task_tokens = large_task_tokens
+        self.min_tokens = min_tokens
+        self.max_escalation_rate = max_escalation_rate
+        self.min_samples = min_samples
+        self.window = window
+        self.probe_every = probe_every
+        # Dollar cost of a call's usage on a model, for the savings estimate
+        self.cost = cost or (lambda model, usage: 0.0)
+        self._escalations: Dict[str, deque] = {}
+        self._outputs: Dict[tuple, deque] = {}
+        self._skipped: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'escalated': 0, 'skipped_cheap': 0,
+                      'reasons': {}, 'routes': {}, 'savings': 0.0}
+    
+    @classmethod
+    def from_config(cls, config, cost=None) -> Optional['ModelRouter']:
+        """Build a router from a config 'routing' section; None when disabled"""
+        if not config:
+            return None
+        config = dict(config)
+        if not config.pop('enabled', True):
+            return None
+        return cls(cost=cost, **config)
+    
+    @staticmethod
+    def estimate_tokens(task: str, context: List[dict] = None) -> int:
+        return (len(task) + sum(len(str(c.get('message', ''))) for c in context or ())) // 4
+    
+    def _cheap_tier_failing(self, agent: str) -> bool:
+        """Whether `agent` should skip the cheap tiers this time"""
+        with self._lock:
+            history = self._escalations.get(agent, ())
+            if len(history) < self.min_samples:
+                return False
+            if sum(history) / len(history) <= self.max_escalation_rate:
+                return False
+            self._skipped[agent] = self._skipped.get(agent, 0) + 1
+            if self._skipped[agent] % self.probe_every == 0:
+                return False
+            self.stats['skipped_cheap'] += 1
+            return True
+    
+    def _budget(self, agent: str, tier: dict, last: bool) -> int:
+        if last:
+            return tier['max_tokens']
+        with self._lock:
+            outputs = self._outputs.get((agent, tier['model']))
+            if not outputs:
+                return tier['max_tokens']
+            return max(self.min_tokens, min(tier['max_tokens'], 2 * max(outputs)))
+    
+    def plan(self, agent: str, task: str, context: List[dict] = None) -> List[dict]:
+        """Tiers to try in order, each as {'model', 'max_tokens'}"""
+        tiers = self.tiers
+        if len(tiers) > 1 and (self.estimate_tokens(task, context) > self.large_task_tokens
+                               or self._cheap_tier_failing(agent)):
+            tiers = tiers[-1:]
+        elif not self.cascade:
+            tiers = tiers[:1]
+        return [{'model': tier['model'],
+                 'max_tokens': self._budget(agent, tier, tier is self.tiers[-1])}
+                for tier in tiers]
+    
+    def check(self, text: str, response, verify: List[str] = None) -> Optional[str]:
+        """Why an answer is rejected, or None if every verifier accepts it"""
+        names = verify if verify is not None else self.verify
+        for name in [names] if isinstance(names, str) else names:
+            reason = self.verifiers[name](text, response)
+            if reason:
+                return reason
+        return None
+    
+    def attempt(self, agent: str, route: dict, meta: dict, reason: Optional[str]):
+        """Note one tried tier in meta['route'] (and its answer size, if accepted)"""
+        usage = dict(meta.get('usage') or {})
+        meta.setdefault('route', []).append({'model': route['model'],
+                                             'max_tokens': route['max_tokens'],
+                                             'rejected': reason, 'usage': usage})
+        if reason is None and usage.get('output_tokens'):
+            with self._lock:
+                self._outputs.setdefault((agent, route['model']), deque(
+                    maxlen=self.window)).append(usage['output_tokens'])
+    
+    def record(self, agent: str, meta: dict):
+        """Per-route latency, escalation and savings stats for a finished call"""
+        route = meta.get('route')
+        if not route or meta.get('cached'):
+            return
+        name = ' -> '.join(attempt['model'] for attempt in route)
+        escalated = len(route) > 1
+        final = route[-1]
+        # Against answering everything on the top tier: what the accepted
+        # answer saved, minus what the rejected attempts cost
+        top = self.tiers[-1]['model']
+        savings = (self.cost(top, final['usage']) - self.cost(final['model'], final['usage'])
+                   - sum(self.cost(a['model'], a['usage']) for a in route[:-1]))
+        with self._lock:
+            self.stats['calls'] += 1
+            self.stats['escalated'] += escalated
+            self.stats['savings'] += savings
+            for attempt in route[:-1]:
+                reasons = self.stats['reasons']
+                reasons[attempt['rejected']] = reasons.get(attempt['rejected'], 0) + 1
+            if len(self.tiers) > 1 and route[0]['model'] == self.tiers[0]['model']:
+                self._escalations.setdefault(agent, deque(maxlen=self.window)).append(escalated)
+            row = self.stats['routes'].setdefault((agent, name), {
+                'calls': 0, 'elapsed': 0.0, 'escalated': 0})
+            row['calls'] += 1
+            row['elapsed'] += meta.get('elapsed') or 0.0
+            row['escalated'] += escalated
+    
+    def report(self) -> List[dict]:
+        """One row per agent and route, busiest first"""
+        with self._lock:
+            rows = [{'agent': agent, 'route': name, 'calls': row['calls'],
+                     'mean_elapsed': row['elapsed'] / row['calls']}
+                    for (agent, name), row in self.stats['routes'].items()]
+        return sorted(rows, key=lambda row: row['calls'], reverse=True)
+
+class ResponseCache:
+    """Content-addressed cache of model responses
+    
+    Keyed on a stable hash of the full request (model, system prompt,
+    messages, max_tokens, ...). Lookups go to an in-memory LRU first, then to
+    a SQLite file on disk. Both tiers honour a TTL and evict least recently
+    used entries once over their size budget.
+    """
+    
+    def __init__(self, path: str = 'sessions/cache/responses.sqlite',
+                 ttl: float = 7 * 24 * 3600, max_memory_mb: float = 64,
+                 max_disk_mb: float = 512):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+        self._memory: OrderedDict = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0,
+                      'writes': 0, 'evictions': 0}
+        
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,
+            created REAL NOT NULL, accessed REAL NOT NULL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._db.commit()
+    
+    @classmethod
+    def from_config(cls, config) -> Optional['ResponseCache']:
+        """Build a cache from a config 'cache' section; None when disabled"""
+        if config is True:
+            config = {}
+        if not isinstance(config, dict) or not config.get('enabled', True):
+            return None
+        options = {k: v for k, v in config.items() if k != 'enabled'}
+        return cls(**options)
+    
+    @staticmethod
+    def key(request: dict) -> str:
+        """Stable hash of a request"""
+        canonical = json.dumps(request, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+    
+    def get(self, request: dict) -> Optional[str]:
+        """Return the cached response for a request, or None"""
+        key = self.key(request)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created = entry
+                if now - created <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return value
+                self._drop_memory(key)
+            
+            row = self._db.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+                self.stats['misses'] += 1
+                return None
+            
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self._put_memory(key, row[0], row[1])
+            self.stats['disk_hits'] += 1
+            return row[0]
+    
+    def put(self, request: dict, value: str):
+        """Store a response in both tiers"""
+        key = self.key(request)
+        now = time.time()
+        size = len(value.encode())
+        with self._lock:
+            self._put_memory(key, value, now)
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now))
+            self._evict_disk()
+            self._db.commit()
+            self.stats['writes'] += 1
+    
+    def _put_memory(self, key: str, value: str, created: float):
+        self._drop_memory(key)
+        self._memory[key] = (value, created)
+        self._memory_bytes += len(value)
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            old_key = next(iter(self._memory))
+            self._drop_memory(old_key)
+            self.stats['evictions'] += 1
+    
+    def _drop_memory(self, key: str):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= len(entry[0])
+    
+    def _evict_disk(self):
+        """Expire old rows, then drop least recently used ones over budget"""
+        self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        for key, size in self._db.execute(
+                "SELECT key, size FROM responses ORDER BY accessed").fetchall():
+            if total <= self.max_disk_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.stats['evictions'] += 1
+    
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+class ContextManager:
+    """Keeps inter-agent context and agent history within token budgets
+    
+    fit() trims the context passed to a call: the most important
+    contributions (lowest 'priority', then most recent) are kept whole and
+    the rest are summarized by a cheap model, or truncated when no
+    summarizer is available. compact_history() folds an agent's oldest
+    turns into a running summary, only summarizing the turns it evicts.
+    Summaries are reused for identical text, from an LRU of at most
+    `max_summaries` entries.
+    """
+    
+    def __init__(self, budget: int = 12000, history_budget: int = 6000,
+                 summary_tokens: int = 400, summarize=None, max_summaries: int = 1024):
+        self.budget = budget
+        self.history_budget = history_budget
+        self.summary_tokens = summary_tokens
+        self.summarize = summarize
+        self.max_summaries = max_summaries
+        self._summaries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'trimmed': 0, 'summarized': 0, 'truncated': 0, 'compactions': 0}
+    
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+    
+    @staticmethod
+    def count_tokens(text: str) -> int:
+        """Cheap token estimate (~4 characters per token)"""
+        return len(text) // 4 + 1
+    
+    def shrink(self, text: str, max_tokens: int) -> str:
+        """Reduce text to about max_tokens, summarizing when possible"""
+        if self.count_tokens(text) <= max_tokens:
+            return text
+        key = (hashlib.sha256(text.encode()).hexdigest(), max_tokens)
+        with self._lock:
+            if key in self._summaries:
+                self._summaries.move_to_end(key)
+                return self._summaries[key]
+        
+        shrunk = None
+        if self.summarize:
+            try:
+                shrunk = self.summarize(text, max_tokens)
+                self._count('summarized')
+            except Exception:
+                shrunk = None
+        # The summarizer only aims for max_tokens; hold it to the budget
+        if shrunk is None or self.count_tokens(shrunk) > max_tokens:
+            shrunk = (shrunk or text)[:max_tokens * 4] + "\n...[truncated]"
+            self._count('truncated')
+        
+        with self._lock:
+            self._summaries[key] = shrunk
+            self._summaries.move_to_end(key)
+            while len(self._summaries) > self.max_summaries:
+                self._summaries.popitem(last=False)
+        return shrunk
+    
+    def fit(self, context: List[dict]) -> List[dict]:
+        """Return context trimmed to the per-call budget, in original order"""
+        if not context:
+            return context
+        sizes = [self.count_tokens(c['message']) for c in context]
+        if sum(sizes) <= self.budget:
+            return context
+        
+        self._count('trimmed')
+        # Most important first: explicit priority, then newest
+        order = sorted(range(len(context)),
+                       key=lambda i: (context[i].get('priority', 10), -i))
+        remaining = self.budget
+        keep, squeeze = set(), []
+        for i in order:
+            if sizes[i] <= remaining - 50 * (len(order) - len(keep) - 1):
+                keep.add(i)
+                remaining -= sizes[i]
+            else:
+                squeeze.append(i)
+        
+        fitted = list(context)
+        share = max(50, remaining // max(1, len(squeeze)))
+        for i in squeeze:
+            fitted[i] = dict(context[i], message=self.shrink(context[i]['message'], share))
+        return fitted
+    
+    def history_tokens(self, agent: 'ClaudeAgent') -> int:
+        return self.count_tokens(agent.history_summary) + sum(
+            self.count_tokens(m['content']) for m in agent.context)
+    
+    def compact_history(self, agent: 'ClaudeAgent'):
+        """Fold the oldest turns into agent.history_summary once over budget"""
+        if self.history_tokens(agent) <= self.history_budget:
+            return
+        
+        # Evict down to half the budget so compaction doesn't run every turn
+        evicted = []
+        while agent.context and self.history_tokens(agent) > self.history_budget // 2:
+            evicted.extend(agent.context[:2])
+            del agent.context[:2]
+        
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in evicted)
+        if agent.history_summary:
+            transcript = f"Earlier summary: {agent.history_summary}\n{transcript}"
+        agent.history_summary = self.shrink(transcript, self.summary_tokens)
+        self._count('compactions')
+
+class MessageBus(ABC):
+    """Delivers messages between agents (and tasks to workers)
+    
+    Each agent has a directed stream, and there is one broadcast stream.
+    Consumers read through a consumer group named after the agent, so
+    several worker processes serving the same agent share its messages
+    (each message goes to one of them) while every agent still sees every
+    broadcast. Messages stay pending until acknowledged, and pending
+    entries idle for too long can be reclaimed by another consumer.
+    
+    Backends implement the abstract stream primitives push/pull/ack/reclaim
+    and deliveries (a backend missing one cannot be created); the agent-level
+    publish/consume are built on top of them.
+    """
+    
+    BROADCAST = 'broadcast'
+    
+    def __init__(self, prefix: str = 'swarm', max_len: int = 1000,
+                 publish_timeout: float = 5.0):
+        self.prefix = prefix
+        self.max_len = max_len
+        self.publish_timeout = publish_timeout
+    
+    def stream_name(self, agent: Optional[str]) -> str:
+        return f"{self.prefix}:{agent or self.BROADCAST}"
+    
+    @staticmethod
+    def envelope(sender: str, message: str, to_agent: str = None) -> dict:
+        return {
+            'from': sender,
+            'to': to_agent,
+            'message': message,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    # Stream primitives
+    
+    @abstractmethod
+    def push(self, stream: str, payload: dict, capped: bool = False) -> str:
+        """Append to a stream; capped streams drop old entries instead of blocking
+        
+        Uncapped streams apply backpressure: push blocks, then raises
+        queue.Full, while the stream's backlog is at max_len.
+        """
+    
+    @abstractmethod
+    def pull(self, streams: List[str], group: str, consumer: str, count: int = 10,
+             block: float = 0.0) -> List[Tuple[str, dict]]:
+        """Take up to `count` new (id, payload) entries for a consumer group"""
+    
+    @abstractmethod
+    def ack(self, group: str, entry_ids: List[str]):
+        """Mark entries processed; single-reader (uncapped) entries are deleted"""
+    
+    @abstractmethod
+    def reclaim(self, stream: str, group: str, consumer: str, min_idle: float,
+                count: int = 10) -> List[Tuple[str, dict]]:
+        """Take over entries another consumer has held for min_idle seconds"""
+    
+    @abstractmethod
+    def deliveries(self, group: str, entry_id: str) -> int:
+        """How many times a pending entry has been handed out (pull plus reclaims)"""
+    
+    # Agent messaging
+    
+    def publish(self, envelope: dict) -> str:
+        """Send an envelope to its 'to' agent, or to everyone"""
+        to_agent = envelope.get('to')
+        return self.push(self.stream_name(to_agent), envelope, capped=not to_agent)
+    
+    def consume(self, agent: str, consumer: str = 'main', count: int = 10,
+                block: float = 0.0) -> List[dict]:
+        """Fetch new directed and broadcast messages for an agent; each carries an 'id'"""
+        entries = self.pull([self.stream_name(agent), self.stream_name(None)],
+                            agent, consumer, count, block)
+        return [dict(payload, id=entry_id) for entry_id, payload in entries]
+    
+    def close(self):
+        pass
+
+class InProcessMessageBus(MessageBus):
+    """MessageBus for agents (and worker threads) that all live in this process"""
+    
+    def __init__(self, **options):
+        super().__init__(**options)
+        self._cond = threading.Condition()
+        self._streams: Dict[str, OrderedDict] = {}
+        self._capped = set()
+        self._cursors: Dict[Tuple[str, str], int] = {}
+        # (stream, group) -> entry -> (consumer, delivered at, deliveries)
+        self._pending: Dict[Tuple[str, str], Dict[int, Tuple[str, float, int]]] = {}
+        self._seq = itertools.count(1)
+    
+    def push(self, stream: str, payload: dict, capped: bool = False) -> str:
+        deadline = time.monotonic() + self.publish_timeout
+        with self._cond:
+            entries = self._streams.setdefault(stream, OrderedDict())
+            if capped:
+                self._capped.add(stream)
+                if len(entries) >= self.max_len:
+                    entries.popitem(last=False)
+            while not capped and len(entries) >= self.max_len:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise queue.Full(f"Message stream {stream} is full")
+                self._cond.wait(remaining)
+            entry_id = next(self._seq)
+            entries[entry_id] = payload
+            self._cond.notify_all()
+        return f"{stream}|{entry_id}"
+    
+    def _take(self, stream: str, group: str, consumer: str,
+              count: int) -> List[Tuple[str, dict]]:
+        entries = self._streams.get(stream, {})
+        last = self._cursors.get((stream, group), 0)
+        pending = self._pending.setdefault((stream, group), {})
+        taken = []
+        for entry_id, payload in entries.items():
+            if len(taken) >= count:
+                break
+            if entry_id > last:
+                pending[entry_id] = (consumer, time.monotonic(), 1)
+                self._cursors[(stream, group)] = entry_id
+                taken.append((f"{stream}|{entry_id}", payload))
+        return taken
+    
+    def pull(self, streams: List[str], group: str, consumer: str, count: int = 10,
+             block: float = 0.0) -> List[Tuple[str, dict]]:
+        deadline = time.monotonic() + block
+        with self._cond:
+            while True:
+                entries = []
+                for stream in streams:
+                    entries += self._take(stream, group, consumer, count - len(entries))
+                remaining = deadline - time.monotonic()
+                if entries or remaining <= 0:
+                    return entries
+                self._cond.wait(remaining)
+    
+    def ack(self, group: str, entry_ids: List[str]):
+        with self._cond:
+            for entry_id in entry_ids:
+                stream, _, number = entry_id.rpartition('|')
+                self._pending.get((stream, group), {}).pop(int(number), None)
+                if stream not in self._capped:
+                    # Single-reader streams: free the slot for backpressure
+                    self._streams.get(stream, {}).pop(int(number), None)
+            self._cond.notify_all()
+    
+    def reclaim(self, stream: str, group: str, consumer: str, min_idle: float,
+                count: int = 10) -> List[Tuple[str, dict]]:
+        now = time.monotonic()
+        claimed = []
+        with self._cond:
+            pending = self._pending.get((stream, group), {})
+            entries = self._streams.get(stream, {})
+            for number, (owner, since, delivered) in list(pending.items()):
+                if len(claimed) >= count:
+                    break
+                if now - since >= min_idle and number in entries:
+                    pending[number] = (consumer, now, delivered + 1)
+                    claimed.append((f"{stream}|{number}", entries[number]))
+        return claimed
+    
+    def deliveries(self, group: str, entry_id: str) -> int:
+        stream, _, number = entry_id.rpartition('|')
+        with self._cond:
+            pending = self._pending.get((stream, group), {}).get(int(number))
+        return pending[2] if pending else 0
+
+class RedisMessageBus(MessageBus):
+    """MessageBus on Redis Streams, shared across processes and containers
+    
+    Uses XADD/XREADGROUP/XACK/XAUTOCLAIM with consumer groups. Entries of
+    uncapped streams are deleted once acknowledged so XLEN measures the
+    backlog used for backpressure; capped streams are trimmed with MAXLEN.
+    """
+    
+    def __init__(self, url: str = 'redis://localhost:6379/0', client=None, **options):
+        super().__init__(**options)
+        if client is None:
+            if redis is None:
+                raise ImportError("RedisMessageBus requires the redis package: pip install redis")
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.redis = client
+        self._groups = set()
+    
+    def _ensure_group(self, stream: str, group: str):
+        if (stream, group) in self._groups:
+            return
+        try:
+            self.redis.xgroup_create(stream, group, id='0', mkstream=True)
+        except Exception as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+        self._groups.add((stream, group))
+    
+    def push(self, stream: str, payload: dict, capped: bool = False) -> str:
+        fields = {'data': json.dumps(payload)}
+        if capped:
+            entry_id = self.redis.xadd(stream, fields, maxlen=self.max_len, approximate=True)
+            return f"{stream}|{entry_id}"
+        
+        deadline = time.monotonic() + self.publish_timeout
+        delay = 0.01
+        while self.redis.xlen(stream) >= self.max_len:
+            if time.monotonic() >= deadline:
+                raise queue.Full(f"Message stream {stream} is full")
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+        return f"{stream}|{self.redis.xadd(stream, fields)}"
+    
+    @staticmethod
+    def _decode(stream: str, entries) -> List[Tuple[str, dict]]:
+        return [(f"{stream}|{entry_id}", json.loads(fields['data']))
+                for entry_id, fields in entries if fields]
+    
+    def pull(self, streams: List[str], group: str, consumer: str, count: int = 10,
+             block: float = 0.0) -> List[Tuple[str, dict]]:
+        for stream in streams:
+            self._ensure_group(stream, group)
+        response = self.redis.xreadgroup(
+            group, consumer, {stream: '>' for stream in streams},
+            count=count, block=int(block * 1000) if block else None)
+        entries = []
+        for stream, stream_entries in response or []:
+            entries += self._decode(stream, stream_entries)
+        return entries
+    
+    def ack(self, group: str, entry_ids: List[str]):
+        pipe = self.redis.pipeline()
+        for entry_id in entry_ids:
+            stream, _, redis_id = entry_id.rpartition('|')
+            pipe.xack(stream, group, redis_id)
+            if stream != self.stream_name(None):
+                pipe.xdel(stream, redis_id)
+        pipe.execute()
+    
+    def reclaim(self, stream: str, group: str, consumer: str, min_idle: float,
+                count: int = 10) -> List[Tuple[str, dict]]:
+        self._ensure_group(stream, group)
+        response = self.redis.xautoclaim(stream, group, consumer,
+                                         int(min_idle * 1000), count=count)
+        return self._decode(stream, response[1])
+    
+    def deliveries(self, group: str, entry_id: str) -> int:
+        stream, _, redis_id = entry_id.rpartition('|')
+        pending = self.redis.xpending_range(stream, group, min=redis_id, max=redis_id, count=1)
+        return pending[0]['times_delivered'] if pending else 0
+    
+    def close(self):
+        self.redis.close()
+
+def create_message_bus(config: dict = None) -> MessageBus:
+    """Build the bus described by a config 'message_bus' section
+    
+    backend: 'memory' (default) or 'redis'; the Redis URL defaults to
+    SWARM_REDIS_URL, which selects the Redis backend on its own as well.
+    """
+    config = dict(config or {})
+    redis_url = config.pop('url', os.environ.get('SWARM_REDIS_URL'))
+    backend = config.pop('backend', 'redis' if redis_url else 'memory')
+    if backend == 'redis':
+        return RedisMessageBus(url=redis_url or 'redis://localhost:6379/0', **config)
+    return InProcessMessageBus(**config)
+
+class SessionLogger:
+    """Writes session records as JSON Lines from a background thread
+    
+    log() only enqueues, so callers never wait on disk. The writer keeps
+    one file per agent open (<agent>.jsonl, .jsonl.gz or .jsonl.zst) and
+    fsyncs in batches: after batch_size records or flush_interval seconds.
+    """
+    
+    SUFFIXES = {None: '.jsonl', 'gzip': '.jsonl.gz', 'zstd': '.jsonl.zst'}
+    
+    def __init__(self, session_dir: Path, compression: str = None,
+                 flush_interval: float = 1.0, batch_size: int = 100):
+        if compression not in self.SUFFIXES:
+            raise ValueError(f"Unknown log compression '{compression}' "
+                             f"(use gzip, zstd or none)")
+        if compression == 'zstd' and zstandard is None:
+            raise ImportError("zstd log compression needs the 'zstandard' package")
+        self.session_dir = Path(session_dir)
+        self.compression = compression
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.stats = {'records': 0, 'syncs': 0, 'dropped': 0}
+        self._queue = queue.SimpleQueue()
+        self._files: Dict[str, tuple] = {}
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='session-logger', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+    
+    def log(self, agent: str, record: dict):
+        """Queue a record for <agent>'s log; never blocks"""
+        if self._closed:
+            self.stats['dropped'] += 1
+            return
+        self._queue.put((agent, record))
+    
+    def flush(self, timeout: float = None):
+        """Wait until everything logged so far is on disk"""
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put((None, done))
+        done.wait(timeout)
+    
+    def close(self):
+        """Write out queued records and close every file"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        atexit.unregister(self.close)
+    
+    def path(self, agent: str) -> Path:
+        return self.session_dir / f"{agent}{self.SUFFIXES[self.compression]}"
+    
+    def _open(self, agent: str) -> tuple:
+        raw = open(self.path(agent), 'ab')
+        if self.compression == 'gzip':
+            writer = gzip.GzipFile(fileobj=raw, mode='ab')
+        elif self.compression == 'zstd':
+            writer = zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+        else:
+            writer = raw
+        return raw, writer
+    
+    def _sync(self, agents: set):
+        for agent in agents:
+            raw, writer = self._files[agent]
+            writer.flush()
+            raw.flush()
+            os.fsync(raw.fileno())
+        self.stats['syncs'] += 1
+        agents.clear()
+    
+    def _run(self):
+        dirty = set()
+        unsynced = 0
+        last_sync = time.monotonic()
+        stopping = False
+        while not stopping:
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - last_sync))
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=timeout if dirty else None))
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            
+            waiters = []
+            for item in batch:
+                if item is None:
+                    stopping = True
+                    continue
+                agent, record = item
+                if agent is None:
+                    waiters.append(record)
+                    continue
+                try:
+                    if agent not in self._files:
+                        self._files[agent] = self._open(agent)
+                    line = json.dumps(record, default=str) + '\n'
+                    self._files[agent][1].write(line.encode())
+                    dirty.add(agent)
+                    unsynced += 1
+                    self.stats['records'] += 1
+                except Exception as e:
+                    self.stats['dropped'] += 1
+                    print(f"[session-logger] could not write {agent} record: {e}",
+                          file=sys.stderr)
+            
+            if dirty and (waiters or stopping or unsynced >= self.batch_size
+                          or time.monotonic() - last_sync >= self.flush_interval):
+                self._sync(dirty)
+                unsynced = 0
+                last_sync = time.monotonic()
+            for waiter in waiters:
+                waiter.set()
+        
+        for raw, writer in self._files.values():
+            if writer is not raw:
+                writer.close()
+            raw.close()
+        self._files.clear()
+
+class SwarmMetrics:
+    """Latency, token, retry and cost metrics for every model call
+    
+    Observations are labelled by agent and model. render() produces the
+    Prometheus text format served by serve(); report() gives per-agent
+    rows (slowest first) for the session summary.
+    """
+    
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+    HISTOGRAMS = {
+        'elapsed': ('swarm_request_duration_seconds', 'Total latency of an agent call'),
+        'ttft': ('swarm_time_to_first_token_seconds', 'Time to the first streamed delta'),
+        'queue_wait': ('swarm_queue_wait_seconds', 'Time spent waiting in the request scheduler'),
+    }
+    # USD per million tokens: input, output, cache write, cache read.
+    # The first key contained in the model name wins.
+    PRICES = {
+        'claude-3-haiku': (0.25, 1.25, 0.30, 0.03),
+        'haiku': (0.80, 4.00, 1.00, 0.08),
+        'sonnet': (3.00, 15.00, 3.75, 0.30),
+        'opus': (15.00, 75.00, 18.75, 1.50),
+    }
+    # Message Batches are billed at half the interactive price
+    BATCH_DISCOUNT = 0.5
+    TOKEN_TYPES = (('input', 'input_tokens'), ('output', 'output_tokens'),
+                   ('cache_write', 'cache_creation_input_tokens'),
+                   ('cache_read', 'cache_read_input_tokens'))
+    
+    def __init__(self, prices: Dict[str, dict] = None):
+        # Configured prices take precedence over the built-in table
+        self.prices = {model: (price.get('input', 0), price.get('output', 0),
+                               price.get('cache_write', 0), price.get('cache_read', 0))
+                       for model, price in (prices or {}).items()}
+        for key, price in self.PRICES.items():
+            self.prices.setdefault(key, price)
+        self._lock = threading.Lock()
+        self._histograms: Dict[tuple, list] = {}
+        self._counters: Dict[tuple, float] = {}
+        self._server = None
+    
+    def cost(self, model: str, usage: dict) -> float:
+        """Dollar cost of one call's token usage"""
+        for key, price in self.prices.items():
+            if key in model:
+                return sum(usage.get(field, 0) * rate for (_, field), rate
+                           in zip(self.TOKEN_TYPES, price)) / 1_000_000
+        return 0.0
+    
+    def _observe(self, kind: str, labels: tuple, value: float):
+        hist = self._histograms.setdefault((kind, labels), [[0] * len(self.BUCKETS), 0.0, 0])
+        for i, bound in enumerate(self.BUCKETS):
+            if value <= bound:
+                hist[0][i] += 1
+        hist[1] += value
+        hist[2] += 1
+    
+    def _inc(self, name: str, labels: tuple, amount: float = 1):
+        self._counters[(name, labels)] = self._counters.get((name, labels), 0) + amount
+    
+    def observe(self, agent: str, meta: dict):
+        """Record one finished call from the meta dict filled by ClaudeAgent"""
+        model = meta.get('model', 'unknown')
+        labels = (agent, model)
+        outcome = ('deadline' if meta.get('deadline_exceeded') else
+                   'cancelled' if meta.get('cancelled') else 'error' if meta.get('error')
+                   else 'cached' if meta.get('cached') else 'ok')
+        with self._lock:
+            self._inc('requests', labels + (outcome,))
+            if meta.get('hedged'):
+                self._inc('hedges', labels + ('hedge' if meta.get('hedge_won') else 'primary',))
+            if outcome == 'cached':
+                # Served locally: keep cache hits out of the latency histograms
+                return
+            for kind in self.HISTOGRAMS:
+                if meta.get(kind) is not None:
+                    self._observe(kind, labels, meta[kind])
+            if meta.get('retries'):
+                self._inc('retries', labels, meta['retries'])
+            usage = meta.get('usage') or {}
+            for token_type, field in self.TOKEN_TYPES:
+                if usage.get(field):
+                    self._inc('tokens', labels + (token_type,), usage[field])
+            if usage:
+                cost = self.cost(model, usage)
+                self._inc('cost', labels, cost * self.BATCH_DISCOUNT if meta.get('batch') else cost)
+            # Cascade attempts whose answers were rejected still cost tokens
+            for attempt in (meta.get('route') or [])[:-1]:
+                attempt_labels = (agent, attempt['model'])
+                self._inc('requests', attempt_labels + ('escalated',))
+                for token_type, field in self.TOKEN_TYPES:
+                    if attempt['usage'].get(field):
+                        self._inc('tokens', attempt_labels + (token_type,),
+                                  attempt['usage'][field])
+                self._inc('cost', attempt_labels, self.cost(attempt['model'], attempt['usage']))
+    
+    @staticmethod
+    def _labels(names: tuple, values: tuple) -> str:
+        return ','.join(f'{name}="{value}"' for name, value in zip(names, values))
+    
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for kind, (name, help_text) in self.HISTOGRAMS.items():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (hist_kind, labels), (buckets, total, count) in sorted(self._histograms.items()):
+                    if hist_kind != kind:
+                        continue
+                    base = self._labels(('agent', 'model'), labels)
+                    for bound, bucket_count in zip(self.BUCKETS, buckets):
+                        lines.append(f'{name}_bucket{{{base},le="{bound}"}} {bucket_count}')
+                    lines.append(f'{name}_bucket{{{base},le="+Inf"}} {count}')
+                    lines.append(f"{name}_sum{{{base}}} {total}")
+                    lines.append(f"{name}_count{{{base}}} {count}")
+            counters = (
+                ('requests', 'swarm_requests_total',
+                 'Agent calls by outcome (escalated: rejected by a routing verifier)',
+                 ('agent', 'model', 'outcome')),
+                ('retries', 'swarm_retries_total', 'Retried attempts', ('agent', 'model')),
+                ('hedges', 'swarm_hedged_requests_total',
+                 'Calls that sent a hedge request, by the attempt that won',
+                 ('agent', 'model', 'winner')),
+                ('tokens', 'swarm_tokens_total', 'Tokens by type', ('agent', 'model', 'type')),
+                ('cost', 'swarm_cost_dollars_total', 'Estimated spend in USD', ('agent', 'model')),
+            )
+            for key, name, help_text, label_names in counters:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for (counter, labels), value in sorted(self._counters.items()):
+                    if counter == key:
+                        lines.append(f"{name}{{{self._labels(label_names, labels)}}} {value}")
+        return '\n'.join(lines) + '\n'
+    
+    def _quantile(self, q: float, buckets: List[int], count: int) -> float:
+        """Estimate a quantile from bucket counts, as histogram_quantile() does"""
+        rank = q * count
+        lower, below = 0.0, 0
+        for bound, cumulative in zip(self.BUCKETS, buckets):
+            if cumulative >= rank:
+                in_bucket = cumulative - below
+                return lower + (bound - lower) * ((rank - below) / in_bucket if in_bucket else 1)
+            lower, below = bound, cumulative
+        return self.BUCKETS[-1]
+    
+    def report(self) -> List[dict]:
+        """Per agent/model rows, slowest (by p95 latency) first"""
+        rows = {}
+        with self._lock:
+            for (counter, labels), value in self._counters.items():
+                row = rows.setdefault(labels[:2], {
+                    'agent': labels[0], 'model': labels[1], 'calls': 0, 'errors': 0,
+                    'cached': 0, 'retries': 0, 'tokens': 0, 'cost': 0.0})
+                if counter == 'requests':
+                    row['calls'] += value
+                    if labels[2] in ('error', 'cached'):
+                        row[{'error': 'errors', 'cached': 'cached'}[labels[2]]] += value
+                elif counter in ('retries', 'tokens', 'cost'):
+                    row[counter] += value
+            for (kind, labels), (buckets, total, count) in self._histograms.items():
+                row = rows[labels]
+                if kind == 'elapsed':
+                    row['p50'] = self._quantile(0.5, buckets, count)
+                    row['p95'] = self._quantile(0.95, buckets, count)
+                row[f'mean_{kind}'] = total / count if count else 0.0
+        return sorted(rows.values(), key=lambda row: row.get('p95', 0.0), reverse=True)
+    
+    def serve(self, port: int, host: str = '0.0.0.0'):
+        """Serve GET /metrics from a background thread"""
+        metrics = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+            
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+        
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='metrics-server',
+                         daemon=True).start()
+        return self._server
+    
+    def close(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
 
 class ClaudeAgent:
     """Individual AI agent with specific role and capabilities"""
     
-    def __init__(self, name: str, config: dict, api_key: str):
-        self.name = name
-        self.config = config
-        self.client = Anthropic(api_key=api_key)
-        self.model = config.get('model', 'claude-3-5-sonnet-20241022')
-        self.directory = Path(config.get('directory', '.'))
-        self.tools = config.get('tools', [])
-        self.connections = config.get('connections', [])
-        self.description = config.get('description', '')
-        self.message_queue = queue.Queue()
-        self.context = []
-        
-    def think(self, task: str, context: List[dict] = None) -> str:
-        """Process a task with optional context from other agents"""
+    def __init__(self, name: str, config: dict, api_key: str,
+                 client: Optional[Anthropic] = None,
+                 async_client: Optional[AsyncAnthropic] = None,
+                 scheduler: Optional[RequestScheduler] = None,
+                 cache: Optional[ResponseCache] = None,
+                 context_manager: Optional[ContextManager] = None,
+                 bus: Optional[MessageBus] = None,
+                 metrics: Optional['SwarmMetrics'] = None,
+                 hedging: Optional[HedgePolicy] = None,
+                 router: Optional[ModelRouter] = None):
+        self.name = name
+        self.config = config
+        self.api_key = api_key
+        self.client = client or Anthropic(api_key=api_key)
+        self.async_client = async_client
+        self.scheduler = scheduler
+        self.cache = cache
+        self.context_manager = context_manager
+        self.bus = bus
+        self.metrics = metrics
+        self.hedging = hedging
+        self.router = router
+        # Verifiers for cascaded answers; None means the router's defaults
+        self.verify = config.get('verify')
+        self.model = config.get('model', 'claude-3-5-sonnet-20241022')
+        self.directory = Path(config.get('directory', '.'))
+        self.tools = config.get('tools', [])
+        self.connections = config.get('connections', [])
+        self.description = config.get('description', '')
+        self.priority = config.get('priority', 10)
+        self.prompt_caching = config.get('prompt_caching', True)
+        self.message_queue = queue.Queue()
+        # Rolling conversation history (user/assistant turns), opt-in
+        self.keep_history = config.get('keep_history', False)
+        self.context = []
+        self.history_summary = ''
+        self._history_lock = threading.Lock()
+        self.usage = {'calls': 0, 'input_tokens': 0, 'output_tokens': 0,
+                      'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 0}
+        self._usage_lock = threading.Lock()
+        
+        # The role prompt never changes, so build it once
+        self.system_prompt = f"""You are {self.name}, {self.description}
+        
+Your capabilities: {', '.join(self.tools)}
+Connected agents: {', '.join(self.connections)}
+Working directory: {self.directory}
+
+Respond as this specific agent would, focusing on your area of expertise."""
+        
+    def _cacheable(self, text: str):
+        """Mark a stable prompt prefix for the API's prompt cache"""
+        if not self.prompt_caching:
+            return text
+        return [{'type': 'text', 'text': text, 'cache_control': {'type': 'ephemeral'}}]
+    
+    def _build_request(self, task: str, context: List[dict] = None,
+                       route: dict = None) -> dict:
+        """Build the messages.create arguments for a task
+        
+        `route` ({'model', 'max_tokens'} from the ModelRouter) overrides
+        the agent's model and output budget.
+        """
+        
+        messages = []
+        if self.keep_history:
+            with self._history_lock:
+                if self.history_summary:
+                    messages.append({"role": "user", "content":
+                                     f"Summary of our earlier conversation: {self.history_summary}"})
+                    messages.append({"role": "assistant", "content": "Understood."})
+                messages.extend(dict(m) for m in self.context)
+        
+        # Add context from other agents if provided
+        if context:
+            messages.append({
+                "role": "user", 
+                "content": self._cacheable(f"Context from other agents:\n" + "\n".join([
+                    f"{c['agent']}: {c['message']}" for c in context
+                ]))
+            })
+        
+        messages.append({"role": "user", "content": task})
+        
+        route = route or {}
+        return {
+            'model': route.get('model', self.model),
+            'max_tokens': route.get('max_tokens', 2048),
+            'system': self._cacheable(self.system_prompt),
+            'messages': messages
+        }
+    
+    USAGE_FIELDS = ('input_tokens', 'output_tokens',
+                    'cache_creation_input_tokens', 'cache_read_input_tokens')
+    
+    def _record_usage(self, response, meta: dict = None):
+        """Accumulate token usage, including prompt-cache reads and writes"""
+        usage = getattr(response, 'usage', None)
+        if usage is None:
+            return
+        call_usage = {field: getattr(usage, field, None) or 0 for field in self.USAGE_FIELDS}
+        with self._usage_lock:
+            self.usage['calls'] += 1
+            for field, tokens in call_usage.items():
+                self.usage[field] += tokens
+        if meta is not None:
+            meta['usage'] = call_usage
+    
+    def _start_call(self, meta: Optional[dict]) -> dict:
+        """Reset a caller-supplied meta dict for a new call"""
+        meta = meta if meta is not None else {}
+        meta.update({'model': self.model, 'start': time.monotonic(),
+                     'cached': False, 'error': False, 'queue_wait': 0.0, 'retries': 0})
+        return meta
+    
+    def _finish_call(self, meta: dict):
+        meta['elapsed'] = time.monotonic() - meta.pop('start')
+        if self.router:
+            self.router.record(self.name, meta)
+        if self.metrics:
+            self.metrics.observe(self.name, meta)
+    
+    def _create(self, request: dict, meta: dict = None):
+        """Send a request, through the scheduler when one is attached"""
+        if self.scheduler:
+            response = self.scheduler.call(self.client.messages.create, request,
+                                           self.priority, meta=meta)
+        else:
+            response = self.client.messages.create(**request)
+        self._record_usage(response, meta)
+        return response
+    
+    async def _acreate(self, request: dict, meta: dict = None, deadline: float = None):
+        """Async version of _create()"""
+        response = await self._asend(request, meta, deadline)
+        self._record_usage(response, meta)
+        return response
+    
+    def _attempt(self, request: dict, meta: dict, stop: tuple):
+        """One streamed call, abandoned at the next delta once any event in `stop` is set
+        
+        Leaving the stream closes its connection, so the provider stops
+        generating. Returns the final Message; usage is not recorded.
+        """
+        final = []
+        deadline = call_deadline(stop)
+        if self.scheduler:
+            deltas = self.scheduler.stream(self.client.messages.stream, request, self.priority,
+                                           on_response=final.append, meta=meta,
+                                           deadline=deadline)
+        else:
+            def direct():
+                with self.client.messages.stream(
+                        **RequestScheduler._with_timeout(request, deadline)) as stream:
+                    yield from stream.text_stream
+                    final.append(stream.get_final_message())
+            deltas = direct()
+        try:
+            for _ in deltas:
+                if any(event.is_set() for event in stop):
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise DeadlineExceeded(f"{self.name}: {request['model']} call timed out")
+                    raise CallCancelled(f"{self.name}: {request['model']} call cancelled")
+        finally:
+            deltas.close()
+        return final[0]
+    
+    def _call(self, request: dict, meta: dict, cancel: threading.Event = None):
+        """Send a request: hedged if a policy is attached, cancellable if `cancel` is given"""
+        if self.hedging:
+            return self._hedged_create(request, meta, cancel)
+        if cancel is not None:
+            response = self._attempt(request, meta, (cancel,))
+            self._record_usage(response, meta)
+            return response
+        return self._create(request, meta)
+    
+    def _hedged_create(self, request: dict, meta: dict, cancel: threading.Event = None):
+        """Send a request and, if it is slow, a hedge; the first good answer wins
+        
+        The losing attempt is cancelled. `meta` gets 'hedged', 'hedge_won'
+        and the model that answered.
+        """
+        policy = self.hedging
+        model = request['model']
+        attempts = {}
+        
+        def launch(attempt_request: dict, role: str):
+            stop = threading.Event()
+            attempt_meta = {}
+            future = policy.executor.submit(self._attempt, attempt_request, attempt_meta,
+                                            (stop, cancel) if cancel else (stop,))
+            attempts[future] = (role, attempt_request['model'], attempt_meta, stop)
+        
+        policy.start()
+        start = time.monotonic()
+        launch(request, 'primary')
+        delay = policy.delay(model)
+        if delay is not None:
+            done, _ = wait(attempts, timeout=delay)
+            if not done and policy.allow():
+                launch(dict(request, model=policy.hedge_model(model)), 'hedge')
+        
+        winner, response, error = None, None, None
+        pending = set(attempts)
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                if winner is None:
+                    winner, response = future, result
+        for future in pending:
+            attempts[future][3].set()
+        
+        meta['retries'] = sum(a[2].get('retries', 0) for a in attempts.values())
+        if winner is None:
+            raise error
+        role, answered_by, attempt_meta, _ = attempts[winner]
+        meta['queue_wait'] = attempt_meta.get('queue_wait', 0.0)
+        if role == 'primary':
+            # Only uncensored latencies: a cancelled primary's would read short
+            policy.observe(model, time.monotonic() - start)
+        if len(attempts) > 1:
+            meta['hedged'] = True
+            meta['hedge_won'] = role == 'hedge'
+            policy.record(role == 'hedge', len(pending))
+        meta['model'] = answered_by
+        self._record_usage(response, meta)
+        return response
+    
+    async def _asend(self, request: dict, meta: dict, deadline: float = None):
+        if self.scheduler:
+            return await self.scheduler.acall(
+                self.async_client.messages.create, request, self.priority, meta=meta,
+                deadline=deadline)
+        return await self.async_client.messages.create(
+            **RequestScheduler._with_timeout(request, deadline))
+    
+    async def _ahedged_create(self, request: dict, meta: dict, deadline: float = None):
+        """Async version of _hedged_create(); the loser's task is cancelled"""
+        policy = self.hedging
+        model = request['model']
+        policy.start()
+        start = time.monotonic()
+        attempts = {}
+        primary_meta = {}
+        primary = asyncio.create_task(self._asend(request, primary_meta, deadline))
+        attempts[primary] = ('primary', model, primary_meta)
+        delay = policy.delay(model)
+        if delay is not None:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if not done and policy.allow():
+                hedge_request = dict(request, model=policy.hedge_model(model))
+                hedge_meta = {}
+                hedge = asyncio.create_task(self._asend(hedge_request, hedge_meta, deadline))
+                attempts[hedge] = ('hedge', hedge_request['model'], hedge_meta)
+        
+        winner, response, error = None, None, None
+        pending = set(attempts)
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                    elif winner is None:
+                        winner, response = task, task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+        
+        meta['retries'] = sum(a[2].get('retries', 0) for a in attempts.values())
+        if winner is None:
+            raise error
+        role, answered_by, attempt_meta = attempts[winner]
+        meta['queue_wait'] = attempt_meta.get('queue_wait', 0.0)
+        if role == 'primary':
+            policy.observe(model, time.monotonic() - start)
+        if len(attempts) > 1:
+            meta['hedged'] = True
+            meta['hedge_won'] = role == 'hedge'
+            policy.record(role == 'hedge', len(pending))
+        meta['model'] = answered_by
+        self._record_usage(response, meta)
+        return response
+    
+    def _remember(self, task: str, response: str):
+        """Append a turn to the rolling history and compact it if needed"""
+        if not self.keep_history:
+            return
+        with self._history_lock:
+            self.context.append({"role": "user", "content": task})
+            self.context.append({"role": "assistant", "content": response})
+            if self.context_manager:
+                self.context_manager.compact_history(self)
+    
+    def _routes(self, task: str, context: List[dict] = None) -> List[Optional[dict]]:
+        """Tiers to try for a call: the router's cascade, or just the agent's model"""
+        return self.router.plan(self.name, task, context) if self.router else [None]
+    
+    def _escalate(self, route: Optional[dict], last: bool, text: str,
+                  response, meta: dict) -> bool:
+        """Whether a routed answer was rejected and the next tier should be tried"""
+        if route is None:
+            return False
+        reason = None if last else self.router.check(text, response, self.verify)
+        self.router.attempt(self.name, route, meta, reason)
+        return reason is not None
+    
+    def _stopped(self, error: Exception, cancel, meta: dict) -> str:
+        """Result of a call abandoned by cancellation or its deadline"""
+        meta['cancelled'] = True
+        expired = isinstance(error, DeadlineExceeded) or (
+            isinstance(cancel, TaskScope) and cancel.expired())
+        if expired:
+            meta['deadline_exceeded'] = True
+            return f"Deadline exceeded: {self.name} did not finish in time"
+        return f"Cancelled: {self.name}'s result was not needed"
+    
+    def think(self, task: str, context: List[dict] = None, meta: dict = None,
+              cancel: threading.Event = None) -> str:
+        """Process a task with optional context from other agents
+        
+        If a `meta` dict is passed it is filled with details of the call:
+        model, elapsed seconds, per-call token usage, cached and error flags.
+        Setting `cancel` abandons the call (the result is then a
+        "Cancelled" message and meta['cancelled'] is set). A TaskScope as
+        `cancel` also bounds the call by its deadline ("Deadline exceeded",
+        meta['deadline_exceeded']).
+        """
+        meta = self._start_call(meta)
+        try:
+            if self.context_manager:
+                context = self.context_manager.fit(context)
+            routes = self._routes(task, context)
+            for index, route in enumerate(routes):
+                request = self._build_request(task, context, route)
+                meta['model'] = request['model']
+                if self.cache:
+                    cached = self.cache.get(request)
+                    if cached is not None:
+                        meta['cached'] = True
+                        self._remember(task, cached)
+                        return cached
+                
+                try:
+                    response = self._call(request, meta, cancel)
+                    text = response.content[0].text
+                except Exception as e:
+                    if isinstance(e, CallCancelled) or (cancel is not None and cancel.is_set()):
+                        # Includes HTTP timeouts the deadline set
+                        return self._stopped(e, cancel, meta)
+                    meta['error'] = True
+                    return f"Error in {self.name}: {str(e)}"
+                
+                if self._escalate(route, index == len(routes) - 1, text, response, meta):
+                    continue
+                # A hedge answered by another model is not this request's answer
+                if self.cache and meta['model'] == request['model']:
+                    self.cache.put(request, text)
+                self._remember(task, text)
+                return text
+        finally:
+            self._finish_call(meta)
+    
+    async def athink(self, task: str, context: List[dict] = None, meta: dict = None,
+                     deadline: float = None) -> str:
+        """Async version of think() running on the shared AsyncAnthropic client
+        
+        `deadline` (a time.monotonic() value) drops the call from the
+        scheduler queue once it passes, and bounds each attempt's HTTP timeout.
+        """
+        if self.async_client is None:
+            self.async_client = AsyncAnthropic(api_key=self.api_key)
+        meta = self._start_call(meta)
+        try:
+            if self.context_manager and context:
+                # Summarizing is a blocking call; keep it off the event loop
+                context = await asyncio.to_thread(self.context_manager.fit, context)
+            routes = self._routes(task, context)
+            for index, route in enumerate(routes):
+                request = self._build_request(task, context, route)
+                meta['model'] = request['model']
+                if self.cache:
+                    cached = self.cache.get(request)
+                    if cached is not None:
+                        meta['cached'] = True
+                        self._remember(task, cached)
+                        return cached
+                
+                try:
+                    if self.hedging:
+                        response = await self._ahedged_create(request, meta, deadline)
+                    else:
+                        response = await self._acreate(request, meta, deadline)
+                    text = response.content[0].text
+                except asyncio.CancelledError:
+                    # The caller's task was cancelled (e.g. its deadline passed)
+                    meta['cancelled'] = True
+                    raise
+                except Exception as e:
+                    if isinstance(e, CallCancelled) or (
+                            deadline is not None and time.monotonic() >= deadline):
+                        # Includes HTTP timeouts the deadline set
+                        return self._stopped(DeadlineExceeded(str(e)), None, meta)
+                    meta['error'] = True
+                    return f"Error in {self.name}: {str(e)}"
+                
+                if self._escalate(route, index == len(routes) - 1, text, response, meta):
+                    continue
+                if self.cache and meta['model'] == request['model']:
+                    self.cache.put(request, text)
+                if self.keep_history:
+                    await asyncio.to_thread(self._remember, task, text)
+                return text
+        finally:
+            self._finish_call(meta)
+    
+    def think_stream(self, task: str, context: List[dict] = None,
+                     meta: dict = None, cancel: threading.Event = None) -> Iterator[str]:
+        """Like think(), but yields the response as text deltas as they arrive
+        
+        `meta` is filled as in think(), plus 'ttft' (seconds to first delta).
+        Deltas reach the caller before an answer could be verified, so a
+        routed stream goes straight to the tier a cascade would end on.
+        `cancel` works as in think(): the stream is left at the next delta
+        and the "Cancelled" or "Deadline exceeded" text is the last one.
+        """
+        meta = self._start_call(meta)
+        try:
+            if self.context_manager:
+                context = self.context_manager.fit(context)
+            request = self._build_request(task, context, self._routes(task, context)[-1])
+            meta['model'] = request['model']
+            if self.cache:
+                cached = self.cache.get(request)
+                if cached is not None:
+                    meta['cached'] = True
+                    meta['ttft'] = time.monotonic() - meta['start']
+                    self._remember(task, cached)
+                    yield cached
+                    return
+            
+            chunks = []
+            deadline = call_deadline((cancel,)) if cancel is not None else None
+            try:
+                if cancel is not None and cancel.is_set():
+                    raise CallCancelled(f"{self.name} was stopped before it started")
+                if self.scheduler:
+                    deltas = self.scheduler.stream(
+                        self.client.messages.stream, request, self.priority,
+                        on_response=lambda response: self._record_usage(response, meta),
+                        meta=meta, deadline=deadline)
+                else:
+                    deltas = self._stream_direct(request, meta, deadline)
+                for text in deltas:
+                    if cancel is not None and cancel.is_set():
+                        # Leaving the stream closes its connection
+                        deltas.close()
+                        raise CallCancelled(f"{self.name} was stopped")
+                    if not chunks:
+                        meta['ttft'] = time.monotonic() - meta['start']
+                    chunks.append(text)
+                    yield text
+            except Exception as e:
+                if isinstance(e, CallCancelled) or (cancel is not None and cancel.is_set()):
+                    # Includes HTTP timeouts the deadline set
+                    yield self._stopped(e, cancel, meta)
+                    return
+                meta['error'] = True
+                yield f"Error in {self.name}: {str(e)}"
+                return
+            
+            if self.cache:
+                self.cache.put(request, ''.join(chunks))
+            self._remember(task, ''.join(chunks))
+        finally:
+            self._finish_call(meta)
+    
+    def _stream_direct(self, request: dict, meta: dict = None,
+                       deadline: float = None) -> Iterator[str]:
+        with self.client.messages.stream(
+                **RequestScheduler._with_timeout(request, deadline)) as stream:
+            yield from stream.text_stream
+            self._record_usage(stream.get_final_message(), meta)
+    
+    async def athink_stream(self, task: str, context: List[dict] = None, meta: dict = None,
+                            cancel: 'TaskScope' = None) -> AsyncIterator[str]:
+        """Async version of think_stream()
+        
+        With a TaskScope as `cancel`, waiting for the next delta stops once
+        the scope is cancelled or its deadline passes, and the "Cancelled" or
+        "Deadline exceeded" text is the last delta.
+        """
+        if self.async_client is None:
+            self.async_client = AsyncAnthropic(api_key=self.api_key)
+        meta = self._start_call(meta)
+        try:
+            if self.context_manager and context:
+                context = await asyncio.to_thread(self.context_manager.fit, context)
+            request = self._build_request(task, context, self._routes(task, context)[-1])
+            meta['model'] = request['model']
+            if self.cache:
+                cached = self.cache.get(request)
+                if cached is not None:
+                    meta['cached'] = True
+                    meta['ttft'] = time.monotonic() - meta['start']
+                    self._remember(task, cached)
+                    yield cached
+                    return
+            
+            chunks = []
+            deadline = call_deadline((cancel,)) if cancel is not None else None
+            try:
+                if cancel is not None and cancel.is_set():
+                    raise CallCancelled(f"{self.name} was stopped before it started")
+                if self.scheduler:
+                    deltas = self.scheduler.astream(
+                        self.async_client.messages.stream, request, self.priority,
+                        on_response=lambda response: self._record_usage(response, meta),
+                        meta=meta, deadline=deadline)
+                else:
+                    deltas = self._astream_direct(request, meta, deadline)
+                try:
+                    while True:
+                        try:
+                            text = await self._anext_delta(deltas, cancel)
+                        except StopAsyncIteration:
+                            break
+                        if not chunks:
+                            meta['ttft'] = time.monotonic() - meta['start']
+                        chunks.append(text)
+                        yield text
+                finally:
+                    await deltas.aclose()
+            except Exception as e:
+                if isinstance(e, CallCancelled) or (cancel is not None and cancel.is_set()):
+                    # Includes HTTP timeouts the deadline set
+                    yield self._stopped(e, cancel, meta)
+                    return
+                meta['error'] = True
+                yield f"Error in {self.name}: {str(e)}"
+                return
+            
+            if self.cache:
+                self.cache.put(request, ''.join(chunks))
+            if self.keep_history:
+                await asyncio.to_thread(self._remember, task, ''.join(chunks))
+        finally:
+            self._finish_call(meta)
+    
+    async def _anext_delta(self, deltas: AsyncIterator[str], cancel: Optional['TaskScope']) -> str:
+        """The next delta, raising CallCancelled once `cancel` is set while waiting for it"""
+        if cancel is None:
+            return await deltas.__anext__()
+        step = asyncio.ensure_future(deltas.__anext__())
+        while True:
+            done, _ = await asyncio.wait({step}, timeout=cancel.wait_time())
+            if done:
+                return step.result()
+            if cancel.is_set():
+                # Cancelling the read closes the stream's connection
+                step.cancel()
+                await asyncio.wait({step})
+                raise CallCancelled(f"{self.name} was stopped")
+    
+    async def _astream_direct(self, request: dict, meta: dict = None,
+                              deadline: float = None) -> AsyncIterator[str]:
+        async with self.async_client.messages.stream(
+                **RequestScheduler._with_timeout(request, deadline)) as stream:
+            async for text in stream.text_stream:
+                yield text
+            self._record_usage(await stream.get_final_message(), meta)
+    
+    def send_message(self, message: str, to_agent: str = None):
+        """Send a message to another agent or broadcast"""
+        if self.bus:
+            self.bus.publish(MessageBus.envelope(self.name, message, to_agent))
+            return
+        self.message_queue.put({
+            'from': self.name,
+            'to': to_agent,
+            'message': message,
+            'timestamp': datetime.now()
+        })
+    
+    def receive_messages(self, consumer: str = 'main', count: int = 10,
+                         block: float = 0.0) -> List[dict]:
+        """Take directed and broadcast messages addressed to this agent"""
+        if not self.bus:
+            return []
+        messages = self.bus.consume(self.name, consumer, count, block)
+        if messages:
+            self.bus.ack(self.name, [m['id'] for m in messages])
+        # Our own broadcasts come back to us; skip them
+        return [m for m in messages if m['from'] != self.name]
+
+HOOKS_DIR = Path(__file__).resolve().parent / 'hooks'
+
+def extract_code_blocks(text: str) -> List[dict]:
+    """Pull fenced code blocks (with their language tag) out of a response"""
+    return [{'language': language.lower(), 'code': code}
+            for language, code in re.findall(r"```([\w+-]*)[^\n]*\n(.*?)```", text, re.S)]
+
+_validation_module = None
+_validation_engine = None
+
+def validation_module():
+    """hooks/validators/validation_engine.py, imported once (checks and fixers)"""
+    global _validation_module
+    if _validation_module is None:
+        spec = importlib.util.spec_from_file_location(
+            "validation_engine", HOOKS_DIR / 'validators' / 'validation_engine.py')
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _validation_module = module
+    return _validation_module
+
+def validation_engine():
+    """Shared in-process ValidationEngine from hooks/validators/validation_engine.py"""
+    global _validation_engine
+    if _validation_engine is None:
+        _validation_engine = validation_module().ValidationEngine(persist=False)
+    return _validation_engine
+
+def validate_code_blocks(blocks: List[dict]) -> List[dict]:
+    """Run the validation engine's single-file checks over every code block"""
+    results = []
+    engine = validation_engine()
+    for index, block in enumerate(blocks):
+        if block['language'] not in ('js', 'javascript', 'jsx', 'html', 'css', 'json'):
+            continue
+        issues = engine.validate_text(block['code'], block['language'])
+        results.append({'block': index,
+                        'passed': not any(i['severity'] == 'error' for i in issues),
+                        'issues': issues})
+    return results
+
+class SwarmWorker:
+    """Pulls agent tasks from the shared task stream and runs them
+    
+    Any number of workers (threads, processes or containers) can share the
+    stream through one consumer group. A task is acknowledged only after its
+    result has been published, and tasks left pending by a failed or crashed
+    worker are reclaimed once idle for visibility_timeout seconds, so none
+    are lost. A task delivered more than max_deliveries times is moved to
+    the dead-letter stream (<task stream>:dead) and answered with an error,
+    so one poison task cannot circle the pool forever. Delivery is
+    at-least-once; the coordinator drops duplicate results.
+    """
+    
+    GROUP = 'workers'
+    
+    def __init__(self, swarm: 'SwarmOrchestrator', worker_id: str = None,
+                 concurrency: int = 4, visibility_timeout: float = 300.0,
+                 max_deliveries: int = 3):
+        self.swarm = swarm
+        self.bus = swarm.message_bus
+        self.worker_id = worker_id or f"{os.uname().nodename}-{os.getpid()}"
+        self.concurrency = concurrency
+        self.visibility_timeout = visibility_timeout
+        self.max_deliveries = max_deliveries
+        self.task_stream = swarm.task_stream
+        self.dead_letter_stream = f"{swarm.task_stream}:dead"
+        self.processed = 0
+        self.failed = 0
+        self.dead_lettered = 0
+    
+    def _fetch(self, count: int) -> List[Tuple[str, dict]]:
+        entries = self.bus.reclaim(self.task_stream, self.GROUP, self.worker_id,
+                                   self.visibility_timeout, count)
+        if not entries:
+            return self.bus.pull([self.task_stream], self.GROUP, self.worker_id,
+                                 count, block=1.0)
+        live = []
+        for entry_id, task in entries:
+            deliveries = self.bus.deliveries(self.GROUP, entry_id)
+            if deliveries > self.max_deliveries:
+                self._dead_letter(entry_id, task, deliveries - 1)
+            else:
+                live.append((entry_id, task))
+        return live
+    
+    def _dead_letter(self, entry_id: str, task: dict, attempts: int):
+        """Give up on a task: park it, answer the coordinator with an error, ack"""
+        error = f"{task['agent']} task failed on {attempts} deliveries"
+        self.bus.push(self.dead_letter_stream, dict(task, error=error, worker=self.worker_id),
+                      capped=True)
+        self.bus.push(task['reply_to'], {
+            'task_id': task['task_id'], 'agent': task['agent'],
+            'response': f"Error: {error}; moved to {self.dead_letter_stream}",
+            'worker': self.worker_id, 'error': error, 'usage': None, 'cached': False})
+        self.swarm._log_interaction(task['agent'], task['task'], f"Error: {error}",
+                                    {'error': error}, worker=self.worker_id,
+                                    dead_letter=self.dead_letter_stream)
+        self.bus.ack(self.GROUP, [entry_id])
+        self.dead_lettered += 1
+    
+    def _process(self, entry_id: str, task: dict):
+        start = time.monotonic()
+        agent = self.swarm.agents.get(task['agent'])
+        meta = {}
+        if agent is None:
+            response = f"Error: unknown agent {task['agent']} on worker {self.worker_id}"
+        else:
+            response = agent.think(task['task'], context=task.get('context'), meta=meta)
+        
+        result = {'task_id': task['task_id'], 'agent': task['agent'],
+                  'response': response, 'worker': self.worker_id,
+                  'usage': meta.get('usage'), 'cached': meta.get('cached', False)}
+        postprocess = task.get('postprocess', [])
+        if 'extract_code' in postprocess or 'validate' in postprocess:
+            result['code_blocks'] = extract_code_blocks(response)
+        if 'validate' in postprocess:
+            result['validation'] = validate_code_blocks(result['code_blocks'])
+        result['elapsed'] = time.monotonic() - start
+        
+        self.bus.push(task['reply_to'], result)
+        self.swarm._log_interaction(task['agent'], task['task'], response, result,
+                                    worker=self.worker_id)
+        self.bus.ack(self.GROUP, [entry_id])
+        self.processed += 1
+    
+    def run(self, stop: threading.Event = None):
+        """Process tasks until `stop` is set"""
+        stop = stop or threading.Event()
+        in_flight: Dict = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while not stop.is_set():
+                free = self.concurrency - len(in_flight)
+                if free > 0:
+                    for entry_id, task in self._fetch(free):
+                        in_flight[executor.submit(self._process, entry_id, task)] = task
+                if in_flight:
+                    done, _ = wait(in_flight, timeout=0 if free > 0 else 1.0,
+                                   return_when=FIRST_COMPLETED)
+                    for future in done:
+                        task = in_flight.pop(future)
+                        if future.exception():
+                            # Left unacknowledged: reclaimed until max_deliveries
+                            self.failed += 1
+                            error = f"{type(future.exception()).__name__}: {future.exception()}"
+                            self.swarm._log_interaction(task['agent'], task['task'],
+                                                        f"Error: {error}", {'error': error},
+                                                        worker=self.worker_id)
+
+def run_worker(config_file: str, concurrency: int = 4):
+    """Entry point for one worker process"""
+    swarm = SwarmOrchestrator(config_file)
+    if isinstance(swarm.message_bus, InProcessMessageBus):
+        raise ValueError("Worker mode needs a shared message bus: set SWARM_REDIS_URL "
+                         "or a 'message_bus' section with backend: redis")
+    worker = SwarmWorker(swarm, concurrency=concurrency)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    print(f"Worker {worker.worker_id} serving {', '.join(swarm.agents)}")
+    try:
+        worker.run(stop)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        swarm.close()
+    print(f"Worker {worker.worker_id} stopped after {worker.processed} tasks "
+          f"({worker.failed} failed, {worker.dead_lettered} dead-lettered)")
+
+def run_worker_processes(config_file: str, processes: int, concurrency: int = 4):
+    """Run several worker processes on this host, one per core by default"""
+    workers = [multiprocessing.Process(target=run_worker, args=(config_file, concurrency))
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+
+class SessionJournal:
+    """Append-only checkpoint journal of completed agent calls (journal.jsonl)
+    
+    Every successful call is written (and fsynced) as soon as it returns,
+    keyed by a hash of its inputs: agent, model, system prompt, task and
+    the context it was given. With `resume`, the records already in the
+    journal are loaded for replay, so a resumed run answers finished steps
+    from disk and only calls the model for the unfinished ones. Repeated
+    calls with the same inputs replay in the order they were recorded.
+    """
+    
+    FILENAME = 'journal.jsonl'
+    
+    def __init__(self, session_dir: Path, resume: bool = False):
+        self.path = Path(session_dir) / self.FILENAME
+        self._pending: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self.stats = {'loaded': 0, 'replayed': 0, 'recorded': 0}
+        if resume and self.path.exists():
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A record cut short by the crash: that call reruns
+                        continue
+                    self._pending.setdefault(record['key'], deque()).append(record['response'])
+                    self.stats['loaded'] += 1
+        self._file = open(self.path, 'a')
+    
+    @staticmethod
+    def key(agent: str, task: str, context: List[dict] = None,
+            model: str = '', system: str = '') -> str:
+        payload = json.dumps([agent, model, system, task, context or []],
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+    
+    def replay(self, key: str) -> Optional[str]:
+        """The recorded response for these inputs, if the journal has one left"""
+        with self._lock:
+            responses = self._pending.get(key)
+            if not responses:
+                return None
+            self.stats['replayed'] += 1
+            return responses.popleft()
+    
+    def record(self, key: str, agent: str, task: str, response: str):
+        """Durably append one completed call"""
+        line = json.dumps({'ts': datetime.now().isoformat(), 'key': key, 'agent': agent,
+                           'task': task, 'response': response}) + '\n'
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.stats['recorded'] += 1
+    
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+class BatchExecutor:
+    """Runs large offline fan-outs through the Message Batches API
+    
+    Each task set is a parallel_task() input ({agent: task}); every agent
+    request of every set is packed into batch submissions of at most
+    `max_requests`. Batched calls are billed at half price and do not use
+    the interactive rate limits. Results are read as each batch ends, and
+    go into the usual per-agent results, session log, metrics and response
+    cache.
+    
+    Jobs are journaled under `directory` (<job>.json plus the results read
+    so far in <job>.results.jsonl); the journal is also where callers read
+    a job's batches and status. A job interrupted by a restart is picked
+    up with resume(): batches already submitted are polled again, and
+    requests that never made it into a batch are submitted.
+    
+        batch:
+          directory: sessions/batches
+          poll_interval: 30
+          max_requests: 10000
+    """
+    
+    def __init__(self, swarm: 'SwarmOrchestrator', directory: str = 'sessions/batches',
+                 poll_interval: float = 30.0, max_poll_interval: float = 300.0,
+                 max_requests: int = 10000, max_retries: int = 5):
+        self.swarm = swarm
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.max_requests = max_requests
+        # Batch endpoints are few, cheap calls: let the SDK retry them itself
+        self.client = swarm.client.with_options(max_retries=max_retries)
+    
+    def _journal_path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.json"
+    
+    def _results_path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.results.jsonl"
+    
+    def _save(self, job: dict):
+        path = self._journal_path(job['id'])
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(json.dumps(job, indent=2))
+        os.replace(tmp, path)
+    
+    def load(self, job_id: str) -> dict:
+        return json.loads(self._journal_path(job_id).read_text())
+    
+    def pending_jobs(self) -> List[str]:
+        """Jobs whose results have not all been read"""
+        jobs = []
+        for path in sorted(self.directory.glob('*.json')):
+            try:
+                if json.loads(path.read_text()).get('status') != 'ended':
+                    jobs.append(path.stem)
+            except (OSError, ValueError):
+                continue
+        return jobs
+    
+    def _request(self, entry: dict, context: List[dict]) -> dict:
+        return self.swarm.agents[entry['agent']]._build_request(entry['task'], context)
+    
+    def _record(self, job: dict, custom_id: str, text: str, usage: dict = None,
+                error: bool = False, batch_id: str = None, cached: bool = False):
+        """Deliver one result: results file, session log, metrics and cache"""
+        entry = job['requests'][custom_id]
+        with open(self._results_path(job['id']), 'a') as f:
+            f.write(json.dumps({'custom_id': custom_id, 'set': entry['set'],
+                                'agent': entry['agent'], 'text': text}) + '\n')
+        agent = self.swarm.agents.get(entry['agent'])
+        meta = {'model': agent.model if agent else 'unknown', 'batch': True,
+                'cached': cached, 'error': error}
+        if usage:
+            meta['usage'] = usage
+        self.swarm.metrics.observe(entry['agent'], meta)
+        self.swarm._log_interaction(entry['agent'], entry['task'], text, meta,
+                                    batch=batch_id, job=job['id'], set=entry['set'])
+    
+    def submit(self, task_sets: List[Dict[str, str]], context: List[dict] = None) -> str:
+        """Journal a job and submit its batches; returns the job id"""
+        job = {'id': f"job_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}",
+               'created': time.time(), 'status': 'submitting', 'sets': len(task_sets),
+               'context': context, 'requests': {}, 'batches': {}}
+        for index, tasks in enumerate(task_sets):
+            for agent, task in tasks.items():
+                if agent in self.swarm.agents:
+                    job['requests'][f"r{len(job['requests'])}"] = {
+                        'set': index, 'agent': agent, 'task': task}
+        self._save(job)
+        self._results_path(job['id']).touch()
         
-        # Build system prompt based on role
-        system_prompt = f"""You are {self.name}, {self.description}
+        # Answers already in the response cache never reach a batch
+        cache = self.swarm.cache
+        if cache:
+            for custom_id, entry in job['requests'].items():
+                cached = cache.get(self._request(entry, context))
+                if cached is not None:
+                    entry['done'] = True
+                    self._record(job, custom_id, cached, cached=True)
+        self._submit_missing(job)
+        return job['id']
+    
+    def _submit_missing(self, job: dict):
+        """Submit every request that is neither answered nor in a batch yet"""
+        in_batch = {custom_id for batch in job['batches'].values() for custom_id in batch['ids']}
+        missing = [custom_id for custom_id, entry in job['requests'].items()
+                   if not entry.get('done') and custom_id not in in_batch]
+        for start in range(0, len(missing), self.max_requests):
+            chunk = missing[start:start + self.max_requests]
+            batch = self.client.messages.batches.create(requests=[
+                {'custom_id': custom_id,
+                 'params': self._request(job['requests'][custom_id], job['context'])}
+                for custom_id in chunk])
+            # Journal each batch the moment it exists, so a restart polls it
+            job['batches'][batch.id] = {'ids': chunk, 'status': 'submitted',
+                                        'submitted': time.time()}
+            self._save(job)
+        job['status'] = 'submitted'
+        self._save(job)
+    
+    def _collect(self, job: dict, batch_id: str):
+        """Read an ended batch's results and deliver them"""
+        cache = self.swarm.cache
+        for item in self.client.messages.batches.results(batch_id):
+            entry = job['requests'].get(item.custom_id)
+            if entry is None or entry.get('done'):
+                continue
+            result = item.result
+            if result.type == 'succeeded':
+                message = result.message
+                agent = self.swarm.agents.get(entry['agent'])
+                usage = {field: getattr(message.usage, field, None) or 0
+                         for field in ClaudeAgent.USAGE_FIELDS}
+                if agent:
+                    agent._record_usage(message)
+                text = message.content[0].text
+                if cache:
+                    cache.put(self._request(entry, job['context']), text)
+                self._record(job, item.custom_id, text, usage, batch_id=batch_id)
+            else:
+                detail = getattr(getattr(result, 'error', None), 'error', None)
+                text = f"Error in {entry['agent']}: batch request {result.type}" + (
+                    f" ({detail.message})" if getattr(detail, 'message', None) else '')
+                self._record(job, item.custom_id, text, error=True, batch_id=batch_id)
+            entry['done'] = True
+        job['batches'][batch_id]['status'] = 'collected'
+        self._save(job)
+    
+    def results(self, job_id: str) -> List[Dict[str, str]]:
+        """Per-set {agent: text} results read so far"""
+        job = self.load(job_id)
+        results = [{} for _ in range(job['sets'])]
+        with open(self._results_path(job_id)) as f:
+            for line in f:
+                item = json.loads(line)
+                results[item['set']][item['agent']] = item['text']
+        return results
+    
+    def wait(self, job_id: str, scope: TaskScope = None) -> List[Dict[str, str]]:
+        """Poll a job's batches until all have ended, collecting each as it ends
         
-Your capabilities: {', '.join(self.tools)}
-Connected agents: {', '.join(self.connections)}
-Working directory: {self.directory}
+        If `scope` ends first, returns what was collected so far (the rest
+        reported as unfinished) and leaves the job pending for resume();
+        its journal then still has status 'submitted'.
+        """
+        job = self.load(job_id)
+        if job['status'] == 'submitting':
+            self._submit_missing(job)
+        interval = self.poll_interval
+        while True:
+            open_batches = [batch_id for batch_id, batch in job['batches'].items()
+                            if batch['status'] != 'collected']
+            if not open_batches:
+                break
+            ended = 0
+            for batch_id in open_batches:
+                batch = self.client.messages.batches.retrieve(batch_id)
+                if batch.processing_status == 'ended':
+                    self._collect(job, batch_id)
+                    ended += 1
+            if ended < len(open_batches):
+                # Back off while nothing finishes; start over once something did
+                interval = self.poll_interval if ended else min(
+                    self.max_poll_interval, interval * 1.5)
+                if scope is None:
+                    time.sleep(interval)
+                elif self._sleep(interval, scope):
+                    return self._unfinished(job, scope)
+        job['status'] = 'ended'
+        self._save(job)
+        return self.results(job_id)
+    
+    @staticmethod
+    def _sleep(interval: float, scope: TaskScope) -> bool:
+        """Sleep up to `interval`; True if the scope ended meanwhile"""
+        until = time.monotonic() + interval
+        while not scope.is_set() and time.monotonic() < until:
+            time.sleep(min(scope.wait_time(), until - time.monotonic()))
+        return scope.is_set()
+    
+    def _unfinished(self, job: dict, scope: TaskScope) -> List[Dict[str, str]]:
+        results = self.results(job['id'])
+        for entry in job['requests'].values():
+            results[entry['set']].setdefault(entry['agent'], scope.unfinished(entry['agent']))
+        return results
+    
+    def run(self, task_sets: List[Dict[str, str]], context: List[dict] = None,
+            scope: TaskScope = None) -> List[Dict[str, str]]:
+        return self.wait(self.submit(task_sets, context), scope)
+    
+    def resume(self) -> Dict[str, List[Dict[str, str]]]:
+        """Finish every job left pending by an earlier process"""
+        return {job_id: self.wait(job_id) for job_id in self.pending_jobs()}
 
-Respond as this specific agent would, focusing on your area of expertise."""
+class WorkflowStep:
+    """One agent action inside a workflow"""
+    
+    def __init__(self, step_id: str, spec: dict, stage: int):
+        self.id = step_id
+        self.agent = spec['agent']
+        self.action = spec.get('action', 'run')
+        self.stage = stage
+        inputs = spec.get('input', [])
+        self.inputs = [inputs] if isinstance(inputs, str) else list(inputs)
+        self.output = spec.get('output')
+        self.explicit_deps = spec.get('depends_on')
+        self.spec = spec
+        self.depends_on: set = set()
 
-        # Add context from other agents if provided
-        messages = []
-        if context:
-            messages.append({
-                "role": "user", 
-                "content": f"Context from other agents:\n" + "\n".join([
-                    f"{c['agent']}: {c['message']}" for c in context
-                ])
-            })
+class Workflow:
+    """Dependency DAG compiled from a config `workflows:` entry
+    
+    Dependencies come from, in order of precedence: an explicit
+    `depends_on:` list of step ids; the producers of the step's `input:`
+    artifacts; the same agent's steps in the previous stage; otherwise the
+    whole previous stage. A step can therefore start as soon as what it
+    actually needs is done, instead of waiting for the full stage.
+    """
+    
+    def __init__(self, name: str, steps: Dict[str, WorkflowStep]):
+        self.name = name
+        self.steps = steps
+    
+    @classmethod
+    def compile(cls, name: str, spec: dict) -> 'Workflow':
+        stages: List[List[WorkflowStep]] = []
+        steps: Dict[str, WorkflowStep] = {}
         
-        messages.append({"role": "user", "content": task})
+        for stage_index, entry in enumerate(spec.get('steps', [])):
+            group = entry['parallel'] if 'parallel' in entry else [entry]
+            stage = []
+            for step_spec in group:
+                step_id = step_spec.get('id') or f"{step_spec['agent']}.{step_spec.get('action', 'run')}"
+                base_id, n = step_id, 2
+                while step_id in steps:
+                    step_id = f"{base_id}#{n}"
+                    n += 1
+                step = WorkflowStep(step_id, step_spec, stage_index)
+                steps[step_id] = step
+                stage.append(step)
+            stages.append(stage)
         
-        try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=2048,
-                system=system_prompt,
-                messages=messages
-            )
-            return response.content[0].text
-        except Exception as e:
-            return f"Error in {self.name}: {str(e)}"
+        producers = {}
+        for step in steps.values():
+            if step.output:
+                producers[step.output] = step.id
+        
+        for stage_index, stage in enumerate(stages):
+            previous = stages[stage_index - 1] if stage_index else []
+            for step in stage:
+                if step.explicit_deps is not None:
+                    deps = set(step.explicit_deps)
+                elif step.inputs:
+                    missing = [a for a in step.inputs if a not in producers]
+                    if missing:
+                        raise ValueError(f"Workflow '{name}': step {step.id} needs "
+                                         f"unknown input(s) {', '.join(missing)}")
+                    deps = {producers[a] for a in step.inputs}
+                else:
+                    same_agent = [p.id for p in previous if p.agent == step.agent]
+                    deps = set(same_agent or [p.id for p in previous])
+                unknown = deps - set(steps)
+                if unknown:
+                    raise ValueError(f"Workflow '{name}': step {step.id} depends on "
+                                     f"unknown step(s) {', '.join(sorted(unknown))}")
+                step.depends_on = deps
+        
+        workflow = cls(name, steps)
+        workflow._check_acyclic()
+        return workflow
     
-    def send_message(self, message: str, to_agent: str = None):
-        """Send a message to another agent or broadcast"""
-        self.message_queue.put({
-            'from': self.name,
-            'to': to_agent,
-            'message': message,
-            'timestamp': datetime.now()
-        })
+    def _check_acyclic(self):
+        visiting, done = set(), set()
+        
+        def visit(step_id: str):
+            if step_id in done:
+                return
+            if step_id in visiting:
+                raise ValueError(f"Workflow '{self.name}' has a dependency cycle at {step_id}")
+            visiting.add(step_id)
+            for dep in self.steps[step_id].depends_on:
+                visit(dep)
+            visiting.discard(step_id)
+            done.add(step_id)
+        
+        for step_id in self.steps:
+            visit(step_id)
+    
+    def ready(self, finished: set, started: set) -> List[WorkflowStep]:
+        """Steps whose dependencies are all finished and that haven't started"""
+        return [step for step_id, step in self.steps.items()
+                if step_id not in started and step.depends_on <= finished]
+    
+    def critical_path(self, timings: Dict[str, dict]) -> Tuple[List[str], float]:
+        """Longest chain of dependent steps by measured duration"""
+        longest: Dict[str, Tuple[float, List[str]]] = {}
+        
+        def chain(step_id: str) -> Tuple[float, List[str]]:
+            if step_id not in longest:
+                best = (0.0, [])
+                for dep in self.steps[step_id].depends_on:
+                    best = max(best, chain(dep), key=lambda c: c[0])
+                duration = timings[step_id]['duration']
+                longest[step_id] = (best[0] + duration, best[1] + [step_id])
+            return longest[step_id]
+        
+        # Only finished steps (a run stopped by its deadline has fewer)
+        seconds, path = max((chain(step_id) for step_id in self.steps if step_id in timings),
+                            key=lambda c: c[0], default=(0.0, []))
+        return path, seconds
 
 class SwarmOrchestrator:
-    """Manages multiple Claude agents working in parallel"""
+    """Manages multiple Claude agents working in parallel
     
-    def __init__(self, config_file: str):
+    `client` and `metrics` let a long-running process (SwarmDaemon) share
+    one connection pool and one metrics registry between swarms.
+    `resume` names an earlier session (directory or swarm_* name) to
+    continue: calls already in its journal are replayed, not re-run.
+    """
+    
+    # Bound on run_on_workers when no task_timeout is configured: a worker
+    # task is redelivered at most max_deliveries times, one visibility
+    # timeout (300s) apart, before it is answered from the dead-letter path
+    WORKER_TIMEOUT = 1800.0
+    
+    def __init__(self, config_file: str, client: Anthropic = None,
+                 metrics: 'SwarmMetrics' = None, resume: str = None):
         self.config = self._load_config(config_file)
         self.api_key = os.environ.get('ANTHROPIC_API_KEY')
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY not found in environment")
         
         self.agents: Dict[str, ClaudeAgent] = {}
-        self.message_bus = queue.Queue()
-        self.session_dir = self._create_session()
+        self.message_bus = create_message_bus(self.config.get('message_bus'))
+        self.task_stream = f"{self.message_bus.prefix}:tasks"
+        self.watchers = []
+        self.session_dir = self._create_session(resume)
+        # JSON Lines session logs, written off the result path
+        self.logger = SessionLogger(self.session_dir, **self.config.get('logging', {}))
+        # Per-call checkpoints, so an interrupted session can be resumed
+        self.journal = (SessionJournal(self.session_dir, resume=bool(resume))
+                        if self.config['swarm'].get('checkpoints', True) else None)
+        if resume and self.journal:
+            print(f"♻️  Resuming {self.session_dir.name}: "
+                  f"{self.journal.stats['loaded']} checkpointed calls")
+        self.metrics = metrics or self._create_metrics(self.config.get('metrics', {}))
+        # Every model call goes through one scheduler, which owns retries
+        self.scheduler = RequestScheduler(
+            rate_limits=self.config.get('rate_limits'),
+            **self.config.get('scheduler', {})
+        )
+        # One HTTP client (and connection pool) shared by every agent
+        self.client = client or Anthropic(api_key=self.api_key, max_retries=0)
+        # Opt-in response cache: config 'cache' section or SWARM_CACHE=1
+        self.cache = ResponseCache.from_config(
+            self.config.get('cache', bool(os.environ.get('SWARM_CACHE'))))
+        # Token budgets for context passed between agents and agent history
+        context_config = dict(self.config.get('context', {}))
+        self.summarizer_model = context_config.pop(
+            'summarizer_model', 'claude-3-haiku-20240307')
+        summarize = self._summarize if context_config.pop('summarize', True) else None
+        self.context_manager = ContextManager(summarize=summarize, **context_config)
+        # Opt-in tail-latency hedging: config 'hedging' section
+        self.hedging = HedgePolicy.from_config(self.config.get('hedging'))
+        # Opt-in cost/latency routing over model tiers: config 'routing' section
+        self.router = ModelRouter.from_config(self.config.get('routing'), cost=self.metrics.cost)
+        # Default deadline (seconds) for each top-level task, and the
+        # opt-in in-flight/token limits new tasks are admitted under
+        self.task_timeout = self.config['swarm'].get('task_timeout')
+        self.admission = AdmissionController.from_config(self.config.get('admission'))
+        self._batches = None
         self._initialize_agents()
         
     def _load_config(self, config_file: str) -> dict:
         """Load swarm configuration from YAML"""
         with open(config_file, 'r') as f:
-            return yaml.safe_load(f)
+            return self._normalize_config(yaml.safe_load(f))
+    
+    @staticmethod
+    def _normalize_config(config: dict) -> dict:
+        """Accept the configs/*.yml layout (top-level name plus an agents list)"""
+        if 'instances' not in config and 'agents' in config:
+            config['instances'] = {
+                agent['name']: {
+                    'description': ' '.join(filter(None, [
+                        agent.get('role', ''), agent.get('personality', '')])),
+                    'tools': agent.get('capabilities', []),
+                    **{k: v for k, v in agent.items()
+                       if k in ('model', 'directory', 'connections', 'priority')}
+                }
+                for agent in config['agents']
+            }
+        if 'swarm' not in config:
+            config['swarm'] = {
+                'name': config.get('name', 'Swarm'),
+                'main': next(iter(config.get('instances', {})), None)
+            }
+        return config
     
-    def _create_session(self) -> Path:
-        """Create session directory for logs and artifacts"""
+    def _create_session(self, resume: str = None) -> Path:
+        """Create session directory for logs and artifacts, or reopen `resume`"""
+        if resume:
+            for session_dir in (Path(resume), Path('sessions') / resume):
+                if session_dir.is_dir():
+                    return session_dir
+            raise ValueError(f"No session '{resume}' to resume")
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        session_dir = Path(f"sessions/swarm_{timestamp}")
-        session_dir.mkdir(parents=True, exist_ok=True)
+        # Unique per swarm: two started in the same second must not share logs or a journal
+        session_dir = Path(f"sessions/swarm_{timestamp}_{uuid.uuid4().hex[:6]}")
+        session_dir.mkdir(parents=True)
         return session_dir
     
+    def _create_metrics(self, metrics_config: dict) -> SwarmMetrics:
+        """Metrics registry, served on metrics.port or SWARM_METRICS_PORT if set"""
+        metrics = SwarmMetrics(prices=metrics_config.get('prices'))
+        port = metrics_config.get('port', os.environ.get('SWARM_METRICS_PORT'))
+        if port:
+            try:
+                metrics.serve(int(port), metrics_config.get('host', '0.0.0.0'))
+            except OSError as e:
+                # e.g. several workers on one host: the first one serves
+                print(f"⚠️  Metrics endpoint not started on port {port}: {e}")
+        return metrics
+    
     def _initialize_agents(self):
         """Create agent instances from configuration"""
         instances = self.config.get('instances', {})
@@ -108,99 +3020,1392 @@ class SwarmOrchestrator:
         for agent_name, agent_config in instances.items():
             self.agents[agent_name] = ClaudeAgent(
                 name=agent_name,
-                config=agent_config,
-                api_key=self.api_key
+                config={'prompt_caching': self.config['swarm'].get('prompt_caching', True),
+                        **agent_config},
+                api_key=self.api_key,
+                client=self.client,
+                scheduler=self.scheduler,
+                cache=self.cache,
+                context_manager=self.context_manager,
+                bus=self.message_bus,
+                metrics=self.metrics,
+                hedging=self.hedging if agent_config.get('hedging', True) else None,
+                router=self.router if agent_config.get('routing', True) else None
             )
-            
-            # Create agent log file
-            log_file = self.session_dir / f"{agent_name}.log"
-            log_file.touch()
-    
-    def delegate_task(self, task: str, to_agent: str = None) -> Dict[str, str]:
-        """Delegate a task to specific agent or main agent"""
-        if to_agent and to_agent in self.agents:
-            agent = self.agents[to_agent]
-            response = agent.think(task)
-            self._log_interaction(to_agent, task, response)
-            return {to_agent: response}
-        
-        # Delegate to main agent
-        main_agent_name = self.config['swarm'].get('main', list(self.agents.keys())[0])
-        main_agent = self.agents[main_agent_name]
-        response = main_agent.think(task)
-        self._log_interaction(main_agent_name, task, response)
-        return {main_agent_name: response}
-    
-    def parallel_task(self, tasks: Dict[str, str]) -> Dict[str, str]:
-        """Execute tasks in parallel across multiple agents"""
+            # The lead agent jumps the queue unless configured otherwise
+            if agent_name == self.config['swarm'].get('main') and 'priority' not in agent_config:
+                self.agents[agent_name].priority = 0
+    
+    def _summarize(self, text: str, max_tokens: int) -> str:
+        """Condense text with the cheap summarizer model"""
+        request = {
+            'model': self.summarizer_model,
+            'max_tokens': max_tokens,
+            'system': "Summarize the following for another AI agent. Keep decisions, "
+                      "interfaces, names and open questions; drop everything else.",
+            'messages': [{'role': 'user', 'content': text}]
+        }
+        if self.cache:
+            cached = self.cache.get(request)
+            if cached is not None:
+                return cached
+        # Summaries are background work: lowest priority in the scheduler
+        meta = {'model': self.summarizer_model}
+        start = time.monotonic()
+        response = self.scheduler.call(self.client.messages.create, request,
+                                       priority=100, meta=meta)
+        meta['elapsed'] = time.monotonic() - start
+        meta['usage'] = {field: getattr(response.usage, field, None) or 0
+                         for field in ClaudeAgent.USAGE_FIELDS}
+        self.metrics.observe('summarizer', meta)
+        summary = response.content[0].text
+        if self.cache:
+            self.cache.put(request, summary)
+        return summary
+    
+    def _think(self, agent_name: str, task: str, context: List[dict] = None,
+               meta: dict = None, cancel: threading.Event = None) -> str:
+        """One agent call, replayed from the session journal when checkpointed"""
+        key = self._journal_key(agent_name, task, context)
+        if key:
+            response = self.journal.replay(key)
+            if response is not None:
+                return self._replayed(agent_name, task, response, meta)
+        response = self.agents[agent_name].think(task, context, meta, cancel)
+        self._checkpoint(key, agent_name, task, response, meta)
+        return response
+    
+    def _think_stream(self, agent_name: str, task: str, context: List[dict] = None,
+                      meta: dict = None, cancel: threading.Event = None) -> Iterator[str]:
+        """Streaming _think(): a checkpoint replays as one delta, a finished stream is recorded"""
+        meta = meta if meta is not None else {}
+        key = self._journal_key(agent_name, task, context)
+        if key:
+            response = self.journal.replay(key)
+            if response is not None:
+                yield self._replayed(agent_name, task, response, meta)
+                return
+        chunks = []
+        for text in self.agents[agent_name].think_stream(task, context, meta, cancel):
+            chunks.append(text)
+            yield text
+        self._checkpoint(key, agent_name, task, ''.join(chunks), meta)
+    
+    def _journal_key(self, agent_name: str, task: str,
+                     context: List[dict] = None) -> Optional[str]:
+        """Journal key for a call; a config edit to the model or prompt invalidates it"""
+        if not self.journal:
+            return None
+        agent = self.agents[agent_name]
+        return self.journal.key(agent_name, task, context, agent.model, agent.system_prompt)
+    
+    def _replayed(self, agent_name: str, task: str, response: str, meta: dict = None) -> str:
+        agent = self.agents[agent_name]
+        if meta is not None:
+            meta.update({'model': agent.model, 'cached': False, 'error': False,
+                         'resumed': True})
+        agent._remember(task, response)
+        return response
+    
+    def _checkpoint(self, key: Optional[str], agent_name: str, task: str,
+                    response: str, meta: dict = None):
+        # Failed and cancelled calls are not checkpoints: a resume reruns them
+        if key and not (meta and (meta.get('error') or meta.get('cancelled'))):
+            self.journal.record(key, agent_name, task, response)
+    
+    def _scope(self, timeout: float = None, scope: TaskScope = None) -> Optional[TaskScope]:
+        """The TaskScope for a task: its own timeout (or swarm.task_timeout) under `scope`
+        
+        None when there is neither a deadline nor a parent scope, so calls
+        take the plain (non-streamed) path.
+        """
+        timeout = timeout if timeout is not None else (None if scope else self.task_timeout)
+        if timeout is None and scope is None:
+            return None
+        return TaskScope(timeout, parent=scope)
+    
+    @staticmethod
+    def _task_tokens(tasks: List[str], context: List[dict] = None, calls: int = None) -> int:
+        """Rough token cost of a task for admission control: its calls' prompts plus output"""
+        context_chars = sum(len(str(c.get('message', ''))) for c in context or ())
+        calls = calls if calls is not None else len(tasks)
+        return (sum(len(task) for task in tasks) + calls * context_chars) // 4 + calls * 2048
+    
+    def _admitted(self, tokens: int, scope: TaskScope = None):
+        """Context manager holding this task's admission (a no-op without limits)"""
+        if self.admission is None:
+            return contextlib.nullcontext()
+        return self.admission.admit(tokens, scope.remaining() if scope else None)
+    
+    def _main_agent_name(self) -> str:
+        """Name of the main agent, falling back to the first configured one"""
+        return self.config['swarm'].get('main', list(self.agents.keys())[0])
+    
+    def delegate_task(self, task: str, to_agent: str = None, timeout: float = None,
+                      scope: TaskScope = None) -> Dict[str, str]:
+        """Delegate a task to specific agent or main agent
+        
+        `timeout` (default swarm.task_timeout) bounds the call; `scope` lets
+        a caller cancel it or impose an outer deadline.
+        """
+        # Delegate to main agent unless a known agent was named
+        agent_name = to_agent if to_agent and to_agent in self.agents else self._main_agent_name()
+        scope = self._scope(timeout, scope)
+        with self._admitted(self._task_tokens([task]), scope):
+            meta = {}
+            response = self._think(agent_name, task, meta=meta, cancel=scope)
+            self._log_interaction(agent_name, task, response, meta)
+        return {agent_name: response}
+    
+    def parallel_task(self, tasks: Dict[str, str], stream: bool = False,
+                      context: List[dict] = None, timeout: float = None,
+                      scope: TaskScope = None):
+        """Execute tasks in parallel across multiple agents
+        
+        `context` is shared by every agent (and cached as a prompt prefix).
+        With stream=True, returns an iterator of (agent, text_delta) tuples
+        multiplexed from all agents as the deltas arrive.
+        At the deadline (`timeout`, default swarm.task_timeout) or when
+        `scope` is cancelled, calls still running are abandoned and their
+        agents' results say so; finished results are returned as usual.
+        """
+        scope = self._scope(timeout, scope)
+        if stream:
+            return self._admitted_stream(self._task_tokens(list(tasks.values()), context), scope,
+                                         self.parallel_stream(tasks, context=context, scope=scope))
+        execution = self.config['swarm'].get('execution')
+        if execution == 'batch':
+            # Not admitted: batches run outside the interactive rate limits,
+            # and holding a slot for hours would starve interactive tasks
+            return self.batch_task([tasks], context=context, scope=scope)[0]
         results = {}
+        metas = {agent: {} for agent in tasks}
         
-        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+        with self._admitted(self._task_tokens(list(tasks.values()), context), scope):
+            if execution == 'workers':
+                return {agent: result['response'] for agent, result in
+                        self.run_on_workers(tasks, context=context, scope=scope).items()}
+            executor = ThreadPoolExecutor(max_workers=max(1, len(tasks)))
             future_to_agent = {
-                executor.submit(self.agents[agent].think, task): agent
+                executor.submit(self._think, agent, task, context, metas[agent], scope): agent
                 for agent, task in tasks.items()
                 if agent in self.agents
             }
             
-            for future in as_completed(future_to_agent):
-                agent = future_to_agent[future]
+            try:
+                for future in (scope.completed(future_to_agent) if scope
+                               else as_completed(future_to_agent)):
+                    agent = future_to_agent[future]
+                    try:
+                        result = future.result()
+                        results[agent] = result
+                        self._log_interaction(agent, tasks[agent], result, metas[agent])
+                    except Exception as e:
+                        results[agent] = f"Error: {str(e)}"
+            except TimeoutError:
+                # Stragglers see the stopped scope and end at their next
+                # delta or HTTP timeout
+                for agent in future_to_agent.values():
+                    results.setdefault(agent, scope.unfinished(agent))
+            finally:
+                executor.shutdown(wait=False)
+        
+        return results
+    
+    @property
+    def batches(self) -> BatchExecutor:
+        """Message Batches backend, configured by the 'batch' section"""
+        if self._batches is None:
+            self._batches = BatchExecutor(self, **self.config.get('batch', {}))
+        return self._batches
+    
+    def batch_task(self, task_sets: List[Dict[str, str]], context: List[dict] = None,
+                   scope: TaskScope = None) -> List[Dict[str, str]]:
+        """Run many parallel_task() inputs as one Message Batches job
+        
+        For offline fan-outs (e.g. one prompt set per project spec):
+        results arrive in minutes to hours instead of seconds, at half the
+        token price. Returns one {agent: result} dict per task set. When
+        `scope` ends first, the results so far are returned and the job is
+        left pending for `batch --resume`.
+        """
+        return self.batches.run(task_sets, context=context, scope=scope)
+    
+    def watch_project(self, project_dir, to_agent: str = None):
+        """Keep a project validated while agents write to it
+        
+        Starts a ProjectWatcher (hooks/validators/validation_engine.py):
+        each change re-checks only the changed files and their dependents,
+        and the result goes to the session log and, as a message from
+        'validator', to `to_agent` (or everyone) on the message bus.
+        """
+        def publish(report: dict):
+            touched = set(report['changed']) | set(report['revalidated'])
+            summary = {'project': report['project'], 'passed': report['passed'],
+                       'errors': report['errors'], 'warnings': report['warnings'],
+                       'changed': report['changed'], 'elapsed': report['elapsed'],
+                       'issues': [issue for issue in report['issues']
+                                  if issue['file'] in touched]}
+            status = '✅ passed' if report['passed'] else f"❌ {report['errors']} errors"
+            message = (f"Validation {status} after changes to "
+                       f"{', '.join(report['changed']) or 'the project'}")
+            self.message_bus.publish(dict(MessageBus.envelope('validator', message, to_agent),
+                                          validation=summary))
+            self.logger.log('validator', dict(summary, ts=datetime.now().isoformat()))
+        
+        watcher = validation_module().ProjectWatcher(project_dir, engine=validation_engine(),
+                                                     on_report=publish)
+        self.watchers.append(watcher.start())
+        return watcher
+    
+    def run_on_workers(self, tasks: Dict[str, str], context: List[dict] = None,
+                       postprocess: List[str] = (), timeout: float = None,
+                       scope: TaskScope = None) -> Dict[str, dict]:
+        """Fan tasks out to worker processes and gather their results
+        
+        postprocess may include 'extract_code' and 'validate' to have the
+        worker pull code blocks out of the response and run the syntax hook.
+        Returns each agent's result dict (response, worker, elapsed, ...).
+        At the deadline (`timeout`, default swarm.task_timeout, else
+        WORKER_TIMEOUT) or when `scope` is cancelled, agents still without a
+        result are reported as unfinished; a lost task never hangs the caller.
+        """
+        bus = self.message_bus
+        reply_to = f"{bus.prefix}:results:{self.session_dir.name}-{uuid.uuid4().hex[:8]}"
+        outstanding = [{
+            'task_id': uuid.uuid4().hex, 'agent': agent, 'task': task,
+            'context': context, 'postprocess': list(postprocess), 'reply_to': reply_to
+        } for agent, task in tasks.items() if agent in self.agents]
+        expected = {task['task_id']: task['agent'] for task in outstanding}
+        results: Dict[str, dict] = {}
+        scope = self._scope(timeout, scope) or TaskScope(self.WORKER_TIMEOUT)
+        
+        while len(results) < len(expected):
+            # Submit as much as the task stream accepts; backpressure means collect first
+            while outstanding:
                 try:
-                    result = future.result()
+                    bus.push(self.task_stream, outstanding[0])
+                except queue.Full:
+                    break
+                outstanding.pop(0)
+            
+            entries = bus.pull([reply_to], 'coordinator', 'coordinator', count=100, block=0.5)
+            for entry_id, result in entries:
+                agent = expected.get(result['task_id'])
+                if agent and agent not in results:
                     results[agent] = result
-                    self._log_interaction(agent, tasks[agent], result)
-                except Exception as e:
-                    results[agent] = f"Error: {str(e)}"
+                    self._log_interaction(agent, tasks[agent], result['response'], result,
+                                          worker=result.get('worker'))
+            if entries:
+                bus.ack('coordinator', [entry_id for entry_id, _ in entries])
+            
+            if scope.is_set():
+                for agent in expected.values():
+                    results.setdefault(agent, {'response': scope.unfinished(agent),
+                                               'agent': agent})
+                break
         
         return results
     
-    def collaborative_task(self, main_task: str, subtasks: Dict[str, str]) -> Dict[str, str]:
-        """Main agent coordinates, others work on subtasks in parallel"""
+    def parallel_stream(self, tasks: Dict[str, str], context: List[dict] = None,
+                        scope: TaskScope = None) -> Iterator[Tuple[str, str]]:
+        """Yield (agent, text_delta) from all agents as they arrive
+        
+        Streams stop at `scope`'s deadline or cancellation (each ending with
+        a line saying so), and when the consumer stops iterating.
+        """
+        deltas = queue.Queue()
+        stop = threading.Event()
+        cancel = TaskScope(parent=scope)
+        tasks = {agent: task for agent, task in tasks.items() if agent in self.agents}
+        if not tasks:
+            return
+        
+        def run(agent: str, task: str):
+            chunks = []
+            meta = {}
+            try:
+                for text in self._think_stream(agent, task, context, meta, cancel):
+                    chunks.append(text)
+                    deltas.put((agent, text))
+            finally:
+                deltas.put((agent, None))
+            # Not when the consumer walked away
+            if not stop.is_set():
+                self._log_interaction(agent, task, ''.join(chunks), meta)
+        
+        executor = ThreadPoolExecutor(max_workers=len(tasks))
+        try:
+            for agent, task in tasks.items():
+                executor.submit(run, agent, task)
+            remaining = len(tasks)
+            while remaining:
+                agent, text = deltas.get()
+                if text is None:
+                    remaining -= 1
+                else:
+                    yield agent, text
+        finally:
+            stop.set()
+            cancel.cancel()
+            executor.shutdown(wait=False)
+    
+    def _admitted_stream(self, tokens: int, scope: Optional[TaskScope],
+                         deltas: Iterator) -> Iterator:
+        """Yield from `deltas` while holding the task's admission"""
+        with self._admitted(tokens, scope):
+            yield from deltas
+    
+    def _quorum(self, count: int, quorum=None) -> int:
+        """How many subtasks synthesis waits for: a count, or a fraction of `count`
+        
+        Defaults to the config's swarm.quorum, and to all of them.
+        """
+        quorum = quorum if quorum is not None else self.config['swarm'].get('quorum')
+        if quorum is None:
+            return count
+        if isinstance(quorum, float) and quorum <= 1:
+            quorum = math.ceil(quorum * count)
+        return max(1, min(count, int(quorum)))
+    
+    def _first_n(self, tasks: Dict[str, str], context: List[dict], quorum: int,
+                 scope: TaskScope = None):
+        """Run tasks in parallel and return once `quorum` of them succeeded
+        
+        Returns the results so far, plus a finish() callback that collects
+        results which arrived since and cancels the calls still running.
+        Returns early, with fewer results, if `scope` expires first.
+        """
+        tasks = {agent: task for agent, task in tasks.items() if agent in self.agents}
+        metas = {agent: {} for agent in tasks}
+        cancel = TaskScope(parent=scope)
+        executor = ThreadPoolExecutor(max_workers=max(1, len(tasks)))
+        future_to_agent = {
+            executor.submit(self._think, agent, task, context, metas[agent], cancel): agent
+            for agent, task in tasks.items()
+        }
+        results = {}
+        
+        def collect(future):
+            agent = future_to_agent[future]
+            results[agent] = future.result()
+            self._log_interaction(agent, tasks[agent], results[agent], metas[agent])
+        
+        succeeded = 0
+        try:
+            for future in cancel.completed(future_to_agent):
+                collect(future)
+                succeeded += not metas[future_to_agent[future]].get('error')
+                if succeeded >= quorum:
+                    break
+        except TimeoutError:
+            pass
+        
+        def finish() -> Dict[str, str]:
+            late = {}
+            cancel.set()
+            for future, agent in future_to_agent.items():
+                if agent not in results and future.done():
+                    collect(future)
+                    late[agent] = results[agent]
+            # Stragglers stop at their next streamed delta
+            executor.shutdown(wait=False)
+            return late
+        
+        return results, finish
+    
+    def collaborative_task(self, main_task: str, subtasks: Dict[str, str],
+                           stream: bool = False, quorum=None, timeout: float = None,
+                           scope: TaskScope = None):
+        """Main agent coordinates, others work on subtasks in parallel
+        
+        With stream=True, returns an iterator of (agent, text_delta) tuples
+        covering the plan, every subtask and finally the 'synthesis'.
+        With a `quorum` (count or fraction; default swarm.quorum) synthesis
+        starts once that many subtasks succeeded. Subtasks that finish
+        while it runs are still returned; the rest are cancelled.
+        The whole run shares one deadline (`timeout`, default
+        swarm.task_timeout): once it passes, whatever finished is returned
+        and the steps that did not say so.
+        """
+        scope = self._scope(timeout, scope)
+        tokens = self._task_tokens([main_task] + list(subtasks.values()), calls=len(subtasks) + 2)
+        if stream:
+            return self._admitted_stream(tokens, scope,
+                                         self.collaborative_stream(main_task, subtasks, scope))
+        with self._admitted(tokens, scope):
+            return self._collaborate(main_task, subtasks, quorum, scope)
+    
+    def _collaborate(self, main_task: str, subtasks: Dict[str, str], quorum,
+                     scope: Optional[TaskScope]) -> Dict[str, str]:
         results = {}
         
         # Main agent creates the plan
-        main_agent_name = self.config['swarm'].get('main')
-        main_agent = self.agents[main_agent_name]
+        main_agent_name = self._main_agent_name()
         
-        plan = main_agent.think(f"Create a plan for: {main_task}")
+        meta = {}
+        plan = self._think(main_agent_name, f"Create a plan for: {main_task}", meta=meta,
+                           cancel=scope)
         results[main_agent_name] = plan
-        self._log_interaction(main_agent_name, main_task, plan)
+        self._log_interaction(main_agent_name, main_task, plan, meta)
+        if scope and scope.is_set():
+            results.update({agent: scope.unfinished(agent) for agent in subtasks})
+            results['synthesis'] = scope.unfinished('synthesis')
+            return results
         
-        # Execute subtasks in parallel
-        subtask_results = self.parallel_task(subtasks)
+        # Execute subtasks in parallel, all sharing the plan as a cached prefix
+        plan_context = [{'agent': main_agent_name, 'message': plan}]
+        quorum = self._quorum(len(subtasks), quorum)
+        finish = None
+        if quorum < len(subtasks) and self.config['swarm'].get('execution') != 'workers':
+            subtask_results, finish = self._first_n(subtasks, plan_context, quorum, scope)
+        else:
+            subtask_results = self.parallel_task(subtasks, context=plan_context, scope=scope)
+        if scope and scope.is_set():
+            results.update(subtask_results)
+            if finish:
+                results.update(finish())
+            for agent in subtasks:
+                results.setdefault(agent, scope.unfinished(agent))
+            results['synthesis'] = scope.unfinished('synthesis')
+            return results
         
-        # Main agent synthesizes results
-        context = [{'agent': agent, 'message': result} 
-                   for agent, result in subtask_results.items()]
+        # Main agent synthesizes results, in subtask order (not completion
+        # order) so the same results always make the same prompt
+        context = [{'agent': agent, 'message': subtask_results[agent]}
+                   for agent in subtasks if agent in subtask_results]
         
-        synthesis = main_agent.think(
+        meta = {}
+        synthesis = self._think(
+            main_agent_name,
             "Synthesize these results into a cohesive solution",
-            context=context
+            context=context, meta=meta, cancel=scope
         )
+        self._log_interaction(main_agent_name, "Synthesize subtask results", synthesis, meta,
+                              used=sorted(subtask_results), subtasks=len(subtasks))
         
         results['synthesis'] = synthesis
         results.update(subtask_results)
+        if finish:
+            results.update(finish())
         
         return results
     
-    def _log_interaction(self, agent: str, task: str, response: str):
-        """Log agent interactions to session files"""
-        log_file = self.session_dir / f"{agent}.log"
-        with open(log_file, 'a') as f:
-            f.write(f"\n{'='*80}\n")
-            f.write(f"Timestamp: {datetime.now()}\n")
-            f.write(f"Task: {task}\n")
-            f.write(f"Response:\n{response}\n")
+    def collaborative_stream(self, main_task: str, subtasks: Dict[str, str],
+                             scope: TaskScope = None) -> Iterator[Tuple[str, str]]:
+        """Streaming version of collaborative_task()
+        
+        Every step is checkpointed and logged as in collaborative_task(),
+        and all of them stop at `scope`'s deadline or cancellation.
+        """
+        main_agent_name = self._main_agent_name()
+        
+        plan = []
+        meta = {}
+        for text in self._think_stream(main_agent_name, f"Create a plan for: {main_task}",
+                                       meta=meta, cancel=scope):
+            plan.append(text)
+            yield main_agent_name, text
+        self._log_interaction(main_agent_name, main_task, ''.join(plan), meta)
+        
+        subtask_results = {agent: [] for agent in subtasks if agent in self.agents}
+        plan_context = [{'agent': main_agent_name, 'message': ''.join(plan)}]
+        for agent, text in self.parallel_stream(subtasks, context=plan_context, scope=scope):
+            subtask_results[agent].append(text)
+            yield agent, text
+        
+        context = [{'agent': agent, 'message': ''.join(chunks)}
+                   for agent, chunks in subtask_results.items()]
+        synthesis = []
+        meta = {}
+        for text in self._think_stream(main_agent_name,
+                                       "Synthesize these results into a cohesive solution",
+                                       context=context, meta=meta, cancel=scope):
+            synthesis.append(text)
+            yield 'synthesis', text
+        self._log_interaction(main_agent_name, "Synthesize subtask results", ''.join(synthesis),
+                              meta, used=sorted(subtask_results), subtasks=len(subtasks))
+    
+    def compile_workflow(self, name: str) -> Workflow:
+        """Compile a workflow from the config's `workflows:` section"""
+        workflows = self.config.get('workflows', {})
+        if name not in workflows:
+            raise ValueError(f"Unknown workflow '{name}'. Available: {', '.join(workflows)}")
+        workflow = Workflow.compile(name, workflows[name])
+        unknown = {step.agent for step in workflow.steps.values()} - set(self.agents)
+        if unknown:
+            raise ValueError(f"Workflow '{name}' uses unknown agent(s) {', '.join(sorted(unknown))}")
+        return workflow
+    
+    def _step_prompt(self, workflow: Workflow, step: WorkflowStep, task: str) -> str:
+        return (f"Perform the '{step.action.replace('_', ' ')}' step of the "
+                f"'{workflow.name}' workflow.\n\nOverall task: {task}")
+    
+    def _step_context(self, workflow: Workflow, step: WorkflowStep,
+                      results: Dict[str, str]) -> List[dict]:
+        """Outputs of a step's dependencies, as think() context"""
+        context = []
+        for dep_id in sorted(step.depends_on):
+            dep = workflow.steps[dep_id]
+            context.append({'agent': f"{dep.agent} ({dep.output or dep.action})",
+                            'message': results[dep_id]})
+        return context
+    
+    def _workflow_report(self, workflow: Workflow, results: Dict[str, str],
+                         timings: Dict[str, dict], wall_time: float) -> dict:
+        path, path_time = workflow.critical_path(timings)
+        return {
+            'workflow': workflow.name,
+            'results': results,
+            # Steps stopped by the deadline or never started
+            'incomplete': sorted(set(workflow.steps) - set(timings)),
+            'timings': timings,
+            'wall_time': wall_time,
+            'total_step_time': sum(t['duration'] for t in timings.values()),
+            'critical_path': path,
+            'critical_path_time': path_time
+        }
+    
+    def run_workflow(self, name: str, task: str, max_concurrency: int = None,
+                     timeout: float = None, scope: TaskScope = None) -> dict:
+        """Execute a config workflow as a DAG, starting each step once its inputs exist
+        
+        Returns step results plus per-step timings, wall time and the
+        critical path through the run. At the deadline (`timeout`, default
+        swarm.task_timeout) running steps are abandoned and the report
+        lists every unfinished step under 'incomplete'.
+        """
+        scope = self._scope(timeout, scope)
+        workflow = self.compile_workflow(name)
+        with self._admitted(self._task_tokens([task], calls=len(workflow.steps)), scope):
+            return self._run_workflow(workflow, task, max_concurrency, scope)
+    
+    def _run_workflow(self, workflow: Workflow, task: str, max_concurrency: Optional[int],
+                      scope: Optional[TaskScope]) -> dict:
+        name = workflow.name
+        max_concurrency = max_concurrency or self.config['swarm'].get(
+            'workflow_concurrency', len(workflow.steps))
+        results: Dict[str, str] = {}
+        timings: Dict[str, dict] = {}
+        metas: Dict[str, dict] = {}
+        finished, started = set(), set()
+        run_start = time.monotonic()
+        
+        def run(step: WorkflowStep) -> str:
+            start = time.monotonic()
+            meta = metas.setdefault(step.id, {})
+            response = self._think(
+                step.agent, self._step_prompt(workflow, step, task),
+                context=self._step_context(workflow, step, results),
+                meta=meta, cancel=scope)
+            if meta.get('cancelled'):
+                return response
+            timings[step.id] = {
+                'agent': step.agent,
+                'start': start - run_start,
+                'duration': time.monotonic() - start
+            }
+            return response
+        
+        executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency))
+        try:
+            pending = {}
+            while len(finished) < len(workflow.steps):
+                if scope and scope.is_set():
+                    break
+                for step in workflow.ready(finished, started):
+                    if len(pending) >= max_concurrency:
+                        break
+                    started.add(step.id)
+                    pending[executor.submit(run, step)] = step
+                
+                done, _ = wait(pending, timeout=scope.wait_time() if scope else None,
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = pending.pop(future)
+                    results[step.id] = future.result()
+                    finished.add(step.id)
+                    self._log_interaction(step.agent, f"[{name}] {step.action}", results[step.id],
+                                          metas.get(step.id), workflow=name, step=step.id)
+        finally:
+            executor.shutdown(wait=False)
+        if scope:
+            for step_id in workflow.steps:
+                results.setdefault(step_id, scope.unfinished(workflow.steps[step_id].agent))
+        
+        return self._workflow_report(workflow, results, timings, time.monotonic() - run_start)
+    
+    LOGGED_META = ('model', 'elapsed', 'ttft', 'usage', 'cached', 'error', 'resumed',
+                   'cancelled', 'deadline_exceeded')
+    
+    def _log_interaction(self, agent: str, task: str, response: str,
+                         meta: dict = None, **fields):
+        """Queue a JSON Lines record of an agent interaction for the session log
+        
+        `meta` is the dict filled in by ClaudeAgent.think() and friends;
+        extra keyword fields (workflow, step, worker, ...) are added as-is.
+        """
+        record = {'ts': datetime.now().isoformat(), 'agent': agent,
+                  'task': task, 'response': response}
+        for key in self.LOGGED_META:
+            if meta and key in meta:
+                record[key] = meta[key]
+        record.update(fields)
+        self.logger.log(agent, record)
+    
+    def close(self):
+        """Flush session logs, save a metrics snapshot and release the cache"""
+        for watcher in self.watchers:
+            watcher.stop()
+        (self.session_dir / 'metrics.prom').write_text(self.metrics.render())
+        self.metrics.close()
+        self.logger.close()
+        if self.cache:
+            self.cache.close()
+        if self.hedging:
+            self.hedging.executor.shutdown(wait=False)
+        if self.journal:
+            self.journal.close()
     
     def get_session_summary(self) -> str:
         """Generate summary of swarm session"""
         summary = f"Swarm Session: {self.session_dir.name}\n"
         summary += f"Agents: {', '.join(self.agents.keys())}\n"
         summary += f"Configuration: {self.config['swarm']['name']}\n"
+        for name, agent in self.agents.items():
+            usage = agent.usage
+            if usage['calls']:
+                summary += (f"  {name}: {usage['calls']} calls, "
+                            f"{usage['input_tokens']} in / {usage['output_tokens']} out, "
+                            f"cache read {usage['cache_read_input_tokens']} / "
+                            f"write {usage['cache_creation_input_tokens']}\n")
+        if self.cache:
+            stats = self.cache.stats
+            summary += (f"Response cache: {stats['memory_hits'] + stats['disk_hits']} hits, "
+                        f"{stats['misses']} misses\n")
+        if self.journal and self.journal.stats['replayed']:
+            summary += (f"Resumed: {self.journal.stats['replayed']} calls replayed from "
+                        f"the journal, {self.journal.stats['recorded']} new\n")
+        if self.router and self.router.stats['calls']:
+            stats = self.router.stats
+            reasons = ', '.join(f"{reason} {count}" for reason, count in stats['reasons'].items())
+            summary += (f"Routing: {stats['escalated']} of {stats['calls']} calls escalated"
+                        f"{f' ({reasons})' if reasons else ''}, "
+                        f"{stats['skipped_cheap']} skipped the cheap tier, "
+                        f"{'saved' if stats['savings'] >= 0 else 'cost an extra'} "
+                        f"~${abs(stats['savings']):.4f} vs the top tier\n")
+            for row in self.router.report():
+                summary += (f"  {row['agent']} {row['route']}: {row['calls']} calls, "
+                            f"mean {row['mean_elapsed']:.2f}s\n")
+        if self.hedging and self.hedging.stats['hedged']:
+            stats = self.hedging.stats
+            summary += (f"Hedging: {stats['hedged']} of {stats['calls']} calls hedged, "
+                        f"hedge won {stats['hedge_wins']}, {stats['cancelled']} cancelled\n")
+        rows = self.metrics.report()
+        if rows:
+            summary += "Latency by agent (slowest first):\n"
+            for row in rows:
+                parts = [f"{int(row['calls'])} calls",
+                         f"p50 {row.get('p50', 0):.2f}s / p95 {row.get('p95', 0):.2f}s"]
+                if 'mean_ttft' in row:
+                    parts.append(f"ttft {row['mean_ttft']:.2f}s")
+                parts += [f"queued {row.get('mean_queue_wait', 0):.2f}s",
+                          f"{int(row['retries'])} retries", f"{int(row['errors'])} errors",
+                          f"${row['cost']:.4f}"]
+                summary += f"  {row['agent']} [{row['model']}]: {', '.join(parts)}\n"
+            summary += f"Estimated cost: ${sum(row['cost'] for row in rows):.4f}\n"
+        self.logger.flush()
         summary += f"\nSession logs available at: {self.session_dir}\n"
         return summary
 
+class AsyncSwarmOrchestrator(SwarmOrchestrator):
+    """Runs the swarm on one event loop with a single pooled AsyncAnthropic client"""
+    
+    def __init__(self, config_file: str, max_connections: int = None,
+                 max_concurrency: int = None, resume: str = None):
+        super().__init__(config_file, resume=resume)
+        swarm_config = self.config.get('swarm', {})
+        self.max_connections = max_connections or swarm_config.get('max_connections', 100)
+        self.max_concurrency = max_concurrency or swarm_config.get(
+            'max_concurrency', self.max_connections)
+        
+        # Bounded, keep-alive connection pool shared by every agent
+        self.async_client = AsyncAnthropic(
+            api_key=self.api_key,
+            max_retries=0,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        )
+        for agent in self.agents.values():
+            agent.async_client = self.async_client
+        
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+    
+    async def aclose(self):
+        """Close the shared HTTP connection pool and the session logs"""
+        await self.async_client.close()
+        await asyncio.to_thread(self.close)
+    
+    async def _athink(self, agent_name: str, task: str, context: List[dict] = None,
+                      meta: dict = None, deadline: float = None) -> str:
+        """Run one agent call under the concurrency limit (or replay its checkpoint)"""
+        key = self._journal_key(agent_name, task, context)
+        if key:
+            response = self.journal.replay(key)
+            if response is not None:
+                return self._replayed(agent_name, task, response, meta)
+        async with self._semaphore:
+            response = await self.agents[agent_name].athink(task, context=context, meta=meta,
+                                                            deadline=deadline)
+        await asyncio.to_thread(self._checkpoint, key, agent_name, task, response, meta)
+        return response
+    
+    def _aadmitted(self, tokens: int, timeout: float = None):
+        """Async context manager holding this task's admission"""
+        if self.admission is None:
+            return contextlib.nullcontext()
+        return self.admission.aadmit(tokens, timeout)
+    
+    def _atimeout(self, timeout: Optional[float]) -> Optional[float]:
+        return timeout if timeout is not None else self.task_timeout
+    
+    async def adelegate_task(self, task: str, to_agent: str = None,
+                             timeout: float = None) -> Dict[str, str]:
+        """Async version of delegate_task()"""
+        agent_name = to_agent if to_agent in self.agents else self._main_agent_name()
+        timeout = self._atimeout(timeout)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        async with self._aadmitted(self._task_tokens([task]), timeout):
+            meta = {}
+            try:
+                response = await asyncio.wait_for(
+                    self._athink(agent_name, task, meta=meta, deadline=deadline), timeout)
+            except asyncio.TimeoutError:
+                response = f"Deadline exceeded: {agent_name} did not finish in time"
+                meta['deadline_exceeded'] = True
+            self._log_interaction(agent_name, task, response, meta)
+        return {agent_name: response}
+    
+    async def aparallel_task(self, tasks: Dict[str, str], context: List[dict] = None,
+                             timeout: float = None) -> Dict[str, str]:
+        """Async version of parallel_task(): all calls share one event loop
+        
+        Calls still running at the deadline are cancelled (closing their
+        connections) and reported as such.
+        """
+        results = {}
+        timeout = self._atimeout(timeout)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        
+        async def run(agent: str, task: str):
+            meta = {}
+            try:
+                result = await self._athink(agent, task, context=context, meta=meta,
+                                            deadline=deadline)
+            except Exception as e:
+                result = f"Error: {str(e)}"
+            results[agent] = result
+            self._log_interaction(agent, task, result, meta)
+        
+        async with self._aadmitted(self._task_tokens(list(tasks.values()), context), timeout):
+            runs = {asyncio.create_task(run(agent, task)): agent
+                    for agent, task in tasks.items() if agent in self.agents}
+            if runs:
+                _, late = await asyncio.wait(runs, timeout=timeout)
+                for run_task in late:
+                    run_task.cancel()
+                    results[runs[run_task]] = (f"Deadline exceeded: {runs[run_task]} "
+                                               f"did not finish in time")
+        return results
+    
+    async def aparallel_stream(self, tasks: Dict[str, str], context: List[dict] = None,
+                               timeout: float = None,
+                               scope: TaskScope = None) -> AsyncIterator[Tuple[str, str]]:
+        """Async version of parallel_stream()
+        
+        Streams stop at the deadline (`timeout`, default swarm.task_timeout)
+        or when `scope` is cancelled, each ending with a line saying so.
+        """
+        deltas = asyncio.Queue()
+        scope = self._scope(timeout, scope)
+        tasks = {agent: task for agent, task in tasks.items() if agent in self.agents}
+        
+        async def run(agent: str, task: str):
+            chunks = []
+            meta = {}
+            key = self._journal_key(agent, task, context)
+            try:
+                replayed = self.journal.replay(key) if key else None
+                if replayed is not None:
+                    chunks.append(self._replayed(agent, task, replayed, meta))
+                    await deltas.put((agent, replayed))
+                else:
+                    async with self._semaphore:
+                        async for text in self.agents[agent].athink_stream(
+                                task, context=context, meta=meta, cancel=scope):
+                            chunks.append(text)
+                            await deltas.put((agent, text))
+                    await asyncio.to_thread(self._checkpoint, key, agent, task,
+                                            ''.join(chunks), meta)
+                self._log_interaction(agent, task, ''.join(chunks), meta)
+            finally:
+                await deltas.put((agent, None))
+        
+        workers = [asyncio.create_task(run(agent, task)) for agent, task in tasks.items()]
+        try:
+            remaining = len(workers)
+            while remaining:
+                agent, text = await deltas.get()
+                if text is None:
+                    remaining -= 1
+                else:
+                    yield agent, text
+        finally:
+            for worker in workers:
+                worker.cancel()
+    
+    async def arun_workflow(self, name: str, task: str, max_concurrency: int = None,
+                            timeout: float = None) -> dict:
+        """Async version of run_workflow()"""
+        timeout = self._atimeout(timeout)
+        workflow = self.compile_workflow(name)
+        async with self._aadmitted(self._task_tokens([task], calls=len(workflow.steps)), timeout):
+            return await self._arun_workflow(workflow, task, max_concurrency, timeout)
+    
+    async def _arun_workflow(self, workflow: Workflow, task: str,
+                             max_concurrency: Optional[int], timeout: Optional[float]) -> dict:
+        name = workflow.name
+        max_concurrency = max_concurrency or self.config['swarm'].get(
+            'workflow_concurrency', len(workflow.steps))
+        results: Dict[str, str] = {}
+        timings: Dict[str, dict] = {}
+        metas: Dict[str, dict] = {}
+        finished, started = set(), set()
+        run_start = time.monotonic()
+        
+        async def run(step: WorkflowStep) -> str:
+            start = time.monotonic()
+            response = await self._athink(
+                step.agent, self._step_prompt(workflow, step, task),
+                context=self._step_context(workflow, step, results),
+                meta=metas.setdefault(step.id, {}), deadline=deadline)
+            timings[step.id] = {
+                'agent': step.agent,
+                'start': start - run_start,
+                'duration': time.monotonic() - start
+            }
+            return response
+        
+        pending = {}
+        deadline = run_start + timeout if timeout is not None else None
+        while len(finished) < len(workflow.steps):
+            for step in workflow.ready(finished, started):
+                if len(pending) >= max_concurrency:
+                    break
+                started.add(step.id)
+                pending[asyncio.create_task(run(step))] = step
+            
+            remaining = max(0.0, deadline - time.monotonic()) if deadline else None
+            done, _ = await asyncio.wait(pending, timeout=remaining,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                for future in pending:
+                    future.cancel()
+                for step_id, step in workflow.steps.items():
+                    results.setdefault(step_id, f"Deadline exceeded: {step.agent} "
+                                                f"did not finish in time")
+                break
+            for future in done:
+                step = pending.pop(future)
+                results[step.id] = future.result()
+                finished.add(step.id)
+                self._log_interaction(step.agent, f"[{name}] {step.action}", results[step.id],
+                                      metas.get(step.id), workflow=name, step=step.id)
+        
+        return self._workflow_report(workflow, results, timings, time.monotonic() - run_start)
+    
+    async def _afirst_n(self, tasks: Dict[str, str], context: List[dict], quorum: int,
+                        timeout: float = None) -> Tuple[Dict[str, str], List[asyncio.Task]]:
+        """Async version of _first_n(); returns the results and the still-running tasks"""
+        results = {}
+        
+        async def run(agent: str, task: str):
+            meta = {}
+            result = await self._athink(agent, task, context=context, meta=meta,
+                                        deadline=deadline)
+            results[agent] = result
+            self._log_interaction(agent, task, result, meta)
+            return not meta.get('error')
+        
+        pending = {asyncio.create_task(run(agent, task))
+                   for agent, task in tasks.items() if agent in self.agents}
+        succeeded = 0
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while pending and succeeded < quorum:
+            remaining = max(0.0, deadline - time.monotonic()) if deadline else None
+            done, pending = await asyncio.wait(pending, timeout=remaining,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            succeeded += sum(1 for task in done if task.result())
+        return results, list(pending)
+    
+    async def acollaborative_task(self, main_task: str, subtasks: Dict[str, str],
+                                  quorum=None, timeout: float = None) -> Dict[str, str]:
+        """Async version of collaborative_task()"""
+        timeout = self._atimeout(timeout)
+        tokens = self._task_tokens([main_task] + list(subtasks.values()), calls=len(subtasks) + 2)
+        async with self._aadmitted(tokens, timeout):
+            return await self._acollaborate(main_task, subtasks, quorum, timeout)
+    
+    async def _acollaborate(self, main_task: str, subtasks: Dict[str, str], quorum,
+                            timeout: Optional[float]) -> Dict[str, str]:
+        results = {}
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        
+        def remaining() -> Optional[float]:
+            return max(0.0, deadline - time.monotonic()) if deadline else None
+        
+        def unfinished(agent: str) -> str:
+            return f"Deadline exceeded: {agent} did not finish in time"
+        
+        main_agent_name = self._main_agent_name()
+        
+        meta = {}
+        try:
+            plan = await asyncio.wait_for(self._athink(
+                main_agent_name, f"Create a plan for: {main_task}", meta=meta,
+                deadline=deadline), remaining())
+        except asyncio.TimeoutError:
+            results[main_agent_name] = unfinished(main_agent_name)
+            results.update({agent: unfinished(agent) for agent in subtasks})
+            results['synthesis'] = unfinished('synthesis')
+            return results
+        results[main_agent_name] = plan
+        self._log_interaction(main_agent_name, main_task, plan, meta)
+        
+        plan_context = [{'agent': main_agent_name, 'message': plan}]
+        quorum = self._quorum(len(subtasks), quorum)
+        stragglers = []
+        if quorum < len(subtasks):
+            subtask_results, stragglers = await self._afirst_n(
+                subtasks, plan_context, quorum, remaining())
+        else:
+            subtask_results = await self.aparallel_task(
+                subtasks, context=plan_context, timeout=remaining())
+        if deadline and time.monotonic() >= deadline:
+            for task in stragglers:
+                task.cancel()
+            results.update(subtask_results)
+            for agent in subtasks:
+                results.setdefault(agent, unfinished(agent))
+            results['synthesis'] = unfinished('synthesis')
+            return results
+        
+        context = [{'agent': agent, 'message': subtask_results[agent]}
+                   for agent in subtasks if agent in subtask_results]
+        used = sorted(subtask_results)
+        
+        meta = {}
+        try:
+            synthesis = await asyncio.wait_for(self._athink(
+                main_agent_name,
+                "Synthesize these results into a cohesive solution",
+                context=context, meta=meta, deadline=deadline
+            ), remaining())
+        except asyncio.TimeoutError:
+            synthesis = unfinished('synthesis')
+            meta['deadline_exceeded'] = True
+        self._log_interaction(main_agent_name, "Synthesize subtask results", synthesis, meta,
+                              used=used, subtasks=len(subtasks))
+        
+        results['synthesis'] = synthesis
+        # Includes subtasks that finished while synthesis ran
+        results.update(subtask_results)
+        for task in stragglers:
+            task.cancel()
+        
+        return results
+
+DEFAULT_SOCKET = os.environ.get('SWARM_SOCKET', '/tmp/claude-swarm.sock')
+
+class _LoadedSwarm:
+    """A swarm held by the daemon, with the config mtime it was built from"""
+    
+    def __init__(self, path: str, swarm: SwarmOrchestrator, mtime: float):
+        self.path = path
+        self.swarm = swarm
+        self.mtime = mtime
+        self.loaded_at = time.time()
+        self.active = 0
+        self.requests = 0
+        self.retired = False
+
+class _UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    
+    def get_request(self):
+        # BaseHTTPRequestHandler expects a (host, port) client address
+        request, _ = super().get_request()
+        return request, ('local', 0)
+
+class SwarmDaemon:
+    """Long-running orchestrator that keeps swarms warm between CLI calls
+    
+    Parsed configs, agent objects, the scheduler and one shared HTTP
+    connection pool stay in memory, so a task submitted by swarm-client.py
+    costs a socket round trip instead of an interpreter start, YAML parse
+    and TLS handshake. Requests are JSON over HTTP, on a Unix socket and
+    optionally a TCP port (which also serves /metrics). The port binds
+    127.0.0.1 unless `host` says otherwise, and POSTs over TCP must carry
+    `Authorization: Bearer <token>` (SWARM_DAEMON_TOKEN), since each one
+    can spend the API key or stop the daemon:
+    
+        GET  /status                  loaded swarms and counters
+        GET  /metrics                 Prometheus text for every swarm
+        POST /task     {config, mode, task, agent, tasks, subtasks, workflow}
+        POST /load     {config}       load (or reload) a config ahead of use
+        POST /reload   {config?}      force a reload
+        POST /shutdown
+    
+    Config files are watched: when one changes the swarm is rebuilt and
+    swapped in for new requests, while requests already running finish on
+    the old one. A config that fails to load leaves the previous one serving.
+    """
+    
+    MODES = ('delegate', 'parallel', 'collaborative', 'workflow')
+    
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, port: int = None,
+                 host: str = '127.0.0.1', token: str = None, reload_interval: float = 2.0):
+        self.api_key = os.environ.get('ANTHROPIC_API_KEY')
+        if not self.api_key:
+            raise ValueError("ANTHROPIC_API_KEY not found in environment")
+        self.token = token or os.environ.get('SWARM_DAEMON_TOKEN')
+        if port and not self.token:
+            raise ValueError("Serving on a TCP port needs a shared token: set SWARM_DAEMON_TOKEN")
+        self.socket_path = socket_path
+        self.port = port
+        self.host = host
+        self.reload_interval = reload_interval
+        self.client = Anthropic(api_key=self.api_key, max_retries=0)
+        self.metrics = SwarmMetrics()
+        self.swarms: Dict[str, _LoadedSwarm] = {}
+        self.started = time.time()
+        self.stats = {'requests': 0, 'errors': 0, 'shed': 0, 'reloads': 0, 'reload_errors': 0}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._stop = threading.Event()
+        self._servers = []
+    
+    @staticmethod
+    def _key(config_file: str) -> str:
+        return str(Path(config_file).resolve())
+    
+    def _build(self, path: str) -> _LoadedSwarm:
+        mtime = os.stat(path).st_mtime
+        swarm = SwarmOrchestrator(path, client=self.client, metrics=self.metrics)
+        return _LoadedSwarm(path, swarm, mtime)
+    
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+    
+    def authorized(self, header: Optional[str]) -> bool:
+        """Whether an Authorization header carries the daemon's token"""
+        expected = f"Bearer {self.token}"
+        return header is not None and hmac.compare_digest(header.encode(), expected.encode())
+    
+    @staticmethod
+    def _hold(loaded: _LoadedSwarm):
+        # Callers hold self._lock, so a concurrent _swap cannot retire and close it first
+        loaded.active += 1
+        loaded.requests += 1
+    
+    def _swap(self, loaded: _LoadedSwarm, acquire: bool = False):
+        with self._lock:
+            if acquire:
+                self._hold(loaded)
+            old = self.swarms.get(loaded.path)
+            self.swarms[loaded.path] = loaded
+            if old is not None:
+                old.retired = True
+                close_old = old.active == 0
+        if old is not None and close_old:
+            old.swarm.close()
+    
+    def load(self, config_file: str, force: bool = False,
+             acquire: bool = False) -> _LoadedSwarm:
+        """The warm swarm for a config, (re)building it if missing, changed or forced
+        
+        With `acquire` the swarm is also held for a request (until _release)
+        in the same step that looks it up, so a reload cannot close it first.
+        """
+        path = self._key(config_file)
+        with self._lock:
+            loaded = self.swarms.get(path)
+            lock = self._load_locks.setdefault(path, threading.Lock())
+            if loaded is not None and not force:
+                if acquire:
+                    self._hold(loaded)
+                return loaded
+        with lock:
+            # Another request may have loaded it while this one waited
+            with self._lock:
+                current = self.swarms.get(path)
+                if current is not None and current is not loaded and not force:
+                    if acquire:
+                        self._hold(current)
+                    return current
+            fresh = self._build(path)
+            self._swap(fresh, acquire)
+            if loaded is not None:
+                self._count('reloads')
+                print(f"🔄 Reloaded {path}")
+            else:
+                print(f"📦 Loaded {path}: {', '.join(fresh.swarm.agents)}")
+            return fresh
+    
+    def _acquire(self, config_file: str) -> _LoadedSwarm:
+        return self.load(config_file, acquire=True)
+    
+    def _release(self, loaded: _LoadedSwarm):
+        with self._lock:
+            loaded.active -= 1
+            close = loaded.retired and loaded.active == 0
+        if close:
+            loaded.swarm.close()
+    
+    def _watch(self):
+        """Reload configs whose file changed on disk"""
+        while not self._stop.wait(self.reload_interval):
+            with self._lock:
+                loaded = list(self.swarms.values())
+            for entry in loaded:
+                try:
+                    changed = os.stat(entry.path).st_mtime != entry.mtime
+                except OSError:
+                    continue
+                if not changed:
+                    continue
+                try:
+                    self.load(entry.path, force=True)
+                except Exception as e:
+                    # Keep serving the last good config; try again on the next edit
+                    entry.mtime = os.stat(entry.path).st_mtime
+                    self._count('reload_errors')
+                    print(f"⚠️  Reload of {entry.path} failed, keeping previous config: {e}")
+    
+    def run_task(self, request: dict) -> dict:
+        """Run one client request on the warm swarm for its config"""
+        mode = request.get('mode', 'delegate')
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown mode '{mode}' (expected one of {', '.join(self.MODES)})")
+        loaded = self._acquire(request['config'])
+        swarm = loaded.swarm
+        timeout = request.get('timeout')
+        start = time.monotonic()
+        try:
+            if mode == 'delegate':
+                result = swarm.delegate_task(request['task'], to_agent=request.get('agent'),
+                                             timeout=timeout)
+            elif mode == 'parallel':
+                result = swarm.parallel_task(request['tasks'], timeout=timeout)
+            elif mode == 'collaborative':
+                result = swarm.collaborative_task(request['task'], request['subtasks'],
+                                                  timeout=timeout)
+            else:
+                result = swarm.run_workflow(request['workflow'], request['task'],
+                                            timeout=timeout)
+        finally:
+            self._release(loaded)
+        return {'config': loaded.path, 'session': str(swarm.session_dir), 'mode': mode,
+                'elapsed': time.monotonic() - start, 'result': result}
+    
+    def status(self) -> dict:
+        with self._lock:
+            swarms = {path: {'name': entry.swarm.config['swarm']['name'],
+                             'agents': list(entry.swarm.agents),
+                             'session': str(entry.swarm.session_dir),
+                             'loaded_at': datetime.fromtimestamp(entry.loaded_at).isoformat(),
+                             'requests': entry.requests, 'active': entry.active}
+                      for path, entry in self.swarms.items()}
+            stats = dict(self.stats)
+        return {'pid': os.getpid(), 'uptime': time.time() - self.started,
+                'socket': self.socket_path, 'port': self.port,
+                'stats': stats, 'swarms': swarms}
+    
+    def _handler(self, tcp: bool):
+        daemon = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # TCP_NODELAY does not exist on Unix sockets
+            disable_nagle_algorithm = tcp
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def _send(self, status: int, body: bytes, content_type: str = 'application/json'):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def _json(self, status: int, payload: dict):
+                self._send(status, json.dumps(payload, default=str).encode())
+            
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                if path == '/status':
+                    self._json(200, daemon.status())
+                elif path == '/metrics':
+                    self._send(200, daemon.metrics.render().encode(),
+                               'text/plain; version=0.0.4')
+                else:
+                    self._json(404, {'error': f"Unknown path {path}"})
+            
+            def do_POST(self):
+                path = self.path.split('?')[0]
+                # The Unix socket is guarded by its file permissions instead
+                if tcp and not daemon.authorized(self.headers.get('Authorization')):
+                    self.close_connection = True  # the body is left unread
+                    self._json(401, {'error': "Missing or wrong daemon token (SWARM_DAEMON_TOKEN)"})
+                    return
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                    request = json.loads(self.rfile.read(length) or b'{}')
+                    if path == '/task':
+                        daemon._count('requests')
+                        self._json(200, daemon.run_task(request))
+                    elif path in ('/load', '/reload'):
+                        configs = [request['config']] if request.get('config') else list(daemon.swarms)
+                        for config in configs:
+                            daemon.load(config, force=path == '/reload')
+                        self._json(200, daemon.status())
+                    elif path == '/shutdown':
+                        self._json(200, {'ok': True})
+                        threading.Thread(target=daemon.shutdown, daemon=True).start()
+                    else:
+                        self._json(404, {'error': f"Unknown path {path}"})
+                except SwarmOverloaded as e:
+                    daemon._count('shed')
+                    self._json(503, {'error': str(e), 'retry_after': 1})
+                except (KeyError, ValueError, OSError) as e:
+                    daemon._count('errors')
+                    self._json(400, {'error': f"{type(e).__name__}: {e}"})
+                except Exception as e:
+                    daemon._count('errors')
+                    self._json(500, {'error': f"{type(e).__name__}: {e}"})
+        
+        return Handler
+    
+    def _bind_socket(self) -> _UnixHTTPServer:
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+                raise OSError(f"A swarm daemon is already listening on {self.socket_path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.socket_path)  # stale socket from a crashed daemon
+            finally:
+                probe.close()
+        return _UnixHTTPServer(self.socket_path, self._handler(tcp=False))
+    
+    def serve(self, preload: List[str] = ()):
+        """Serve until shutdown() (POST /shutdown, SIGTERM or Ctrl-C)"""
+        for config in preload:
+            self.load(config)
+        if self.socket_path:
+            self._servers.append(self._bind_socket())
+        if self.port:
+            server = ThreadingHTTPServer((self.host, self.port), self._handler(tcp=True))
+            server.daemon_threads = True
+            self._servers.append(server)
+        threading.Thread(target=self._watch, name='config-watcher', daemon=True).start()
+        threads = [threading.Thread(target=server.serve_forever, daemon=True)
+                   for server in self._servers]
+        for thread in threads:
+            thread.start()
+        where = [self.socket_path] if self.socket_path else []
+        where += [f"http://{self.host}:{self.port}"] if self.port else []
+        print(f"🛰️  Swarm daemon {os.getpid()} listening on {', '.join(where)}")
+        try:
+            self._stop.wait()
+        except KeyboardInterrupt:
+            pass
+        self.shutdown()
+    
+    def shutdown(self):
+        if self._servers:
+            for server in self._servers:
+                server.shutdown()
+                server.server_close()
+            self._servers = []
+            if self.socket_path and os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+        with self._lock:
+            loaded, self.swarms = list(self.swarms.values()), {}
+        for entry in loaded:
+            entry.swarm.close()
+        self._stop.set()
+
+def run_daemon(args: List[str]):
+    """swarm-orchestrator.py daemon [--socket PATH] [--port N [--host ADDR]] [config.yml ...]"""
+    socket_path, port, host, preload = DEFAULT_SOCKET, None, '127.0.0.1', []
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg == '--socket':
+            socket_path = args.pop(0)
+        elif arg == '--port':
+            port = int(args.pop(0))
+        elif arg == '--host':
+            host = args.pop(0)
+        else:
+            preload.append(arg)
+    daemon = SwarmDaemon(socket_path=socket_path, port=port, host=host)
+    signal.signal(signal.SIGTERM, lambda *_: daemon._stop.set())
+    daemon.serve(preload)
+
 # Demo functions
-def demo_basic_swarm():
+def record_command(swarm: SwarmOrchestrator, argv: List[str]):
+    """Save the CLI command in the session, so `--resume <session>` can rerun it"""
+    (swarm.session_dir / 'command.json').write_text(json.dumps(argv))
+
+def resume_argv(argv: List[str]) -> Tuple[List[str], Optional[str]]:
+    """Split `--resume <session>` off the CLI arguments
+    
+    With nothing else on the command line, the resumed session's own
+    command is used.
+    """
+    if '--resume' not in argv:
+        return argv, None
+    index = argv.index('--resume')
+    if index + 1 >= len(argv):
+        raise SystemExit("--resume needs a session (directory or swarm_* name)")
+    session = argv[index + 1]
+    argv = argv[:index] + argv[index + 2:]
+    if not argv:
+        for session_dir in (Path(session), Path('sessions') / session):
+            if (session_dir / 'command.json').exists():
+                argv = json.loads((session_dir / 'command.json').read_text())
+                break
+        else:
+            raise SystemExit(f"No recorded command in session '{session}'")
+    return argv, session
+
+def demo_basic_swarm(resume: str = None):
     """Demonstrate basic swarm functionality"""
     print("🚀 Claude Swarm Demo - Basic Parallel Execution\n")
     
@@ -234,7 +4439,8 @@ def demo_basic_swarm():
         yaml.dump(config, f)
     
     # Create orchestrator
-    swarm = SwarmOrchestrator('/tmp/demo-swarm.yml')
+    swarm = SwarmOrchestrator('/tmp/demo-swarm.yml', resume=resume)
+    record_command(swarm, ['demo'])
     
     # Example 1: Single agent task
     print("1️⃣ Single Agent Task:")
@@ -265,10 +4471,90 @@ def demo_basic_swarm():
     print(f"\nSynthesis: {results.get('synthesis', '')[:300]}...")
     
     print(f"\n\n{swarm.get_session_summary()}")
+    swarm.close()
+
+async def demo_async_swarm(config_file: str, resume: str = None):
+    """Run the parallel demo tasks through the asyncio orchestrator"""
+    print("🚀 Claude Swarm Demo - Async Execution\n")
+    
+    async with AsyncSwarmOrchestrator(config_file, resume=resume) as swarm:
+        record_command(swarm, ['async', config_file])
+        tasks = {
+            agent: f"As {agent}, describe your first step for building a todo app"
+            for agent in swarm.agents
+        }
+        results = await swarm.aparallel_task(tasks)
+        for agent, response in results.items():
+            print(f"\n{agent}: {response[:200]}...")
+        
+        print(f"\n\n{swarm.get_session_summary()}")
+
+def run_workflow_cli(config_file: str, workflow: str, task: str, resume: str = None):
+    """Run one config workflow and print its timing report"""
+    swarm = SwarmOrchestrator(config_file, resume=resume)
+    record_command(swarm, ['run', config_file, workflow, task])
+    report = swarm.run_workflow(workflow, task)
+    
+    for step_id, result in report['results'].items():
+        timing = report['timings'].get(step_id)
+        if timing is None or step_id in report['incomplete']:
+            print(f"\n[{step_id}] unfinished")
+        else:
+            print(f"\n[{step_id}] +{timing['start']:.1f}s, {timing['duration']:.1f}s")
+        print(f"{result[:200]}...")
+    
+    print(f"\nWall time: {report['wall_time']:.1f}s "
+          f"(sum of steps {report['total_step_time']:.1f}s)")
+    print(f"Critical path ({report['critical_path_time']:.1f}s): "
+          f"{' -> '.join(report['critical_path'])}")
+    print(f"\n{swarm.get_session_summary()}")
+    swarm.close()
+
+def run_batch_cli(config_file: str, target: str):
+    """Run a JSON Lines file of {agent: task} sets as a batch job, or --resume"""
+    swarm = SwarmOrchestrator(config_file)
+    if target == '--resume':
+        jobs = swarm.batches.resume()
+        if not jobs:
+            print("No pending batch jobs")
+    else:
+        with open(target) as f:
+            task_sets = [json.loads(line) for line in f if line.strip()]
+        job_id = swarm.batches.submit(task_sets)
+        for batch_id, batch in swarm.batches.load(job_id)['batches'].items():
+            print(f"📦 Submitted batch {batch_id} ({len(batch['ids'])} requests)")
+        print(f"📋 Job {job_id}: {len(task_sets)} task sets "
+              f"(resume with: batch {config_file} --resume)")
+        jobs = {job_id: swarm.batches.wait(job_id)}
+    
+    for job_id, results in jobs.items():
+        print(f"\n✅ Job {job_id}: {len(results)} task sets, "
+              f"results in {swarm.batches._results_path(job_id)}")
+        for index, result in enumerate(results):
+            for agent, text in result.items():
+                print(f"  [{index}:{agent}] {text[:100]}...")
+    print(f"\n{swarm.get_session_summary()}")
+    swarm.close()
 
 if __name__ == "__main__":
+    args, resume = resume_argv(sys.argv[1:])
+    sys.argv[1:] = args
     if len(sys.argv) > 1 and sys.argv[1] == "demo":
-        demo_basic_swarm()
+        demo_basic_swarm(resume)
+    elif len(sys.argv) > 2 and sys.argv[1] == "async":
+        asyncio.run(demo_async_swarm(sys.argv[2], resume))
+    elif len(sys.argv) > 4 and sys.argv[1] == "run":
+        run_workflow_cli(sys.argv[2], sys.argv[3], sys.argv[4], resume)
+    elif len(sys.argv) > 3 and sys.argv[1] == "batch":
+        run_batch_cli(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) > 1 and sys.argv[1] == "daemon":
+        run_daemon(sys.argv[2:])
+    elif len(sys.argv) > 2 and sys.argv[1] == "worker":
+        processes = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+        if processes > 1:
+            run_worker_processes(sys.argv[2], processes)
+        else:
+            run_worker(sys.argv[2])
     elif len(sys.argv) > 1:
         # Run with provided config
         swarm = SwarmOrchestrator(sys.argv[1])
@@ -277,4 +4563,13 @@ if __name__ == "__main__":
     else:
         print("Usage:")
         print("  python swarm-orchestrator.py demo     # Run demo")
-        print("  python swarm-orchestrator.py config.yml  # Run with config")
\ No newline at end of file
+        print("  python swarm-orchestrator.py config.yml  # Run with config")
+        print("  python swarm-orchestrator.py async config.yml  # Run async demo")
+        print("  python swarm-orchestrator.py run config.yml <workflow> \"<task>\"  # Run a workflow")
+        print("  python swarm-orchestrator.py worker config.yml [processes]  # Serve agent tasks")
+        print("  python swarm-orchestrator.py --resume <session> [command ...]"
+              "  # Continue an interrupted demo/async/run session")
+        print("  python swarm-orchestrator.py batch config.yml tasks.jsonl|--resume"
+              "  # Offline Message Batches job")
+        print("  python swarm-orchestrator.py daemon [--socket PATH] [--port N] [config.yml ...]"
+              "  # Keep swarms warm for swarm-client.py")
\ No newline at end of file
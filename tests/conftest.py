@@ -0,0 +1,98 @@
+"""Shared fixtures
+
+The swarm scripts have hyphenated file names, so they are loaded by
+path (the same way create-real-app.py loads swarm-orchestrator.py).
+"""
+
+import sys
+import threading
+import importlib.util
+from pathlib import Path
+
+import pytest
+import yaml
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def load_script(name: str, relative: str):
+    """Import a repo script by path, once per test session"""
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, ROOT / relative)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[name]
+
+
+@pytest.fixture(scope='session')
+def swarm():
+    return load_script('swarm_orchestrator', 'swarm-orchestrator.py')
+
+
+@pytest.fixture(scope='session')
+def mock_api():
+    return load_script('mock_api_server', 'mock-api-server.py')
+
+
+@pytest.fixture(scope='session')
+def client():
+    return load_script('swarm_client', 'swarm-client.py')
+
+
+@pytest.fixture(scope='session')
+def demo():
+    return load_script('demo_swarm', 'demo-swarm.py')
+
+
+@pytest.fixture(scope='session')
+def generator():
+    return load_script('create_real_app', 'create-real-app.py')
+
+
+@pytest.fixture(scope='session')
+def validation():
+    return load_script('validation_engine', 'hooks/validators/validation_engine.py')
+
+
+@pytest.fixture(scope='session')
+def bundler():
+    return load_script('web_bundler', 'hooks/builders/web_bundler.py')
+
+
+@pytest.fixture
+def mock_server(mock_api):
+    """A MockServer on a free port, running in this process"""
+    server = mock_api.MockServer(('127.0.0.1', 0), mock_api.MockState())
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def mock_env(mock_server, monkeypatch, tmp_path):
+    """Point Anthropic clients at the mock server, with sessions under tmp_path"""
+    host, port = mock_server.server_address
+    monkeypatch.setenv('ANTHROPIC_API_KEY', 'mock')
+    monkeypatch.setenv('ANTHROPIC_BASE_URL', f'http://{host}:{port}')
+    monkeypatch.delenv('SWARM_REDIS_URL', raising=False)
+    monkeypatch.delenv('SWARM_METRICS_PORT', raising=False)
+    monkeypatch.delenv('SWARM_CACHE', raising=False)
+    monkeypatch.chdir(tmp_path)
+    return mock_server.state
+
+
+@pytest.fixture
+def config(tmp_path):
+    """A two-agent swarm config (lead plans and synthesizes, backend builds)"""
+    path = tmp_path / 'swarm.yml'
+    path.write_text(yaml.safe_dump({
+        'swarm': {'name': 'Test', 'main': 'lead'},
+        'instances': {'lead': {'description': 'lead developer',
+                               'model': 'claude-3-haiku-20240307'},
+                      'backend': {'description': 'backend developer'}},
+        'context': {'summarize': False},
+    }))
+    return path
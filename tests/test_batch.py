@@ -0,0 +1,103 @@
+"""BatchExecutor: chunked submission, polling and resume, on a stub batches API"""
+
+from types import SimpleNamespace
+
+import pytest
+import yaml
+
+
+class StubBatches:
+    """messages.batches with batches that end when the test says so"""
+
+    def __init__(self, fail_after: int = None):
+        self.requests = {}
+        self.ended = set()
+        self.fail_after = fail_after
+
+    def create(self, requests):
+        if self.fail_after is not None and len(self.requests) >= self.fail_after:
+            raise ConnectionError('submission interrupted')
+        batch_id = f'msgbatch_{len(self.requests)}'
+        self.requests[batch_id] = requests
+        return SimpleNamespace(id=batch_id)
+
+    def retrieve(self, batch_id):
+        return SimpleNamespace(id=batch_id, processing_status=(
+            'ended' if batch_id in self.ended else 'in_progress'))
+
+    def results(self, batch_id):
+        for request in self.requests[batch_id]:
+            message = SimpleNamespace(
+                content=[SimpleNamespace(text=f"answer to {request['params']['messages'][-1]['content']}")],
+                usage=SimpleNamespace(input_tokens=10, output_tokens=5))
+            yield SimpleNamespace(custom_id=request['custom_id'],
+                                  result=SimpleNamespace(type='succeeded', message=message))
+
+    def end_all(self):
+        self.ended.update(self.requests)
+
+
+@pytest.fixture
+def batch_config(config, tmp_path):
+    spec = yaml.safe_load(config.read_text())
+    spec['batch'] = {'directory': str(tmp_path / 'batches'), 'poll_interval': 0.01,
+                     'max_poll_interval': 0.02, 'max_requests': 2}
+    config.write_text(yaml.safe_dump(spec))
+    return str(config)
+
+
+def executor(swarm, path, stub):
+    orchestrator = swarm.SwarmOrchestrator(path)
+    orchestrator.batches.client = SimpleNamespace(messages=SimpleNamespace(batches=stub))
+    return orchestrator
+
+
+TASK_SETS = [{'lead': f'Plan project {n}', 'backend': f'Build project {n}'} for n in range(3)]
+
+
+def test_requests_are_chunked_into_batches_of_max_requests(swarm, mock_env, batch_config):
+    stub = StubBatches()
+    orchestrator = executor(swarm, batch_config, stub)
+    job_id = orchestrator.batches.submit(TASK_SETS)
+
+    assert [len(requests) for requests in stub.requests.values()] == [2, 2, 2]
+    custom_ids = [r['custom_id'] for requests in stub.requests.values() for r in requests]
+    assert len(set(custom_ids)) == 6
+    job = orchestrator.batches.load(job_id)
+    assert job['status'] == 'submitted' and list(job['batches']) == list(stub.requests)
+
+    stub.end_all()
+    results = orchestrator.batches.wait(job_id)
+    orchestrator.close()
+    assert results == [{'lead': f'answer to Plan project {n}',
+                        'backend': f'answer to Build project {n}'} for n in range(3)]
+    assert orchestrator.batches.load(job_id)['status'] == 'ended'
+    assert orchestrator.batches.pending_jobs() == []
+
+
+def test_resume_collects_a_job_left_by_an_earlier_process(swarm, mock_env, batch_config):
+    # The first process is interrupted after submitting one of three batches
+    stub = StubBatches(fail_after=1)
+    first = executor(swarm, batch_config, stub)
+    with pytest.raises(ConnectionError):
+        first.batches.submit(TASK_SETS)
+    first.close()
+    job_id, = first.batches.pending_jobs()
+    assert first.batches.load(job_id)['status'] == 'submitting'
+
+    # A scope that ends while the batch is still running leaves it pending
+    stub.fail_after = None
+    second = executor(swarm, batch_config, stub)
+    partial = second.batches.wait(job_id, scope=swarm.TaskScope(0.05))
+    assert partial[0]['lead'] == 'Deadline exceeded: lead did not finish in time'
+    assert second.batches.pending_jobs() == [job_id]
+    # The missing requests went out in batches of their own
+    assert [len(requests) for requests in stub.requests.values()] == [2, 2, 2]
+
+    stub.end_all()
+    jobs = second.batches.resume()
+    second.close()
+    assert list(jobs) == [job_id]
+    assert jobs[job_id] == [{'lead': f'answer to Plan project {n}',
+                             'backend': f'answer to Build project {n}'} for n in range(3)]
+    assert second.batches.pending_jobs() == []
@@ -0,0 +1,52 @@
+"""ContextManager budgets and its summary cache"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+def test_context_over_budget_is_shrunk_keeping_the_most_important(swarm):
+    manager = swarm.ContextManager(budget=200)
+    context = [{'agent': 'a', 'message': 'x' * 4000, 'priority': 20},
+               {'agent': 'b', 'message': 'short', 'priority': 1}]
+    fitted = manager.fit(context)
+    assert fitted[1] == context[1]
+    assert fitted[0]['message'].endswith('...[truncated]')
+    # About the remaining budget (the truncation marker adds a few tokens)
+    assert manager.count_tokens(fitted[0]['message']) <= 205
+
+
+def test_summaries_are_reused_from_a_bounded_lru(swarm):
+    calls = []
+
+    def summarize(text, max_tokens):
+        calls.append(text)
+        return f"summary of {text[:3]}"
+
+    manager = swarm.ContextManager(summarize=summarize, max_summaries=2)
+    texts = [letter * 1000 for letter in 'abc']
+    assert manager.shrink(texts[0], 10) == 'summary of aaa'
+    manager.shrink(texts[1], 10)
+    manager.shrink(texts[0], 10)   # hit: 'a' becomes most recent
+    assert len(calls) == 2
+
+    manager.shrink(texts[2], 10)   # evicts 'b', the least recently used
+    assert len(manager._summaries) == 2
+    manager.shrink(texts[0], 10)
+    assert len(calls) == 3
+    manager.shrink(texts[1], 10)
+    assert len(calls) == 4
+
+
+def test_overlong_summary_is_truncated_to_its_share(swarm):
+    manager = swarm.ContextManager(summarize=lambda text, max_tokens: text[:2000])
+    shrunk = manager.shrink('x' * 4000, 100)
+    assert shrunk.endswith('...[truncated]')
+    assert manager.count_tokens(shrunk) <= 105
+    assert manager.stats['summarized'] == 1
+    assert manager.stats['truncated'] == 1
+
+
+def test_stats_count_every_concurrent_shrink(swarm):
+    manager = swarm.ContextManager(summarize=lambda text, max_tokens: 'summary')
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(lambda n: manager.shrink(str(n) * 1000, 10), range(400)))
+    assert manager.stats['summarized'] == 400
@@ -0,0 +1,119 @@
+"""Code extraction and multi-file generation in create-real-app.py"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+def test_extract_code_unwraps_a_single_fenced_block(generator):
+    assert generator.extract_code("```jsx\nconst a = 1;\n```", 'App.js') == 'const a = 1;'
+
+
+def test_extract_code_prefers_the_block_in_the_files_language(generator):
+    reply = ("Here is the file:\n```bash\nnpm install\n```\n"
+             "```css\nbody { margin: 0; }\n```\nEnjoy!")
+    assert generator.extract_code(reply, 'App.css') == 'body { margin: 0; }'
+
+
+def test_extract_code_drops_a_fence_left_open_by_truncation(generator):
+    assert generator.extract_code("```js\nconst a = 1;", 'a.js') == 'const a = 1;'
+
+
+def test_extract_code_keeps_markdown_fences(generator):
+    readme = "# App\n\n```bash\nnpm start\n```\n\nThat's it."
+    assert generator.extract_code(readme, 'README.md') == readme
+
+
+def test_splitter_emits_each_file_as_soon_as_it_ends(generator):
+    splitter = generator.FileStreamSplitter()
+    reply = ("Sure!\n=== FILE: src/a.js ===\nconst a = 1;\n=== END FILE ===\n"
+             "=== FILE: b.css ===\n```css\nb { x: 1 }\n```\n=== END FILE ===\n")
+    emitted = {}
+    # Feed in awkward chunks, splitting lines and markers
+    for start in range(0, len(reply), 7):
+        for path, content in splitter.feed(reply[start:start + 7]):
+            emitted[path] = (content, start + 7)
+    assert splitter.close() == []
+
+    first_end = reply.index('=== END FILE ===') + len('=== END FILE ===\n')
+    content, offset = emitted['src/a.js']
+    assert content == 'const a = 1;'
+    # Emitted with the chunk holding its end marker, before the next file arrived
+    assert first_end <= offset < first_end + 7
+    assert emitted['b.css'][0] == 'b { x: 1 }'
+
+
+def test_splitter_new_header_ends_an_unterminated_file(generator):
+    splitter = generator.FileStreamSplitter()
+    done = splitter.feed("=== FILE: a.js ===\nvar a;\n=== FILE: b.js ===\nvar b;\n")
+    assert done == [('a.js', 'var a;')]
+    assert splitter.close() == [('b.js', 'var b;')]
+
+
+def test_splitter_drops_a_truncated_last_file_unless_complete(generator):
+    splitter = generator.FileStreamSplitter()
+    splitter.feed("=== FILE: a.js ===\nvar a;\n=== END FILE ===\n=== FILE: b.js ===\nvar b")
+    assert splitter.close(complete=False) == []
+
+
+def test_generate_files_streams_a_group_in_one_call(generator, mock_env):
+    agent = generator.CodeGeneratorAgent('Frontend Dev', 'React developer')
+    written = []
+    files = agent.generate_files([('frontend/App.js', 'Main component'),
+                                  ('frontend/App.css', 'Styles')],
+                                 on_file=lambda path, content: written.append(path))
+
+    assert agent.calls == 1
+    assert mock_env.stats['ok'] == 1
+    assert written == ['frontend/App.js', 'frontend/App.css']
+    assert 'frontend/App.js' in files['frontend/App.js']
+    assert files['frontend/App.css'].startswith('/*')
+
+
+def test_repairs_validate_the_project_once_per_round(generator, mock_env, tmp_path, monkeypatch):
+    class Agent:
+        def generate_code(self, task, path):
+            return 'b { x: 1 }'
+
+    pipeline = generator.GenerationPipeline(tmp_path, {'dev': Agent()})
+    entries = [{'path': 'a.css', 'agent': 'dev', 'task': 'A'},
+               {'path': 'b.css', 'agent': 'dev', 'task': 'B'}]
+    pipeline.entries = {entry['path']: entry for entry in entries}
+    contents = {'a.css': 'a {', 'b.css': 'b {'}
+    for path, content in contents.items():
+        (tmp_path / path).write_text(content)
+
+    validations = []
+    validate_project = pipeline.engine.validate_project
+    monkeypatch.setattr(pipeline.engine, 'validate_project',
+                        lambda root: validations.append(root) or validate_project(root))
+    failing, report = pipeline._validate_and_fix(entries, contents, {}, pending=False)
+
+    # Both broken files share each round's validation: one to find, one to confirm
+    assert len(validations) == 2
+    assert failing == {'a.css': [], 'b.css': []}
+    assert report['errors'] == 0
+    assert pipeline.fix_attempts == {'a.css': 1, 'b.css': 1}
+    assert (tmp_path / 'a.css').read_text() == contents['a.css'] == 'b { x: 1 }'
+
+
+def test_fix_budget_holds_under_concurrent_repairs(generator, mock_env, tmp_path):
+    pipeline = generator.GenerationPipeline(tmp_path, {}, validate=False, max_fix_attempts=3)
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        attempts = list(executor.map(lambda n: pipeline._take_fix_attempt(f"{n % 4}.css"),
+                                     range(400)))
+
+    assert sorted(a for a in attempts if a is not None) == [1] * 4 + [2] * 4 + [3] * 4
+    assert pipeline.fix_attempts == {f"{n}.css": 3 for n in range(4)}
+
+
+def test_fixed_files_keep_their_input_key_from_day_to_day(generator, mock_env, tmp_path,
+                                                           monkeypatch):
+    pipeline = generator.GenerationPipeline(tmp_path, {}, validate=False)
+
+    def keys():
+        return {entry['path']: pipeline.input_key(entry, {})
+                for entry in generator.todo_app_manifest() if 'content' in entry}
+
+    monkeypatch.setattr(generator.time, 'strftime', lambda *args: '2026-01-01')
+    today = keys()
+    monkeypatch.setattr(generator.time, 'strftime', lambda *args: '2026-01-02')
+    assert keys() == today
@@ -0,0 +1,67 @@
+"""The swarm daemon's TCP endpoint: binding, token and counters"""
+
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+@pytest.fixture
+def daemon(swarm, mock_env, tmp_path, monkeypatch):
+    monkeypatch.setenv('SWARM_DAEMON_TOKEN', 'secret')
+    daemon = swarm.SwarmDaemon(socket_path=str(tmp_path / 'swarm.sock'), port=free_port())
+    thread = threading.Thread(target=daemon.serve, daemon=True)
+    thread.start()
+    while len(daemon._servers) < 2:
+        threading.Event().wait(0.01)
+    yield daemon
+    daemon.shutdown()
+    thread.join(5)
+
+
+def test_tcp_port_needs_a_token(swarm, mock_env, monkeypatch):
+    monkeypatch.delenv('SWARM_DAEMON_TOKEN', raising=False)
+    with pytest.raises(ValueError, match='SWARM_DAEMON_TOKEN'):
+        swarm.SwarmDaemon(port=free_port())
+    # The Unix socket alone needs none
+    assert swarm.SwarmDaemon(port=None).token is None
+
+
+def test_tcp_posts_are_refused_without_the_token(daemon, client, config, monkeypatch):
+    url = f'http://127.0.0.1:{daemon.port}'
+    assert daemon._servers[1].server_address[0] == '127.0.0.1'
+
+    monkeypatch.delenv('SWARM_DAEMON_TOKEN')
+    with pytest.raises(RuntimeError, match='daemon token'):
+        client.request('POST', '/load', {'config': str(config)}, url=url)
+    assert daemon.swarms == {}
+    # Reads stay open, e.g. for a metrics scraper
+    assert client.request('GET', '/status', url=url)['port'] == daemon.port
+
+    monkeypatch.setenv('SWARM_DAEMON_TOKEN', 'wrong')
+    with pytest.raises(RuntimeError, match='daemon token'):
+        client.request('POST', '/shutdown', {}, url=url)
+
+    monkeypatch.setenv('SWARM_DAEMON_TOKEN', 'secret')
+    status = client.request('POST', '/load', {'config': str(config)}, url=url)
+    assert list(status['swarms']) == [str(config.resolve())]
+    # The Unix socket does not ask for it
+    monkeypatch.delenv('SWARM_DAEMON_TOKEN')
+    assert client.request('POST', '/load', {}, socket_path=daemon.socket_path)['swarms']
+
+
+def test_concurrent_requests_are_all_counted(daemon, client):
+    def bad_task(_):
+        with pytest.raises(RuntimeError):
+            client.request('POST', '/task', {'mode': 'delegate'}, socket_path=daemon.socket_path)
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(bad_task, range(64)))
+    assert daemon.status()['stats']['requests'] == 64
+    assert daemon.status()['stats']['errors'] == 64
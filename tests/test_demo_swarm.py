@@ -0,0 +1,26 @@
+"""demo-swarm.py: parallel rounds end at the task timeout"""
+
+
+def agents(demo):
+    return {'lead': demo.SimpleAgent('lead', 'lead developer', 'claude-3-5-sonnet-20241022'),
+            'backend': demo.SimpleAgent('backend', 'backend developer')}
+
+
+TASKS = {'lead': 'Plan the architecture', 'backend': 'Design the schema'}
+
+
+def test_stream_parallel_stops_at_the_timeout(demo, mock_env, capsys):
+    mock_env.update({'model_latency': {'sonnet': 5.0}})
+    first_output = demo.stream_parallel(agents(demo), TASKS, timeout=1.0)
+
+    assert list(first_output) == ['backend']
+    assert '[lead] Error: no result within 1s' in capsys.readouterr().out
+
+
+def test_stream_parallel_ends_when_an_agent_raises(demo, mock_env, capsys):
+    team = agents(demo)
+    del team['lead']
+    first_output = demo.stream_parallel(team, TASKS, timeout=30.0)
+
+    assert sorted(first_output) == ['backend', 'lead']
+    assert "Error: 'lead'" in capsys.readouterr().out
@@ -0,0 +1,95 @@
+"""MessageBus backends: the in-process bus and Redis Streams (on fakeredis)"""
+
+import queue
+
+import pytest
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def make_bus(request, swarm):
+    if request.param == 'memory':
+        return lambda **options: swarm.InProcessMessageBus(**options)
+    fakeredis = pytest.importorskip('fakeredis')
+    server = fakeredis.FakeServer()
+    return lambda **options: swarm.RedisMessageBus(
+        client=fakeredis.FakeRedis(server=server, decode_responses=True), **options)
+
+
+def test_incomplete_backend_fails_at_creation(swarm):
+    class NoReclaim(swarm.MessageBus):
+        def push(self, stream, payload, capped=False):
+            return ''
+
+        def pull(self, streams, group, consumer, count=10, block=0.0):
+            return []
+
+        def ack(self, group, entry_ids):
+            pass
+
+    with pytest.raises(TypeError, match='reclaim'):
+        NoReclaim()
+
+
+def test_directed_message_reaches_one_consumer(swarm, make_bus):
+    bus = make_bus()
+    bus.publish(swarm.MessageBus.envelope('lead', 'build the API', to_agent='backend'))
+
+    first = bus.consume('backend', consumer='w1')
+    assert [m['message'] for m in first] == ['build the API']
+    assert first[0]['from'] == 'lead'
+    # Same group, other worker: the entry is already taken
+    assert bus.consume('backend', consumer='w2') == []
+    assert bus.consume('frontend') == []
+
+
+def test_broadcast_reaches_every_agent(swarm, make_bus):
+    bus = make_bus()
+    bus.publish(swarm.MessageBus.envelope('lead', 'plan ready'))
+
+    assert [m['message'] for m in bus.consume('frontend')] == ['plan ready']
+    assert [m['message'] for m in bus.consume('backend')] == ['plan ready']
+    assert bus.consume('frontend') == []
+
+
+def test_unacked_entry_is_reclaimed_by_another_consumer(swarm, make_bus):
+    bus = make_bus()
+    stream = bus.stream_name('backend')
+    entry_id = bus.push(stream, {'task': 'migrate'})
+
+    taken = bus.pull([stream], 'backend', 'w1')
+    assert taken == [(entry_id, {'task': 'migrate'})]
+    # Not idle long enough yet
+    assert bus.reclaim(stream, 'backend', 'w2', min_idle=60) == []
+
+    assert bus.deliveries('backend', entry_id) == 1
+
+    reclaimed = bus.reclaim(stream, 'backend', 'w2', min_idle=0)
+    assert reclaimed == [(entry_id, {'task': 'migrate'})]
+    assert bus.deliveries('backend', entry_id) == 2
+    bus.ack('backend', [entry_id])
+    assert bus.reclaim(stream, 'backend', 'w3', min_idle=0) == []
+    assert bus.deliveries('backend', entry_id) == 0
+
+
+def test_uncapped_stream_applies_backpressure_until_acked(make_bus):
+    bus = make_bus(max_len=2, publish_timeout=0.05)
+    stream = bus.stream_name('worker')
+    bus.push(stream, {'n': 1})
+    bus.push(stream, {'n': 2})
+    with pytest.raises(queue.Full):
+        bus.push(stream, {'n': 3})
+
+    entries = bus.pull([stream], 'worker', 'w1', count=1)
+    bus.ack('worker', [entry_id for entry_id, _ in entries])
+    bus.push(stream, {'n': 3})
+    assert [payload['n'] for _, payload in bus.pull([stream], 'worker', 'w1')] == [2, 3]
+
+
+def test_capped_stream_drops_oldest(swarm, make_bus):
+    bus = make_bus(max_len=3)
+    for n in range(10):
+        bus.publish(swarm.MessageBus.envelope('lead', str(n)))
+    received = [int(m['message']) for m in bus.consume('anyone', count=100)]
+    # Redis trims approximately (MAXLEN ~): only the newest entries are guaranteed
+    assert received[-3:] == [7, 8, 9]
+    assert received == sorted(received)
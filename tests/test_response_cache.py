@@ -0,0 +1,102 @@
+"""ResponseCache: in-memory LRU over SQLite, and when the swarm uses it"""
+
+import pytest
+
+REQUEST = {'model': 'claude-3-haiku-20240307', 'max_tokens': 100,
+           'messages': [{'role': 'user', 'content': 'Plan it'}]}
+
+
+def request(n: int) -> dict:
+    return dict(REQUEST, messages=[{'role': 'user', 'content': f'Task {n}'}])
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / 'cache' / 'responses.sqlite')
+
+
+def test_memory_hit(swarm, cache_path):
+    cache = swarm.ResponseCache(cache_path)
+    assert cache.get(REQUEST) is None
+    cache.put(REQUEST, 'the plan')
+    assert cache.get(REQUEST) == 'the plan'
+    assert cache.get(dict(REQUEST, max_tokens=200)) is None
+    cache.close()
+    assert cache.stats == {'memory_hits': 1, 'disk_hits': 0, 'misses': 2,
+                           'writes': 1, 'evictions': 0}
+
+
+def test_disk_hit_after_a_restart(swarm, cache_path):
+    first = swarm.ResponseCache(cache_path)
+    first.put(REQUEST, 'the plan')
+    first.close()
+
+    second = swarm.ResponseCache(cache_path)
+    assert second.get(REQUEST) == 'the plan'
+    # Promoted to memory by the disk hit
+    assert second.get(REQUEST) == 'the plan'
+    second.close()
+    assert (second.stats['disk_hits'], second.stats['memory_hits']) == (1, 1)
+
+
+def test_expired_entries_are_misses(swarm, cache_path):
+    cache = swarm.ResponseCache(cache_path, ttl=-1)
+    cache.put(REQUEST, 'the plan')
+    assert cache.get(REQUEST) is None
+    cache.close()
+
+
+def test_memory_tier_evicts_least_recently_used_at_its_cap(swarm, cache_path):
+    # Room for two 100-byte values
+    cache = swarm.ResponseCache(cache_path, max_memory_mb=250 / 1024 / 1024)
+    cache.put(request(1), 'a' * 100)
+    cache.put(request(2), 'b' * 100)
+    cache.get(request(1))
+    cache.put(request(3), 'c' * 100)
+
+    assert cache.stats['evictions'] == 1
+    assert cache.get(request(1)) == 'a' * 100
+    assert cache.get(request(3)) == 'c' * 100
+    assert cache.stats['memory_hits'] == 3
+    # Still on disk, so not lost
+    assert cache.get(request(2)) == 'b' * 100
+    assert cache.stats['disk_hits'] == 1
+    cache.close()
+
+
+def test_disk_tier_evicts_least_recently_used_at_its_cap(swarm, cache_path):
+    cache = swarm.ResponseCache(cache_path, max_memory_mb=0, max_disk_mb=250 / 1024 / 1024)
+    cache.put(request(1), 'a' * 100)
+    cache.put(request(2), 'b' * 100)
+    cache.get(request(1))
+    cache.put(request(3), 'c' * 100)
+    cache.close()
+
+    reopened = swarm.ResponseCache(cache_path)
+    assert reopened.get(request(2)) is None
+    assert reopened.get(request(1)) == 'a' * 100
+    assert reopened.get(request(3)) == 'c' * 100
+    reopened.close()
+
+
+@pytest.mark.parametrize('section', [None, False, {'enabled': False}])
+def test_disabled_cache_is_not_built(swarm, section):
+    assert swarm.ResponseCache.from_config(section) is None
+
+
+def test_swarm_bypasses_the_cache_unless_enabled(swarm, mock_env, config, monkeypatch):
+    orchestrator = swarm.SwarmOrchestrator(str(config))
+    assert orchestrator.cache is None
+    orchestrator.delegate_task('Build the API', to_agent='backend')
+    orchestrator.delegate_task('Build the API', to_agent='backend')
+    orchestrator.close()
+    assert mock_env.stats['ok'] == 2
+
+    monkeypatch.setenv('SWARM_CACHE', '1')
+    orchestrator = swarm.SwarmOrchestrator(str(config))
+    first = orchestrator.delegate_task('Design the schema', to_agent='backend')
+    second = orchestrator.delegate_task('Design the schema', to_agent='backend')
+    orchestrator.close()
+    assert mock_env.stats['ok'] == 3
+    assert second == first
+    assert orchestrator.cache.stats['memory_hits'] == 1
@@ -0,0 +1,69 @@
+"""ModelRouter: the cheap-first cascade across model tiers"""
+
+import yaml
+
+HAIKU = 'claude-3-haiku-20240307'
+SONNET = 'claude-3-5-sonnet-20241022'
+
+
+def routed(swarm, config, **routing):
+    spec = yaml.safe_load(config.read_text())
+    spec['routing'] = dict({'tiers': [{'model': HAIKU, 'max_tokens': 1024},
+                                      {'model': SONNET, 'max_tokens': 4096}]}, **routing)
+    config.write_text(yaml.safe_dump(spec))
+    return swarm.SwarmOrchestrator(str(config))
+
+
+def test_rejected_cheap_answer_escalates_to_the_next_tier(swarm, mock_env, config):
+    mock_env.update({'unsure': {'haiku': 1.0}})
+    orchestrator = routed(swarm, config)
+    result = orchestrator.delegate_task('Build the API', to_agent='backend')
+    orchestrator.close()
+
+    router = orchestrator.router
+    assert not result['backend'].startswith('Error')
+    assert mock_env.stats['requests'] == 2 and mock_env.stats['unsure'] == 1
+    assert router.stats['escalated'] == 1
+    assert router.stats['reasons'] == {'low confidence': 1}
+    assert router.stats['routes'][('backend', f'{HAIKU} -> {SONNET}')]['calls'] == 1
+
+
+def test_accepted_cheap_answer_stays_on_the_cheap_tier(swarm, mock_env, config):
+    orchestrator = routed(swarm, config)
+    orchestrator.delegate_task('Build the API', to_agent='backend')
+    orchestrator.close()
+
+    router = orchestrator.router
+    assert mock_env.stats['requests'] == 1
+    assert router.stats['escalated'] == 0
+    assert list(router.stats['routes']) == [('backend', HAIKU)]
+    assert router.stats['routes'][('backend', HAIKU)]['calls'] == 1
+
+
+def test_agent_that_keeps_escalating_skips_the_cheap_tier(swarm, mock_env, config):
+    mock_env.update({'unsure': {'haiku': 1.0}})
+    orchestrator = routed(swarm, config, min_samples=3, probe_every=3)
+    for n in range(6):
+        orchestrator.delegate_task(f'Build endpoint {n}', to_agent='backend')
+    orchestrator.close()
+
+    router = orchestrator.router
+    # Three escalations fill the sample; then two calls go straight to the
+    # top tier and the third is a probe of the cheap one
+    assert router.stats['skipped_cheap'] == 2
+    routes = router.stats['routes']
+    assert routes[('backend', SONNET)]['calls'] == 2
+    assert routes[('backend', f'{HAIKU} -> {SONNET}')]['calls'] == 4
+    assert routes[('backend', f'{HAIKU} -> {SONNET}')]['escalated'] == 4
+    assert router.stats['calls'] == 6 and router.stats['escalated'] == 4
+    assert mock_env.stats['requests'] == 10
+    assert [row['route'] for row in router.report()] == [f'{HAIKU} -> {SONNET}', SONNET]
+
+
+def test_large_prompt_goes_straight_to_the_top_tier(swarm, mock_env, config):
+    orchestrator = routed(swarm, config, large_task_tokens=10)
+    orchestrator.delegate_task('Build the API ' * 20, to_agent='backend')
+    orchestrator.close()
+
+    assert list(orchestrator.router.stats['routes']) == [('backend', SONNET)]
+    assert orchestrator.router.stats['skipped_cheap'] == 0
@@ -0,0 +1,210 @@
+"""RequestScheduler: token buckets, priorities, retries and deadlines; hedging and quorum"""
+
+import json
+import asyncio
+import threading
+import time
+
+import pytest
+import yaml
+from anthropic import Anthropic, BadRequestError
+
+
+def test_token_bucket_refills_continuously(swarm):
+    bucket = swarm.TokenBucket(60)
+    now = bucket.updated
+    assert bucket.wait_time(60, now) == 0.0
+
+    bucket.consume(60)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now + 1.0) == 0.0
+    # Never refills past capacity, and oversized requests are capped to it
+    assert bucket.wait_time(1000, now + 3600) == 0.0
+    assert bucket.tokens == 60
+
+
+def test_drained_bucket_waits_for_a_refill(swarm):
+    bucket = swarm.TokenBucket(120)
+    now = bucket.updated
+    bucket.drain()
+    assert bucket.wait_time(1, now) == pytest.approx(0.5)
+
+
+def test_requests_per_minute_limit_queues_the_burst(swarm):
+    scheduler = swarm.RequestScheduler(rate_limits={'m': {'requests_per_minute': 2}})
+    calls = []
+    create = lambda **request: calls.append(request) or 'ok'
+
+    assert scheduler.call(create, {'model': 'm'}) == 'ok'
+    assert scheduler.call(create, {'model': 'm'}) == 'ok'
+    start = time.monotonic()
+    with pytest.raises(swarm.DeadlineExceeded, match='expired in the queue'):
+        scheduler.call(create, {'model': 'm'}, deadline=time.monotonic() + 0.2)
+    assert time.monotonic() - start < 1.0
+    assert len(calls) == 2
+    assert scheduler._waiting == []
+    # Other models have their own buckets
+    assert scheduler.call(create, {'model': 'other'}) == 'ok'
+
+
+def test_higher_priority_waiter_goes_first(swarm):
+    scheduler = swarm.RequestScheduler(max_concurrency=1)
+    release = threading.Event()
+    order = []
+
+    def blocking(**request):
+        release.wait(5)
+        return 'first'
+
+    def record(**request):
+        order.append(request['name'])
+        return request['name']
+
+    holder = threading.Thread(target=scheduler.call, args=(blocking, {'model': 'm'}))
+    holder.start()
+    while scheduler._in_flight == 0:
+        time.sleep(0.005)
+    waiters = []
+    for name, priority in (('low', 20), ('high', 1)):
+        waiter = threading.Thread(target=scheduler.call,
+                                  args=(record, {'model': 'm', 'name': name}, priority))
+        waiter.start()
+        waiters.append(waiter)
+        while len(scheduler._waiting) < len(waiters):
+            time.sleep(0.005)
+
+    release.set()
+    for thread in [holder] + waiters:
+        thread.join(5)
+    assert order == ['high', 'low']
+
+
+def test_429_is_retried_after_retry_after(swarm, mock_env):
+    mock_env.update({'fail_next': 2, 'status': 429, 'retry_after': 0.2})
+    scheduler = swarm.RequestScheduler(base_delay=0.01)
+    client = Anthropic(max_retries=0)
+    meta = {}
+
+    start = time.monotonic()
+    response = scheduler.call(client.messages.create, {
+        'model': 'claude-3-haiku-20240307', 'max_tokens': 50,
+        'messages': [{'role': 'user', 'content': 'hello'}]}, meta=meta)
+    elapsed = time.monotonic() - start
+
+    assert response.content[0].text
+    assert meta['retries'] == 2
+    assert elapsed >= 0.4
+    assert scheduler.stats['rate_limited'] == 2
+    assert mock_env.stats['rate_limited'] == 2
+    assert mock_env.stats['ok'] == 1
+
+
+def test_client_errors_are_not_retried(swarm, mock_env):
+    mock_env.update({'fail_next': 1, 'status': 400})
+    scheduler = swarm.RequestScheduler(base_delay=0.01)
+    client = Anthropic(max_retries=0)
+
+    with pytest.raises(BadRequestError):
+        scheduler.call(client.messages.create, {
+            'model': 'claude-3-haiku-20240307', 'max_tokens': 50,
+            'messages': [{'role': 'user', 'content': 'hello'}]})
+    assert mock_env.stats['requests'] == 1
+    assert scheduler.stats['errors'] == 1
+
+
+def test_retry_never_backs_off_past_the_deadline(swarm, mock_env):
+    mock_env.update({'fail_next': 1, 'status': 429, 'retry_after': 5})
+    scheduler = swarm.RequestScheduler(base_delay=0.01)
+    client = Anthropic(max_retries=0)
+
+    start = time.monotonic()
+    with pytest.raises(swarm.DeadlineExceeded, match='no time left to retry'):
+        scheduler.call(client.messages.create, {
+            'model': 'claude-3-haiku-20240307', 'max_tokens': 50,
+            'messages': [{'role': 'user', 'content': 'hello'}]},
+            deadline=time.monotonic() + 1.0)
+    assert time.monotonic() - start < 1.0
+
+
+def test_async_ticket_expiring_in_the_queue_is_never_dispatched(swarm):
+    scheduler = swarm.RequestScheduler(max_concurrency=1)
+    sent = []
+
+    async def create(**request):
+        sent.append(request['name'])
+        await asyncio.sleep(0.3)
+        return request['name']
+
+    async def main():
+        first = asyncio.create_task(scheduler.acall(create, {'model': 'm', 'name': 'first'}))
+        await asyncio.sleep(0.05)
+        with pytest.raises(swarm.DeadlineExceeded, match='expired in the queue'):
+            await scheduler.acall(create, {'model': 'm', 'name': 'late'},
+                                  deadline=time.monotonic() + 0.1)
+        return await first
+
+    assert asyncio.run(main()) == 'first'
+    assert sent == ['first']
+    assert scheduler._waiting == [] and scheduler._in_flight == 0
+
+
+def extend_config(config, **sections):
+    spec = yaml.safe_load(config.read_text())
+    for name, section in sections.items():
+        spec.setdefault(name, {}).update(section)
+    config.write_text(yaml.safe_dump(spec))
+    return str(config)
+
+
+def test_slow_primary_is_beaten_by_the_hedge(swarm, mock_env, config):
+    # backend runs on sonnet, which is slow today; its hedge goes to haiku
+    mock_env.update({'model_latency': {'sonnet': 3.0, 'haiku': 0.0}})
+    path = extend_config(config, hedging={
+        'delay': 0.2, 'max_rate': 1.0, 'models': {'default': 'claude-3-haiku-20240307'}})
+    orchestrator = swarm.SwarmOrchestrator(path)
+    start = time.monotonic()
+    result = orchestrator.delegate_task('Build the API', to_agent='backend')
+    elapsed = time.monotonic() - start
+    orchestrator.close()
+
+    assert elapsed < 1.5
+    assert not result['backend'].startswith('Error')
+    assert orchestrator.hedging.stats['hedged'] == 1
+    assert orchestrator.hedging.stats['hedge_wins'] == 1
+    assert orchestrator.hedging.stats['cancelled'] == 1
+    assert ('swarm_hedged_requests_total{agent="backend",model="claude-3-haiku-20240307",'
+            'winner="hedge"} 1') in orchestrator.metrics.render()
+
+
+def test_fast_primary_is_not_hedged(swarm, mock_env, config):
+    path = extend_config(config, hedging={'delay': 0.5, 'max_rate': 1.0})
+    orchestrator = swarm.SwarmOrchestrator(path)
+    orchestrator.delegate_task('Build the API', to_agent='backend')
+    orchestrator.close()
+
+    assert orchestrator.hedging.stats == {'calls': 1, 'hedged': 0, 'hedge_wins': 0,
+                                          'cancelled': 0}
+    assert mock_env.stats['requests'] == 1
+
+
+def test_quorum_synthesizes_after_n_of_m_subtasks(swarm, mock_env, config):
+    # tester runs on a model that takes far longer than the others
+    mock_env.update({'model_latency': {'opus': 3.0}})
+    path = extend_config(config, instances={
+        'frontend': {'description': 'frontend developer'},
+        'tester': {'description': 'QA engineer', 'model': 'claude-3-opus-20240229'}})
+    orchestrator = swarm.SwarmOrchestrator(path)
+    subtasks = {'backend': 'Build the API', 'frontend': 'Build the UI',
+                'tester': 'Write the tests'}
+    start = time.monotonic()
+    results = orchestrator.collaborative_task('Todo app', subtasks, quorum=2)
+    elapsed = time.monotonic() - start
+    orchestrator.close()
+
+    assert elapsed < 2.0
+    assert set(results) == {'lead', 'backend', 'frontend', 'synthesis'}
+    with open(orchestrator.session_dir / 'lead.jsonl') as f:
+        synthesis = [json.loads(line) for line in f][-1]
+    assert synthesis['task'] == 'Synthesize subtask results'
+    assert synthesis['used'] == ['backend', 'frontend']
+    assert synthesis['subtasks'] == 3
@@ -0,0 +1,92 @@
+"""SessionJournal checkpoints and resuming a session against the mock API"""
+
+import pytest
+import yaml
+
+
+def test_journal_replays_records_in_order_only_when_resuming(swarm, tmp_path):
+    journal = swarm.SessionJournal(tmp_path)
+    key = journal.key('lead', 'plan', [{'agent': 'x', 'message': 'y'}])
+    journal.record(key, 'lead', 'plan', 'first')
+    journal.record(key, 'lead', 'plan', 'second')
+    journal.close()
+
+    assert swarm.SessionJournal(tmp_path).replay(key) is None
+
+    resumed = swarm.SessionJournal(tmp_path, resume=True)
+    assert resumed.stats['loaded'] == 2
+    assert resumed.replay(key) == 'first'
+    assert resumed.replay(key) == 'second'
+    assert resumed.replay(key) is None
+    resumed.close()
+
+
+def test_journal_skips_a_record_cut_short_by_a_crash(swarm, tmp_path):
+    journal = swarm.SessionJournal(tmp_path)
+    key = journal.key('lead', 'plan')
+    journal.record(key, 'lead', 'plan', 'kept')
+    journal.close()
+    with open(tmp_path / swarm.SessionJournal.FILENAME, 'a') as f:
+        f.write('{"key": "' + key + '", "respo')
+
+    resumed = swarm.SessionJournal(tmp_path, resume=True)
+    assert resumed.stats['loaded'] == 1
+    assert resumed.replay(key) == 'kept'
+    resumed.close()
+
+
+def test_journal_key_covers_every_input(swarm):
+    key = swarm.SessionJournal.key
+    base = key('lead', 'task', [], 'model-a', 'system')
+    assert base == key('lead', 'task', None, 'model-a', 'system')
+    assert base != key('backend', 'task', [], 'model-a', 'system')
+    assert base != key('lead', 'other', [], 'model-a', 'system')
+    assert base != key('lead', 'task', [{'agent': 'x', 'message': 'y'}], 'model-a', 'system')
+    assert base != key('lead', 'task', [], 'model-b', 'system')
+    assert base != key('lead', 'task', [], 'model-a', 'edited system')
+
+
+def test_resumed_session_replays_finished_calls(swarm, mock_env, config):
+    first = swarm.SwarmOrchestrator(str(config))
+    answers = first.parallel_task({'lead': 'Plan it', 'backend': 'Build the API'})
+    first.close()
+    assert mock_env.stats['ok'] == 2
+
+    resumed = swarm.SwarmOrchestrator(str(config), resume=first.session_dir.name)
+    assert resumed.session_dir == first.session_dir
+    assert resumed.parallel_task({'lead': 'Plan it', 'backend': 'Build the API'}) == answers
+    # Only the new task reaches the model
+    resumed.delegate_task('Write the docs', to_agent='backend')
+    resumed.close()
+    assert mock_env.stats['ok'] == 3
+    assert resumed.journal.stats['replayed'] == 2
+
+
+def test_fresh_sessions_never_share_a_journal(swarm, mock_env, config):
+    first = swarm.SwarmOrchestrator(str(config))
+    first.delegate_task('Plan it')
+    second = swarm.SwarmOrchestrator(str(config))
+    second.delegate_task('Plan it')
+    first.close()
+    second.close()
+
+    assert first.session_dir != second.session_dir
+    assert second.journal.stats['replayed'] == 0
+    assert mock_env.stats['ok'] == 2
+
+
+def test_config_edit_invalidates_checkpoints(swarm, mock_env, config):
+    first = swarm.SwarmOrchestrator(str(config))
+    first.delegate_task('Plan it')
+    first.close()
+
+    settings = yaml.safe_load(config.read_text())
+    settings['instances']['lead']['model'] = 'claude-3-5-sonnet-20241022'
+    config.write_text(yaml.safe_dump(settings))
+    resumed = swarm.SwarmOrchestrator(str(config), resume=first.session_dir.name)
+    answer = resumed.delegate_task('Plan it')
+    resumed.close()
+
+    assert 'claude-3-5-sonnet' in answer['lead']
+    assert resumed.journal.stats['replayed'] == 0
+    assert mock_env.stats['ok'] == 2
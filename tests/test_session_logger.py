@@ -0,0 +1,48 @@
+"""SessionLogger: background JSONL writer"""
+
+import gzip
+import json
+
+import pytest
+
+
+def read_lines(path, opener=open):
+    with opener(path, 'rt') as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.parametrize('compression, opener', [(None, open), ('gzip', gzip.open)])
+def test_close_writes_every_record(swarm, tmp_path, compression, opener):
+    logger = swarm.SessionLogger(tmp_path, compression=compression, flush_interval=60)
+    for n in range(250):
+        logger.log('backend', {'n': n})
+    logger.log('lead', {'n': 'plan'})
+    logger.close()
+
+    assert [r['n'] for r in read_lines(logger.path('backend'), opener)] == list(range(250))
+    assert read_lines(logger.path('lead'), opener) == [{'n': 'plan'}]
+    assert logger.stats['records'] == 251
+    assert logger.stats['dropped'] == 0
+
+
+def test_flush_makes_records_readable_before_close(swarm, tmp_path):
+    logger = swarm.SessionLogger(tmp_path, flush_interval=60)
+    logger.log('backend', {'n': 1})
+    logger.flush(timeout=5)
+    assert read_lines(logger.path('backend')) == [{'n': 1}]
+    logger.close()
+
+    logger.log('backend', {'n': 2})
+    assert logger.stats['dropped'] == 1
+    assert read_lines(logger.path('backend')) == [{'n': 1}]
+
+
+def test_write_errors_go_to_stderr(swarm, tmp_path, capsys):
+    logger = swarm.SessionLogger(tmp_path / 'missing')
+    logger.log('backend', {'n': 1})
+    logger.close()
+
+    captured = capsys.readouterr()
+    assert captured.out == ''
+    assert 'could not write backend record' in captured.err
+    assert logger.stats['dropped'] == 1
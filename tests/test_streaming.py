@@ -0,0 +1,117 @@
+"""Streamed agent calls: checkpoints, session logs and deadlines"""
+
+import json
+import asyncio
+import time
+
+
+def session_log(session_dir, agent):
+    with open(session_dir / f'{agent}.jsonl') as f:
+        return [json.loads(line) for line in f]
+
+
+def collect(deltas):
+    texts = {}
+    for agent, text in deltas:
+        texts[agent] = texts.get(agent, '') + text
+    return texts
+
+
+def test_collaborative_stream_logs_and_checkpoints_every_step(swarm, mock_env, config):
+    first = swarm.SwarmOrchestrator(str(config))
+    streamed = collect(first.collaborative_task('Todo app', {'backend': 'Build the API'},
+                                                stream=True))
+    first.close()
+
+    assert set(streamed) == {'lead', 'backend', 'synthesis'}
+    assert mock_env.stats['ok'] == 3
+    assert first.journal.stats['recorded'] == 3
+    tasks = [record['task'] for record in session_log(first.session_dir, 'lead')]
+    assert tasks == ['Todo app', 'Synthesize subtask results']
+    synthesis = session_log(first.session_dir, 'lead')[-1]
+    assert synthesis['response'] == streamed['synthesis']
+    assert synthesis['used'] == ['backend']
+
+    resumed = swarm.SwarmOrchestrator(str(config), resume=first.session_dir.name)
+    replayed = collect(resumed.collaborative_task('Todo app', {'backend': 'Build the API'},
+                                                  stream=True))
+    resumed.close()
+    assert replayed == streamed
+    assert resumed.journal.stats['replayed'] == 3
+    assert mock_env.stats['ok'] == 3
+
+
+def test_streams_stop_at_the_task_deadline(swarm, mock_env, config):
+    mock_env.update({'token_delay': 0.2})
+    orchestrator = swarm.SwarmOrchestrator(str(config))
+    start = time.monotonic()
+    streamed = collect(orchestrator.parallel_task(
+        {'lead': 'Plan it', 'backend': 'Build the API'}, stream=True, timeout=0.5))
+    elapsed = time.monotonic() - start
+    orchestrator.close()
+
+    assert elapsed < 1.5
+    for agent in ('lead', 'backend'):
+        assert streamed[agent].endswith(f'Deadline exceeded: {agent} did not finish in time')
+    # Cut-off streams are logged but never checkpointed
+    assert orchestrator.journal.stats['recorded'] == 0
+    assert session_log(orchestrator.session_dir, 'backend')[0]['task'] == 'Build the API'
+
+
+def test_cancelled_scope_stops_a_stream(swarm, mock_env, config):
+    mock_env.update({'token_delay': 0.2})
+    orchestrator = swarm.SwarmOrchestrator(str(config))
+    scope = swarm.TaskScope()
+    deltas = orchestrator.parallel_task({'lead': 'Plan it'}, stream=True, scope=scope)
+    agent, first = next(deltas)
+    scope.cancel()
+    rest = ''.join(text for _, text in deltas)
+    orchestrator.close()
+
+    assert agent == 'lead' and first
+    assert rest.endswith("Cancelled: lead's result was not needed")
+
+
+def acollect(orchestrator, *args, **kwargs):
+    async def run():
+        texts = {}
+        async for agent, text in orchestrator.aparallel_stream(*args, **kwargs):
+            texts[agent] = texts.get(agent, '') + text
+        await orchestrator.aclose()
+        return texts
+    return asyncio.run(run())
+
+
+def test_async_streams_stop_at_the_task_deadline(swarm, mock_env, config):
+    mock_env.update({'token_delay': 0.2})
+    orchestrator = swarm.AsyncSwarmOrchestrator(str(config))
+    orchestrator.task_timeout = 0.5
+    start = time.monotonic()
+    streamed = acollect(orchestrator, {'lead': 'Plan it', 'backend': 'Build the API'})
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 1.5
+    for agent in ('lead', 'backend'):
+        assert streamed[agent].endswith(f'Deadline exceeded: {agent} did not finish in time')
+    assert orchestrator.journal.stats['recorded'] == 0
+    assert session_log(orchestrator.session_dir, 'lead')[0]['deadline_exceeded']
+
+
+def test_cancelled_scope_stops_an_async_stream(swarm, mock_env, config):
+    mock_env.update({'token_delay': 0.2})
+    orchestrator = swarm.AsyncSwarmOrchestrator(str(config))
+    scope = swarm.TaskScope()
+
+    async def run():
+        texts = []
+        async for _, text in orchestrator.aparallel_stream({'lead': 'Plan it'}, scope=scope):
+            texts.append(text)
+            scope.cancel()
+        await orchestrator.aclose()
+        return texts
+
+    start = time.monotonic()
+    texts = asyncio.run(run())
+    assert time.monotonic() - start < 1.0
+    assert texts[-1] == "Cancelled: lead's result was not needed"
+    assert len(texts) == 2
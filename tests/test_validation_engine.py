@@ -0,0 +1,104 @@
+"""Dependency tracking and incremental revalidation (hooks/validators/validation_engine.py)"""
+
+import pytest
+
+INDEX_HTML = """<!DOCTYPE html>
+<html><head>
+<script src="https://unpkg.com/react@18/umd/react.production.min.js"></script>
+<script src="https://unpkg.com/react-dom@18/umd/react-dom.production.min.js"></script>
+<script src="https://unpkg.com/@babel/standalone/babel.min.js"></script>
+</head><body><div id="root"></div>
+<script type="text/babel" src="Item.js"></script>
+<script type="text/babel" src="App.js"></script>
+<script type="text/babel">ReactDOM.createRoot(document.getElementById('root')).render(<App />);</script>
+</body></html>
+"""
+ITEM_JS = '/* global React */\nfunction Item({label}) { return <li>{label}</li>; }\n'
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / 'index.html').write_text(INDEX_HTML)
+    (tmp_path / 'Item.js').write_text(ITEM_JS)
+    (tmp_path / 'App.js').write_text('/* global React */\n'
+                                     'function App() { return <ul><Item label="a" /></ul>; }\n')
+    (tmp_path / 'server').mkdir()
+    (tmp_path / 'server' / 'db.js').write_text('module.exports = { connect() {} };\n')
+    (tmp_path / 'server' / 'app.js').write_text("const db = require('./db');\ndb.connect();\n")
+    (tmp_path / 'notes.js').write_text('var notes = [];\n')
+    return tmp_path
+
+
+@pytest.fixture
+def watcher(validation, project):
+    watcher = validation.ProjectWatcher(project, validation.ValidationEngine(persist=False),
+                                        use_inotify=False)
+    watcher.scan()
+    return watcher
+
+
+def test_graph_follows_scripts_imports_and_names(validation, watcher):
+    graph = watcher.graph
+    assert graph.affected({'Item.js': set()}) == {'Item.js', 'index.html'}
+    assert graph.affected({'server/db.js': set()}) == {'server/db.js', 'server/app.js'}
+    assert graph.affected({'notes.js': set()}) == {'notes.js'}
+    # Users of a name that appeared or disappeared are affected wherever they are
+    assert 'App.js' in graph.affected({'notes.js': {'Item'}})
+
+
+def test_removing_a_file_drops_its_edges(validation):
+    graph = validation.DependencyGraph()
+    graph.update('a.js', {'language': 'javascript', 'imports': [('./b', 'b')],
+                          'uses': ['Thing'], 'defines': []})
+    assert graph.affected({'b.js': set()}) == {'b.js', 'a.js'}
+    graph.update('a.js', None)
+    assert graph.affected({'b.js': set()}) == {'b.js'}
+    assert graph.users['Thing'] == set()
+
+
+def test_missing_import_target_is_found_once_created(validation):
+    graph = validation.DependencyGraph()
+    graph.update('src/app.js', {'language': 'javascript', 'imports': [('./util', 'x')],
+                                'uses': [], 'defines': []})
+    assert graph.affected({'src/util/index.js': set()}) == {'src/util/index.js', 'src/app.js'}
+
+
+def test_incremental_update_matches_a_full_validation(validation, project, watcher):
+    engine = validation.ValidationEngine(persist=False)
+    assert watcher.last_report['passed']
+
+    # Deleting a script the page loads breaks the page, not unrelated files
+    (project / 'Item.js').unlink()
+    report = watcher.update([project / 'Item.js'])
+    assert report['changed'] == ['Item.js']
+    assert 'notes.js' not in report['revalidated']
+    assert 'server/app.js' not in report['revalidated']
+    full = engine.validate_project(project)
+    assert (report['errors'], report['warnings']) == (full['errors'], full['warnings'])
+    assert not report['passed']
+
+    (project / 'Item.js').write_text(ITEM_JS)
+    report = watcher.update([project / 'Item.js'])
+    assert report['passed']
+    assert report['errors'] == engine.validate_project(project)['errors'] == 0
+
+
+def test_update_ignores_files_whose_content_did_not_change(watcher, project):
+    (project / 'notes.js').write_text('var notes = [];\n')
+    assert watcher.update([project / 'notes.js']) is None
+    assert watcher.update([project / 'node_modules' / 'x.js']) is None
+
+
+def test_result_cache_is_a_bounded_lru(validation):
+    engine = validation.ValidationEngine(persist=False, max_cache_entries=2)
+    engine.analyze('css', 'a {}')
+    engine.analyze('css', 'b {}')
+    engine.analyze('css', 'a {}')
+    engine.analyze('css', 'c {}')
+    assert len(engine._cache) == 2
+    assert engine.stats['cache_hits'] == 1
+
+    # 'b' was least recently used, so it was evicted and is analyzed again
+    engine.analyze('css', 'a {}')
+    engine.analyze('css', 'b {}')
+    assert engine.stats == {'analyzed': 4, 'cache_hits': 2}
@@ -0,0 +1,149 @@
+"""JSX compilation, minification and page bundling (hooks/builders/web_bundler.py)"""
+
+import json
+import shutil
+import subprocess
+
+import pytest
+
+
+def test_elements_attributes_and_text(bundler):
+    source = 'const A = () => <div className="x" id={y}>Hi {name}!</div>;'
+    assert bundler.compile_jsx(source) == (
+        'var A = () => React.createElement("div", {className: "x", id: y}, "Hi ", name, "!");')
+
+
+def test_components_fragments_spreads_and_entities(bundler):
+    source = '<>\n  <Item {...props} done />\n  text &amp; more\n</>'
+    assert bundler.compile_jsx(source) == (
+        'React.createElement(React.Fragment, null, '
+        'React.createElement(Item, {...props, done: true}), "text & more")')
+    assert bundler.compile_jsx('<input value="a&quot;b" />') == (
+        'React.createElement("input", {value: "a\\"b"})')
+
+
+def test_strings_templates_regexes_and_comparisons_are_not_jsx(bundler):
+    source = 'const s = "<div>"; let t = `<b>${1}</b>`; if (a < b) x = /<p>/.test(s);'
+    assert bundler.compile_jsx(source) == (
+        'var s = "<div>"; var t = `<b>${1}</b>`; if (a < b) x = /<p>/.test(s);')
+
+
+def test_only_top_level_declarations_become_var(bundler):
+    source = 'function f() { const x = 1; return <Item key={x} />; }'
+    assert bundler.compile_jsx(source) == (
+        'function f() { const x = 1; return React.createElement(Item, {key: x}); }')
+
+
+def test_unclosed_element_is_a_build_error(bundler):
+    with pytest.raises(bundler.BuildError):
+        bundler.compile_jsx('const a = <div><span></div>;')
+
+
+@pytest.mark.parametrize('source, expected', [
+    ('var a = 1\n(b || c).d()', 'var a=1\n(b||c).d()\n'),
+    ('let x = "a  //b" // c\n/* d */ y = 2', 'let x="a  //b"\ny=2\n'),
+    ('return\nx', 'return\nx\n'),
+    ('a = b\n++c', 'a=b\n++c\n'),
+    ('x = 1 /2/ 3', 'x=1/2/3\n'),
+])
+def test_minifier_keeps_strings_and_line_breaks_asi_depends_on(bundler, source, expected):
+    assert bundler.minify_js(source) == expected
+
+
+def test_css_minifier(bundler):
+    assert bundler.minify_css('a {  color : red ; }  /* c */ b{x:1}') == 'a{color:red}b{x:1}\n'
+
+
+def test_scripts_follow_the_components_they_use(bundler):
+    parts = [{'label': 'main', 'defines': [], 'uses': ['App']},
+             {'label': 'app', 'defines': ['App'], 'uses': ['Item']},
+             {'label': 'util', 'defines': ['util'], 'uses': []},
+             {'label': 'item', 'defines': ['Item'], 'uses': []}]
+    assert [part['label'] for part in bundler.order_scripts(parts)] == [
+        'util', 'item', 'app', 'main']
+
+
+REACT_STUB = """var React = {Fragment: 'fragment', createElement: function (type, props) {
+  var children = Array.prototype.slice.call(arguments, 2);
+  return typeof type === 'function' ? type(Object.assign({children: children}, props))
+    : {type: type, props: props, children: children};
+}};"""
+REACT_DOM_STUB = """var ReactDOM = {createRoot: function () {
+  return {render: function (tree) { globalThis.rendered = tree; }};
+}};"""
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+    <link rel="stylesheet" href="App.css">
+    <script src="https://unpkg.com/react@18/umd/react.production.min.js"></script>
+    <script src="https://unpkg.com/react-dom@18/umd/react-dom.production.min.js"></script>
+    <script src="https://unpkg.com/@babel/standalone/babel.min.js"></script>
+</head>
+<body>
+    <div id="root"></div>
+    <script type="text/babel" src="App.js"></script>
+    <script type="text/babel" src="Item.js"></script>
+    <script type="text/babel">
+        ReactDOM.createRoot(document.getElementById('root')).render(<App />);
+    </script>
+</body>
+</html>
+"""
+
+
+@pytest.fixture
+def page(bundler, tmp_path, monkeypatch):
+    monkeypatch.setattr(bundler, 'VENDOR_CACHE', tmp_path / 'vendor')
+    for package, stub in (('react', REACT_STUB), ('react-dom', REACT_DOM_STUB)):
+        umd = tmp_path / 'node_modules' / package / 'umd'
+        umd.mkdir(parents=True)
+        (umd / f'{package}.production.min.js').write_text(stub)
+    project = tmp_path / 'frontend'
+    project.mkdir()
+    (project / 'App.js').write_text(
+        'const App = () => <main className="app"><Item label="One" /></main>;\n')
+    (project / 'Item.js').write_text(
+        'function Item({label}) {\n  return <li>{label}</li>;\n}\n')
+    (project / 'App.css').write_text('.app {  margin : 0 ; }\n')
+    (project / 'index.html').write_text(PAGE)
+    return project / 'index.html'
+
+
+def test_build_bundles_a_page_into_hashed_assets(bundler, page):
+    result = bundler.build_page(page)
+    dist = page.parent / 'dist'
+
+    assert not result['cached']
+    assert result['scripts'] == ['Item.js', 'App.js', 'inline script 3']
+    html = (dist / 'index.html').read_text()
+    assert f'<script defer src="{result["js"]}"></script>' in html
+    assert f'<link rel="stylesheet" href="{result["css"]}">' in html
+    assert 'babel' not in html and 'unpkg' not in html and 'text/babel' not in html
+    bundle = (dist / result['js']).read_text()
+    assert bundle.index('var React =') < bundle.index('function Item') < bundle.index('var App')
+    assert (dist / result['css']).read_text() == '.app{margin:0}\n'
+    assert json.loads((dist / bundler.BUILD_FILE).read_text())['index.html']['js'] == result['js']
+
+
+def test_unchanged_page_is_not_rebuilt_and_stale_assets_go(bundler, page):
+    first = bundler.build_page(page)
+    assert bundler.build_page(page)['cached']
+
+    (page.parent / 'Item.js').write_text('function Item({label}) { return <b>{label}</b>; }\n')
+    second = bundler.build_page(page)
+    assert not second['cached'] and second['js'] != first['js']
+    assert sorted(path.name for path in (page.parent / 'dist').glob('index.*')) == sorted(
+        ['index.html', second['js'], second['css']])
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='node is not installed')
+def test_bundle_renders_under_node(bundler, page):
+    result = bundler.build_page(page)
+    script = (f"globalThis.document = {{getElementById: () => null}};\n"
+              f"{(page.parent / 'dist' / result['js']).read_text()}\n"
+              f"console.log(JSON.stringify(globalThis.rendered));")
+    output = subprocess.run(['node', '-e', script], capture_output=True, text=True, timeout=30)
+    assert output.returncode == 0, output.stderr
+    assert json.loads(output.stdout) == {
+        'type': 'main', 'props': {'className': 'app'},
+        'children': [{'type': 'li', 'props': None, 'children': ['One']}]}
@@ -0,0 +1,70 @@
+"""Worker mode: tasks fanned out over the message bus"""
+
+import json
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def orchestrator(swarm, mock_env, config):
+    orchestrator = swarm.SwarmOrchestrator(str(config))
+    yield orchestrator
+    orchestrator.close()
+
+
+def run_worker(swarm, orchestrator, **options):
+    worker = swarm.SwarmWorker(orchestrator, worker_id='w1', concurrency=2, **options)
+    stop = threading.Event()
+    thread = threading.Thread(target=worker.run, args=(stop,), daemon=True)
+    thread.start()
+    return worker, stop, thread
+
+
+def test_workers_answer_fanned_out_tasks(swarm, orchestrator):
+    worker, stop, thread = run_worker(swarm, orchestrator)
+    results = orchestrator.run_on_workers({'lead': 'Plan it', 'backend': 'Build the API'},
+                                          timeout=10)
+    stop.set()
+    thread.join(5)
+
+    assert set(results) == {'lead', 'backend'}
+    assert all(result['worker'] == 'w1' for result in results.values())
+    assert worker.processed == 2
+
+
+def test_poison_task_is_dead_lettered_after_max_deliveries(swarm, orchestrator, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError('model exploded')
+
+    monkeypatch.setattr(orchestrator.agents['backend'], 'think', fail)
+    worker, stop, thread = run_worker(swarm, orchestrator, visibility_timeout=0,
+                                      max_deliveries=2)
+    results = orchestrator.run_on_workers({'backend': 'Build the API'}, timeout=10)
+    stop.set()
+    thread.join(5)
+
+    error = 'backend task failed on 2 deliveries'
+    assert results['backend']['error'] == error
+    assert results['backend']['response'].startswith(f'Error: {error}')
+    assert (worker.failed, worker.dead_lettered, worker.processed) == (2, 1, 0)
+    # Parked on the dead-letter stream, and no longer pending on the task stream
+    dead = orchestrator.message_bus.pull([worker.dead_letter_stream], 'ops', 'ops')
+    assert [task['task'] for _, task in dead] == ['Build the API']
+    assert orchestrator.message_bus.reclaim(worker.task_stream, worker.GROUP, 'w2',
+                                            min_idle=0) == []
+
+    # Failures are in the session log, not on stdout
+    orchestrator.logger.flush()
+    with open(orchestrator.session_dir / 'backend.jsonl') as f:
+        errors = [json.loads(line).get('error') for line in f]
+    assert errors.count('RuntimeError: model exploded') == 2
+    assert error in errors
+
+
+def test_fan_out_defaults_to_the_task_timeout(swarm, orchestrator):
+    # No worker is running: without a deadline this would wait forever
+    orchestrator.task_timeout = 0.5
+    results = orchestrator.run_on_workers({'backend': 'Build the API'})
+    assert results['backend']['response'] == \
+        'Deadline exceeded: backend did not finish in time'
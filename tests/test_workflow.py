@@ -0,0 +1,119 @@
+"""Config workflows executed as a dependency DAG"""
+
+import pytest
+import yaml
+
+
+def with_workflow(config, steps, **swarm_settings):
+    spec = yaml.safe_load(config.read_text())
+    spec['swarm'].update(swarm_settings)
+    spec['workflows'] = {'build': {'steps': steps}}
+    config.write_text(yaml.safe_dump(spec))
+    return str(config)
+
+
+def test_cli_reports_steps_stopped_by_the_deadline(swarm, mock_env, config, capsys):
+    # The backend step (sonnet) outlives the task timeout; lead (haiku) does not
+    mock_env.update({'model_latency': {'haiku': 0.0, 'sonnet': 2.0}})
+    path = with_workflow(config, [{'agent': 'lead', 'action': 'plan'},
+                                  {'agent': 'backend', 'action': 'build'}],
+                         task_timeout=0.5)
+    swarm.run_workflow_cli(path, 'build', 'Todo app')
+
+    out = capsys.readouterr().out
+    assert '[lead.plan] +0.0s' in out
+    assert '[backend.build] unfinished' in out
+    assert 'Deadline exceeded: backend did not finish in time' in out
+
+
+def compile(swarm, steps):
+    return swarm.Workflow.compile('build', {'steps': steps})
+
+
+def test_dependencies_come_from_inputs_agents_and_stages(swarm):
+    workflow = compile(swarm, [
+        {'agent': 'lead', 'action': 'plan', 'output': 'plan'},
+        {'parallel': [{'agent': 'backend', 'action': 'api', 'input': 'plan', 'output': 'api'},
+                      {'agent': 'lead', 'action': 'docs'}]},
+        {'agent': 'backend', 'action': 'tests'},
+        {'agent': 'lead', 'action': 'review', 'depends_on': ['backend.api']},
+    ])
+    deps = {step_id: step.depends_on for step_id, step in workflow.steps.items()}
+    assert deps == {'lead.plan': set(),
+                    'backend.api': {'lead.plan'},
+                    'lead.docs': {'lead.plan'},
+                    # Same agent's step in the previous stage, not the whole stage
+                    'backend.tests': {'backend.api'},
+                    'lead.review': {'backend.api'}}
+
+    def ready(finished, running=()):
+        started = set(finished) | set(running)
+        return [step.id for step in workflow.ready(set(finished), started)]
+
+    assert ready([]) == ['lead.plan']
+    assert ready(['lead.plan']) == ['backend.api', 'lead.docs']
+    # review waits for neither docs nor tests
+    assert ready(['lead.plan', 'backend.api'], ['lead.docs']) == ['backend.tests', 'lead.review']
+
+
+def test_repeated_step_ids_are_numbered(swarm):
+    workflow = compile(swarm, [{'agent': 'lead', 'action': 'plan'},
+                               {'agent': 'lead', 'action': 'plan'}])
+    assert list(workflow.steps) == ['lead.plan', 'lead.plan#2']
+    assert workflow.steps['lead.plan#2'].depends_on == {'lead.plan'}
+
+
+@pytest.mark.parametrize('steps, error', [
+    ([{'agent': 'lead', 'id': 'a', 'depends_on': ['b']},
+      {'agent': 'lead', 'id': 'b', 'depends_on': ['a']}], 'dependency cycle'),
+    ([{'agent': 'lead', 'depends_on': ['nowhere']}], r'unknown step\(s\) nowhere'),
+    ([{'agent': 'lead', 'input': 'spec'}], r'unknown input\(s\) spec'),
+])
+def test_bad_graphs_are_rejected(swarm, steps, error):
+    with pytest.raises(ValueError, match=error):
+        compile(swarm, steps)
+
+
+def test_unknown_workflow_or_agent_is_rejected(swarm, mock_env, config):
+    path = with_workflow(config, [{'agent': 'designer', 'action': 'mockups'}])
+    orchestrator = swarm.SwarmOrchestrator(path)
+    with pytest.raises(ValueError, match='Available: build'):
+        orchestrator.compile_workflow('deploy')
+    with pytest.raises(ValueError, match=r'unknown agent\(s\) designer'):
+        orchestrator.compile_workflow('build')
+    orchestrator.close()
+
+
+def test_critical_path_is_the_longest_dependent_chain(swarm):
+    workflow = compile(swarm, [
+        {'agent': 'lead', 'action': 'plan'},
+        {'parallel': [{'agent': 'backend', 'action': 'api'},
+                      {'agent': 'frontend', 'action': 'ui'}]},
+        {'agent': 'lead', 'action': 'review', 'depends_on': ['backend.api', 'frontend.ui']},
+    ])
+    timings = {'lead.plan': {'duration': 1.0}, 'backend.api': {'duration': 3.0},
+               'frontend.ui': {'duration': 2.0}, 'lead.review': {'duration': 0.5}}
+    assert workflow.critical_path(timings) == (
+        ['lead.plan', 'backend.api', 'lead.review'], 4.5)
+    # A run cut short reports the path through the steps that finished
+    del timings['lead.review']
+    assert workflow.critical_path(timings) == (['lead.plan', 'backend.api'], 4.0)
+
+
+def test_independent_steps_run_concurrently_up_to_the_limit(swarm, mock_env, config):
+    mock_env.update({'latency': 0.3})
+    steps = [{'parallel': [{'agent': 'backend', 'action': f'part{n}'} for n in range(4)]}]
+    orchestrator = swarm.SwarmOrchestrator(with_workflow(config, steps))
+
+    report = orchestrator.run_workflow('build', 'Todo app')
+    assert report['incomplete'] == []
+    assert report['wall_time'] < 0.3 * 2
+    assert report['total_step_time'] >= 0.3 * 4
+
+    report = orchestrator.run_workflow('build', 'Todo app', max_concurrency=2)
+    orchestrator.close()
+    starts = sorted(timing['start'] for timing in report['timings'].values())
+    # Two at a time: the second pair starts once the first has finished
+    assert starts[2] >= 0.3 and starts[1] < 0.15
+    assert 0.3 * 2 <= report['wall_time'] < 0.3 * 3
+    assert len(report['critical_path']) == 1